@@ -1,24 +1,55 @@
 import os
+import re
+import sys
 import json
 import uuid
+import hashlib
 import time
 import sqlite3
 import secrets
 import urllib.parse
 import datetime
 import io
+import queue
+import random
+import logging
+import logging.handlers
+import hmac
+import base64
+import collections
+import asyncio
+import mimetypes
+import functools
+import threading
+import multiprocessing
+import concurrent.futures
+import contextvars
+import contextlib
+import weakref
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Union
 from zoneinfo import ZoneInfo
 
 import requests
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, Response
 from dotenv import load_dotenv
 from openai import OpenAI
 from apscheduler.schedulers.background import BackgroundScheduler
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
 
 
 
@@ -26,29 +57,140 @@ from PIL import Image, ImageDraw, ImageFont
 load_dotenv()
 
 DB_PATH = os.getenv("DB_PATH", "tokens.db")
-META_GRAPH_BASE = "https://graph.facebook.com/v19.0"
+META_GRAPH_BASE = os.getenv("META_GRAPH_BASE", "https://graph.facebook.com/v19.0").rstrip("/")
+LINKEDIN_API_BASE = os.getenv("LINKEDIN_API_BASE", "https://api.linkedin.com/rest").rstrip("/")
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 BACKEND_PUBLIC_BASE = os.getenv("BACKEND_PUBLIC_BASE", "http://localhost:8000").rstrip("/")
 DEV_TOKEN = os.getenv("DEV_TOKEN")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Bump whenever the caption prompt changes, so cached captions from the old prompt are not reused.
+CAPTION_PROMPT_VERSION = "1"
+CAPTION_CACHE_TTL_SECONDS = int(os.getenv("CAPTION_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+CAPTION_CACHE_MAX_ENTRIES = int(os.getenv("CAPTION_CACHE_MAX_ENTRIES", "5000"))
+# Posts per multi-item caption prompt when several blog posts are waiting to be processed.
+CAPTION_BATCH_SIZE = int(os.getenv("CAPTION_BATCH_SIZE", "8"))
 
 SDXL_PROVIDER = os.getenv("SDXL_PROVIDER", "replicate")
 REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN")
 REPLICATE_SDXL_MODEL_VERSION = os.getenv("REPLICATE_SDXL_MODEL_VERSION")
+REPLICATE_API_BASE = os.getenv("REPLICATE_API_BASE", "https://api.replicate.com/v1").rstrip("/")
+# Webhooks need BACKEND_PUBLIC_BASE to be reachable from Replicate; without them predictions
+# are completed by the poller alone.
+REPLICATE_WEBHOOKS_ENABLED = os.getenv("REPLICATE_WEBHOOKS_ENABLED", "0") == "1"
+REPLICATE_WEBHOOK_SECRET = os.getenv("REPLICATE_WEBHOOK_SECRET", "")
+REPLICATE_POLL_INTERVAL_SECONDS = int(os.getenv("REPLICATE_POLL_INTERVAL_SECONDS", "5"))
+REPLICATE_WEBHOOK_POLL_GRACE_SECONDS = int(os.getenv("REPLICATE_WEBHOOK_POLL_GRACE_SECONDS", "120"))
+REPLICATE_PREDICTION_TIMEOUT_SECONDS = int(os.getenv("REPLICATE_PREDICTION_TIMEOUT_SECONDS", "600"))
+# Generated backgrounds kept ready per prompt and palette (0 disables the library). Each is
+# reused up to BACKGROUND_LIBRARY_MAX_USES times before it is retired and replaced.
+BACKGROUND_LIBRARY_SIZE = int(os.getenv("BACKGROUND_LIBRARY_SIZE", "6"))
+BACKGROUND_LIBRARY_MAX_USES = int(os.getenv("BACKGROUND_LIBRARY_MAX_USES", "5"))
+BACKGROUND_LIBRARY_REFILL_INTERVAL_SECONDS = int(os.getenv("BACKGROUND_LIBRARY_REFILL_INTERVAL_SECONDS", "600"))
+# How long a refill's claim on a library slot is honoured while it starts the prediction.
+LIBRARY_CLAIM_TTL_SECONDS = int(os.getenv("LIBRARY_CLAIM_TTL_SECONDS", "300"))
 
 BRAND_NAME = os.getenv("BRAND_NAME", "Postify")
 BRAND_PRIMARY = os.getenv("BRAND_PRIMARY", "#0f172a")
 BRAND_SECONDARY = os.getenv("BRAND_SECONDARY", "#334155")
 BRAND_ACCENT = os.getenv("BRAND_ACCENT", "#22c55e")
 FONT_PATH = os.getenv("FONT_PATH", "")
+FONT_FALLBACKS = [f.strip() for f in os.getenv("FONT_FALLBACKS", "arial.ttf").split(",") if f.strip()]
+FONT_PRELOAD_SIZES = [int(v) for v in os.getenv("FONT_PRELOAD_SIZES", "54,28").split(",") if v.strip()]
+
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", str(max(1, RENDER_POOL_SIZE) * 4)))
+RENDER_SUBMIT_TIMEOUT_SECONDS = float(os.getenv("RENDER_SUBMIT_TIMEOUT_SECONDS", "120"))
+# Per-platform "FORMAT:quality" overrides, e.g. "facebook=WEBP:80,twitter=JPEG:82".
+CREATIVE_ENCODINGS = os.getenv("CREATIVE_ENCODINGS", "")
 
 DEFAULT_TZ = os.getenv("DEFAULT_TZ", "Asia/Kolkata")
 
 LINKEDIN_AUTHOR_URN = os.getenv("LINKEDIN_AUTHOR_URN")
 
 OAUTH_STATE_TTL_SECONDS = 10 * 60
+OAUTH_STATE_SWEEP_INTERVAL_SECONDS = int(os.getenv("OAUTH_STATE_SWEEP_INTERVAL_SECONDS", "300"))
+OAUTH_STATE_SWEEP_BATCH_SIZE = int(os.getenv("OAUTH_STATE_SWEEP_BATCH_SIZE", "5000"))
+
+MEDIA_GC_INTERVAL_SECONDS = int(os.getenv("MEDIA_GC_INTERVAL_SECONDS", "3600"))
+MEDIA_GC_GRACE_SECONDS = int(os.getenv("MEDIA_GC_GRACE_SECONDS", str(24 * 60 * 60)))
+MEDIA_GC_BATCH_SIZE = int(os.getenv("MEDIA_GC_BATCH_SIZE", "500"))
+# Files looked at per gc_media run when sweeping UPLOAD_DIR for files with no row.
+MEDIA_GC_SWEEP_FILES = int(os.getenv("MEDIA_GC_SWEEP_FILES", "5000"))
+MEDIA_SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# How long an uploaded media handle can be attached to new posts. X media_ids are only
+# good for about a day; LinkedIn image/video URNs persist. Facebook photos and Instagram
+# containers are consumed by the post they are attached to, so they are never cached.
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(6 * 60 * 60)))
+UPLOAD_PART_RETRIES = int(os.getenv("UPLOAD_PART_RETRIES", "3"))
+LINKEDIN_UPLOAD_CONCURRENCY = int(os.getenv("LINKEDIN_UPLOAD_CONCURRENCY", "4"))
+TWITTER_UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+TWITTER_MEDIA_UPLOAD_CONCURRENCY = int(os.getenv("TWITTER_MEDIA_UPLOAD_CONCURRENCY", "4"))
+
+MEDIA_HANDLE_TTL_SECONDS = {
+    "twitter": 23 * 60 * 60,
+    "linkedin": 30 * 24 * 60 * 60,
+    # Unpublished carousel children expire after 24h; kept only for retries.
+    "instagram_carousel_item": 23 * 60 * 60,
+}
+
+METRICS_COLLECT_INTERVAL_SECONDS = int(os.getenv("METRICS_COLLECT_INTERVAL_SECONDS", "300"))
+METRICS_COLLECT_BATCH_SIZE = int(os.getenv("METRICS_COLLECT_BATCH_SIZE", "200"))
+# (max post age, sampling interval): every 15 min for the first 6 hours, hourly for two
+# days, every 6 hours for a week, then daily until the post is 30 days old.
+METRICS_SCHEDULE = [
+    (6 * 60 * 60, 15 * 60),
+    (2 * 24 * 60 * 60, 60 * 60),
+    (7 * 24 * 60 * 60, 6 * 60 * 60),
+    (30 * 24 * 60 * 60, 24 * 60 * 60),
+]
+
+INSTAGRAM_CAROUSEL_CONCURRENCY = int(os.getenv("INSTAGRAM_CAROUSEL_CONCURRENCY", "4"))
+INSTAGRAM_CAROUSEL_MAX_ITEMS = 10
+INSTAGRAM_CONTAINER_TIMEOUT_SECONDS = int(os.getenv("INSTAGRAM_CONTAINER_TIMEOUT_SECONDS", "120"))
+
+# Where finished trace spans go: "none", "console" (stderr) or "file" (JSON lines in TRACE_FILE).
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").strip().lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# Access log sampling: errors (status >= ACCESS_LOG_ERROR_STATUS) and slow requests are
+# always logged; everything else at its route's rate, e.g. "/post/send=1,/metrics=0".
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.05"))
+ACCESS_LOG_ROUTE_SAMPLE_RATES = {
+    route.strip(): float(rate)
+    for route, _, rate in (
+        item.rpartition("=") for item in os.getenv("ACCESS_LOG_ROUTE_SAMPLE_RATES", "/metrics=0").split(",")
+    )
+    if route.strip() and rate.strip()
+}
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+ACCESS_LOG_ERROR_STATUS = int(os.getenv("ACCESS_LOG_ERROR_STATUS", "500"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+ACCESS_LOG_FILE = os.getenv("ACCESS_LOG_FILE", "")
+
+# /admin/* endpoints are disabled unless ADMIN_TOKEN is set; callers send it as X-Admin-Token.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+# Requests and publisher cycles still running past their threshold get their thread stacks
+# sampled until they finish; the result is logged and kept for /admin/slow-captures.
+SLOW_REQUEST_CAPTURE_MS = float(os.getenv("SLOW_REQUEST_CAPTURE_MS", "2000"))
+SLOW_PUBLISHER_CAPTURE_MS = float(os.getenv("SLOW_PUBLISHER_CAPTURE_MS", "20000"))
+SLOW_CAPTURE_SAMPLE_INTERVAL_MS = float(os.getenv("SLOW_CAPTURE_SAMPLE_INTERVAL_MS", "50"))
+SLOW_CAPTURE_KEEP = int(os.getenv("SLOW_CAPTURE_KEEP", "50"))
+
+# Blog processing runs on a SQLite-backed job queue. Each API process runs JOB_WORKERS
+# threads; a claimed job is leased for JOB_VISIBILITY_TIMEOUT_SECONDS, after which any
+# worker may pick it up again (e.g. when the process that held it was recycled).
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = int(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
 
 
 
@@ -70,8 +212,623 @@ app.add_middleware(
 )
 
 
+# Metrics are shared across gunicorn workers through PROMETHEUS_MULTIPROC_DIR (set in
+# gunicorn.conf.py); without it they are per-process.
+PLATFORM_REQUEST_SECONDS = Histogram(
+    "postify_platform_request_seconds",
+    "Outbound platform API calls.",
+    ["platform", "endpoint", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+PUBLISHER_CYCLE_SECONDS = Histogram(
+    "postify_publisher_cycle_seconds",
+    "Duration of one publish_due_scheduled_posts run.",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+PUBLISH_SECONDS = Histogram(
+    "postify_publish_seconds",
+    "Time to publish one scheduled post.",
+    ["platform", "status"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+PUBLISH_LAG_SECONDS = Histogram(
+    "postify_publish_lag_seconds",
+    "Delay between a post's scheduled time and the publisher picking it up.",
+    ["platform"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600),
+)
+RENDER_SECONDS = Histogram(
+    "postify_render_seconds",
+    "Creative rendering, including time waiting for the render pool.",
+    ["mode"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+LLM_SECONDS = Histogram(
+    "postify_llm_seconds",
+    "Caption completions.",
+    ["operation", "status"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120),
+)
+JOB_SECONDS = Histogram(
+    "postify_job_seconds",
+    "Job queue handler run time.",
+    ["kind", "status"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600),
+)
+DB_SECONDS = Histogram(
+    "postify_db_seconds",
+    "SQLite statement and commit latency.",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+
+# Platform an outbound call is made on behalf of; Meta's Graph host serves both
+# Facebook and Instagram, so it cannot be told from the URL alone.
+_platform_label: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("platform_label", default=None)
+
+_PLATFORM_HOSTS = (
+    ("linkedin.com", "linkedin"),
+    ("licdn.com", "linkedin"),
+    ("twitter.com", "twitter"),
+    ("x.com", "twitter"),
+    ("replicate.com", "replicate"),
+    ("replicate.delivery", "replicate"),
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _endpoint_label(url: str) -> tuple[str, str]:
+    """(platform, endpoint) labels for a URL, with ids collapsed so label cardinality stays bounded."""
+    parsed = urllib.parse.urlsplit(url)
+    host = (parsed.hostname or "").lower()
+    platform = "other"
+    for suffix, name in _PLATFORM_HOSTS:
+        if host == suffix or host.endswith("." + suffix):
+            platform = name
+            break
+    else:
+        if host.endswith("facebook.com") or host.endswith("instagram.com"):
+            platform = "meta"
+    segments = []
+    for segment in [seg for seg in parsed.path.split("/") if seg][:4]:
+        if re.fullmatch(r"v\d+(\.\d+)?", segment) or not re.search(r"[\d:%]", segment) and len(segment) <= 32:
+            segments.append(segment)
+        else:
+            segments.append("{id}")
+    return platform, "/" + "/".join(segments)
+
+
+class _InstrumentedAdapter(requests.adapters.HTTPAdapter):
+    def send(self, request, **kwargs):
+        platform, endpoint = _endpoint_label(request.url)
+        if platform == "meta":
+            platform = _platform_label.get() or platform
+        # Only traced as a child of an existing span; stray calls don't start traces.
+        span = None
+        if _current_span.get() is not None:
+            span = start_span(
+                f"HTTP {request.method} {endpoint}",
+                platform=platform,
+                **{"http.request.method": request.method, "server.address": urllib.parse.urlsplit(request.url).hostname},
+            )
+        status = "error"
+        error = None
+        start = time.perf_counter()
+        try:
+            resp = super().send(request, **kwargs)
+            status = str(resp.status_code)
+            return resp
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            PLATFORM_REQUEST_SECONDS.labels(platform, endpoint, status).observe(time.perf_counter() - start)
+            if span is not None:
+                span.set_attribute("http.response.status_code", status)
+                end_span(span, error or (f"HTTP {status}" if status.startswith(("4", "5")) else None))
+
+
+def _instrument_session(session: requests.Session) -> requests.Session:
+    adapter = _InstrumentedAdapter(pool_connections=16, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared session for platform calls: every request is timed, and connections are reused.
+http_session = _instrument_session(requests.Session())
+
+
+def _tweepy_api(auth):
+    import tweepy  # type: ignore
+
+    api = tweepy.API(auth)
+    _instrument_session(api.session)
+    return api
+
+
+@functools.lru_cache(maxsize=1024)
+def _sql_label(sql: str) -> str:
+    """e.g. "select:scheduled_posts" for a statement."""
+    verb = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else "unknown"
+    match = re.search(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?|INDEX\s+IF\s+NOT\s+EXISTS\s+\w+\s+ON)\s+(\w+)", sql, re.I)
+    return f"{verb}:{match.group(1).lower()}" if match else verb
+
+
+class _TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_SECONDS.labels(_sql_label(sql)).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_SECONDS.labels(_sql_label(sql)).observe(time.perf_counter() - start)
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    # The C implementations of these shortcuts open a plain sqlite3.Cursor, not self.cursor().
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            DB_SECONDS.labels("commit").observe(time.perf_counter() - start)
+
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    """A finished-or-running unit of work, identified W3C Trace Context style."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "links", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any], links: List[str]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.links = links
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_trace_lock = threading.Lock()
+_trace_file = None
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current_span.get()
+    return span.traceparent if span else None
+
+
+def start_span(name: str, parent: Optional[str] = None, links: Optional[List[str]] = None, **attributes) -> Span:
+    """Start a span and make it current.
+
+    parent is a stored traceparent to continue (a job or scheduled post row); without
+    one the span is a child of the current span, or the root of a new trace.
+    """
+    match = _TRACEPARENT_RE.match(parent or "")
+    current = _current_span.get()
+    if match:
+        trace_id, parent_id = match.group(1), match.group(2)
+    elif current is not None:
+        trace_id, parent_id = current.trace_id, current.span_id
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+    span = Span(name, trace_id, parent_id, attributes, [link for link in links or [] if _TRACEPARENT_RE.match(link)])
+    span._token = _current_span.set(span)
+    return span
+
+
+def end_span(span: Span, error: Any = None) -> None:
+    span.end_ns = time.time_ns()
+    if error:
+        span.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+    try:
+        _current_span.reset(span._token)
+    except ValueError:
+        # Ended from a different context than it was started in.
+        pass
+    _export_span(span)
+
+
+@contextlib.contextmanager
+def trace_span(name: str, parent: Optional[str] = None, links: Optional[List[str]] = None, **attributes):
+    span = start_span(name, parent, links, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        end_span(span, e)
+        raise
+    end_span(span)
+
+
+def _export_span(span: Span) -> None:
+    global _trace_file
+    if TRACE_EXPORTER not in ("console", "file"):
+        return
+    record = {
+        "trace_id": span.trace_id,
+        "span_id": span.span_id,
+        "parent_span_id": span.parent_id,
+        "name": span.name,
+        "start_time_unix_nano": span.start_ns,
+        "end_time_unix_nano": span.end_ns,
+        "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+        "status": {"code": "ERROR", "message": span.error} if span.error else {"code": "OK"},
+        "attributes": span.attributes,
+        "links": [{"trace_id": link[3:35], "span_id": link[36:52]} for link in span.links],
+        "resource": {"service.name": "postify-backend", "process.pid": os.getpid()},
+    }
+    line = json.dumps(record, default=str) + "\n"
+    with _trace_lock:
+        if TRACE_EXPORTER == "console":
+            sys.stderr.write(line)
+            return
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, "a", buffering=1)
+        _trace_file.write(line)
+
+
+ACCESS_LOG_DROPPED = Counter(
+    "postify_access_log_dropped_total",
+    "Access log records dropped because the log queue was full.",
+)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread as-is; never blocks, drops when the queue is full."""
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread, not on the request path.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            ACCESS_LOG_DROPPED.inc()
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=str)
+
+
+_access_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, ACCESS_LOG_QUEUE_SIZE))
+_access_logger = logging.getLogger("postify.access")
+_access_logger.setLevel(logging.INFO)
+_access_logger.propagate = False
+_access_logger.addHandler(_DroppingQueueHandler(_access_queue))
+_access_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start_access_log() -> None:
+    """Start the thread that writes access records (per process, after gunicorn forks)."""
+    global _access_listener
+    if _access_listener is not None:
+        return
+    handler = logging.FileHandler(ACCESS_LOG_FILE) if ACCESS_LOG_FILE else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_JsonFormatter())
+    _access_listener = logging.handlers.QueueListener(_access_queue, handler)
+    _access_listener.start()
+
+
+def stop_access_log() -> None:
+    global _access_listener
+    if _access_listener is not None:
+        _access_listener.stop()
+        _access_listener = None
+
+
+def _log_access(scope: Dict[str, Any], status: int, duration_ms: float) -> None:
+    route = getattr(scope.get("route"), "path", None)
+    if status >= ACCESS_LOG_ERROR_STATUS:
+        reason, rate = "error", 1.0
+    elif duration_ms >= ACCESS_LOG_SLOW_MS:
+        reason, rate = "slow", 1.0
+    else:
+        reason = "sampled"
+        rate = ACCESS_LOG_ROUTE_SAMPLE_RATES.get(route or scope["path"], ACCESS_LOG_SAMPLE_RATE)
+        if rate <= 0 or random.random() >= rate:
+            return
+    client = scope.get("client")
+    span = _current_span.get()
+    _access_logger.info(
+        {
+            "ts": time.time(),
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "client": client[0] if client else None,
+            "reason": reason,
+            # Lets aggregations weight sampled lines back up to real request counts.
+            "sample_rate": rate,
+            "trace_id": span.trace_id if span else None,
+            "pid": os.getpid(),
+        }
+    )
+
+
+def _collapse_stack(frame) -> str:
+    """One thread's stack, root first, in the folded format flamegraph.pl and speedscope read."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _snapshot_stacks(exclude: Optional[int] = None, only: Optional[Iterable[int]] = None) -> Dict[int, str]:
+    """Folded stack of each thread, or of just the threads in `only`; keyed by thread ident."""
+    frames = sys._current_frames()
+    if only is not None:
+        frames = {tid: frames[tid] for tid in only if tid in frames}
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    return {
+        tid: f"{thread_names.get(tid, tid)};{_collapse_stack(frame)}"
+        for tid, frame in frames.items()
+        if tid != exclude
+    }
+
+
+_profile_lock = threading.Lock()
+
+
+def sample_profile(seconds: float, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS) -> Dict[str, int]:
+    """Wall-clock sample every thread of this process; returns {folded stack: sample count}."""
+    me = threading.get_ident()
+    samples: Dict[str, int] = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for stack in _snapshot_stacks(exclude=me).values():
+            samples[stack] = samples.get(stack, 0) + 1
+        time.sleep(interval_ms / 1000)
+    return samples
+
+
+def _top_functions(samples: Dict[str, int], limit: int = 50) -> List[Dict[str, Any]]:
+    """pstats-style table: self = samples with the function on top, total = samples containing it."""
+    own: Dict[str, int] = {}
+    total: Dict[str, int] = {}
+    for stack, count in samples.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        own[frames[-1]] = own.get(frames[-1], 0) + count
+        for name in set(frames):
+            total[name] = total.get(name, 0) + count
+    n = sum(samples.values()) or 1
+    rows = sorted(total, key=lambda name: (own.get(name, 0), total[name]), reverse=True)[:limit]
+    return [
+        {
+            "function": name,
+            "self_samples": own.get(name, 0),
+            "total_samples": total[name],
+            "self_pct": round(100 * own.get(name, 0) / n, 2),
+            "total_pct": round(100 * total[name] / n, 2),
+        }
+        for name in rows
+    ]
+
+
+_slow_logger = logging.getLogger("postify.slow")
+_slow_logger.setLevel(logging.INFO)
+_slow_logger.propagate = False
+_slow_logger.addHandler(_DroppingQueueHandler(_access_queue))
+_slow_ops: Dict[int, Dict[str, Any]] = {}
+_slow_ops_lock = threading.Lock()
+_slow_captures: "collections.deque[Dict[str, Any]]" = collections.deque(maxlen=max(1, SLOW_CAPTURE_KEEP))
+_slow_watchdog_stop = threading.Event()
+_slow_watchdog_thread: Optional[threading.Thread] = None
+_slow_op: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("slow_op", default=None)
+
+
+@contextlib.contextmanager
+def slow_watch(label: str, threshold_ms: float):
+    """Sample stacks while the wrapped block runs past threshold_ms; usable as a decorator.
+
+    Only the thread that entered the block is sampled, plus any thread marked with
+    _slow_watch_thread while it works for the block (a sync endpoint on the threadpool).
+    """
+    if threshold_ms <= 0:
+        yield
+        return
+    span = _current_span.get()
+    op = {
+        "label": label,
+        "start": time.monotonic(),
+        "threshold": threshold_ms / 1000,
+        "trace_id": span.trace_id if span else None,
+        "threads": {threading.get_ident()},
+        "samples": {},
+    }
+    with _slow_ops_lock:
+        _slow_ops[id(op)] = op
+    token = _slow_op.set(op)
+    try:
+        yield
+    finally:
+        _slow_op.reset(token)
+        with _slow_ops_lock:
+            _slow_ops.pop(id(op), None)
+        duration = time.monotonic() - op["start"]
+        if op["samples"] and duration >= op["threshold"]:
+            _record_slow_capture(op, duration)
+
+
+def _record_slow_capture(op: Dict[str, Any], duration: float) -> None:
+    samples = op["samples"]
+    capture = {
+        "ts": time.time(),
+        "kind": "slow_capture",
+        "label": op["label"],
+        "duration_ms": round(duration * 1000, 2),
+        "threshold_ms": round(op["threshold"] * 1000, 2),
+        "trace_id": op["trace_id"],
+        "pid": os.getpid(),
+        "samples": sum(samples.values()),
+        "stacks": [
+            {"stack": stack, "count": count}
+            for stack, count in sorted(samples.items(), key=lambda item: item[1], reverse=True)[:20]
+        ],
+    }
+    _slow_captures.append(capture)
+    _slow_logger.info(capture)
+
+
+@contextlib.contextmanager
+def _slow_watch_thread():
+    """Have the slow_watch block this context belongs to sample the current thread too."""
+    op = _slow_op.get()
+    if op is None:
+        yield
+        return
+    ident = threading.get_ident()
+    with _slow_ops_lock:
+        added = ident not in op["threads"]
+        op["threads"].add(ident)
+    try:
+        yield
+    finally:
+        if added:
+            with _slow_ops_lock:
+                op["threads"].discard(ident)
+
+
+class _SlowWatchRoute(APIRoute):
+    """Route that marks the threadpool thread running a sync endpoint for slow_watch."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = self._watched(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _watched(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(endpoint)
+        def run(*args: Any, **kwargs: Any) -> Any:
+            with _slow_watch_thread():
+                return endpoint(*args, **kwargs)
+
+        return run
+
+
+app.router.route_class = _SlowWatchRoute
+
+
+def _slow_watchdog_loop() -> None:
+    while not _slow_watchdog_stop.wait(SLOW_CAPTURE_SAMPLE_INTERVAL_MS / 1000):
+        now = time.monotonic()
+        with _slow_ops_lock:
+            due = [(op, list(op["threads"])) for op in _slow_ops.values() if now - op["start"] >= op["threshold"]]
+        if not due:
+            continue
+        stacks = _snapshot_stacks(only={tid for _, threads in due for tid in threads})
+        with _slow_ops_lock:
+            for op, threads in due:
+                samples = op["samples"]
+                for tid in threads:
+                    stack = stacks.get(tid)
+                    if stack:
+                        samples[stack] = samples.get(stack, 0) + 1
+
+
+def start_slow_watchdog() -> None:
+    global _slow_watchdog_thread
+    if _slow_watchdog_thread is not None:
+        return
+    _slow_watchdog_stop.clear()
+    _slow_watchdog_thread = threading.Thread(target=_slow_watchdog_loop, name="slow-watchdog", daemon=True)
+    _slow_watchdog_thread.start()
+
+
+def stop_slow_watchdog() -> None:
+    global _slow_watchdog_thread
+    _slow_watchdog_stop.set()
+    if _slow_watchdog_thread is not None:
+        _slow_watchdog_thread.join(timeout=5)
+        _slow_watchdog_thread = None
+
+
+class AccessLogMiddleware:
+    """Times every HTTP request and hands a sampled access record to the log queue.
+
+    Each request runs in an http.request span (continuing an incoming traceparent), so
+    spans opened by the endpoint belong to it and the access record carries its trace id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = time.perf_counter()
+        traceparent = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"traceparent"), None)
+        span = start_span("http.request", parent=traceparent, method=scope["method"], path=scope["path"])
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            # Profiling requests are slow on purpose.
+            threshold = 0 if scope["path"] == "/admin/profile" else SLOW_REQUEST_CAPTURE_MS
+            with slow_watch(f"{scope['method']} {scope['path']}", threshold):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _log_access(scope, status, (time.perf_counter() - start) * 1000)
+            span.set_attribute("status", status)
+            span.set_attribute("route", getattr(scope.get("route"), "path", None))
+            end_span(span, sys.exc_info()[1] or (f"HTTP {status}" if status >= 500 else None))
+
+
+app.add_middleware(AccessLogMiddleware)
+
+
+def _ensure_column(cur, table: str, column: str, decl: str) -> None:
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def db_conn():
-    return sqlite3.connect(DB_PATH)
+    return sqlite3.connect(DB_PATH, factory=_TimedConnection)
 
 
 def init_db():
@@ -100,6 +857,7 @@ def init_db():
         )
         """
     )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_oauth_states_created_at ON oauth_states (created_at)")
 
     cur.execute(
         """
@@ -149,6 +907,180 @@ def init_db():
         """
     )
 
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_objects (
+            name TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_media_objects_refcount ON media_objects (refcount, updated_at)")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_handles (
+            content_hash TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            account TEXT NOT NULL,
+            handle TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            PRIMARY KEY (content_hash, platform, account)
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS caption_cache (
+            cache_key TEXT PRIMARY KEY,
+            captions JSON NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_used_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_caption_cache_last_used ON caption_cache (last_used_at)")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scheduled_post_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            external_id TEXT NOT NULL,
+            collected_at INTEGER NOT NULL,
+            metrics JSON NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_post_metrics_post ON post_metrics (scheduled_post_id, collected_at)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_metrics_daily (
+            scheduled_post_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            metrics JSON NOT NULL,
+            samples INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (scheduled_post_id, day)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_metrics_schedule (
+            scheduled_post_id INTEGER PRIMARY KEY,
+            next_collect_at INTEGER NOT NULL,
+            collect_count INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_post_metrics_schedule_next ON post_metrics_schedule (next_collect_at)")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            session_key TEXT PRIMARY KEY,
+            platform TEXT NOT NULL,
+            state JSON NOT NULL,
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_parts (
+            session_key TEXT NOT NULL,
+            part_index INTEGER NOT NULL,
+            result TEXT NOT NULL,
+            PRIMARY KEY (session_key, part_index)
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload JSON NOT NULL,
+            dedupe_key TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_at INTEGER NOT NULL,
+            lease_token TEXT,
+            locked_until INTEGER,
+            last_error TEXT,
+            created_at INTEGER NOT NULL,
+            started_at INTEGER,
+            finished_at INTEGER,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_finished_at ON jobs (status, finished_at)")
+    # At most one queued job per dedupe key, so a burst of identical webhooks coalesces.
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe_queued ON jobs (dedupe_key) WHERE status = 'queued'"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe_key ON jobs (dedupe_key)")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS replicate_predictions (
+            id TEXT PRIMARY KEY,
+            blog_post_id INTEGER,
+            library_key TEXT,
+            prompt TEXT NOT NULL,
+            status TEXT NOT NULL,
+            output_url TEXT,
+            error TEXT,
+            next_poll_at INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_replicate_predictions_pending ON replicate_predictions (status, next_poll_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_replicate_predictions_blog_post ON replicate_predictions (blog_post_id, created_at)"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS background_library (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            library_key TEXT NOT NULL,
+            media_name TEXT NOT NULL,
+            uses INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_used_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_background_library_key ON background_library (library_key, uses, last_used_at)")
+
+    # Trace context (W3C traceparent) of the work that created the row, so later stages
+    # continue the same trace.
+    _ensure_column(cur, "scheduled_posts", "trace_context", "TEXT")
+    _ensure_column(cur, "jobs", "trace_context", "TEXT")
+    _ensure_column(cur, "replicate_predictions", "trace_context", "TEXT")
+    # When a queued process_blog_post job was taken into another job's caption batch.
+    _ensure_column(cur, "jobs", "captions_claimed_at", "INTEGER")
+    # Each day's growth over the day before; metrics holds the day's totals.
+    _ensure_column(cur, "post_metrics_daily", "delta", "JSON")
+
     con.commit()
     con.close()
 
@@ -167,20 +1099,47 @@ def create_oauth_state(user_id: str, platform: str) -> str:
 
 
 def consume_oauth_state(state: str, platform: str) -> Dict[str, Any]:
+    """Atomically delete and return the state row, so each state can be used only once."""
     con = db_conn()
     cur = con.cursor()
     cur.execute(
-        "SELECT user_id, platform, meta, created_at FROM oauth_states WHERE state = ? AND platform = ?",
+        "DELETE FROM oauth_states WHERE state = ? AND platform = ? RETURNING user_id, platform, meta, created_at",
         (state, platform),
     )
     row = cur.fetchone()
+    con.commit()
     con.close()
     if not row:
         raise HTTPException(status_code=400, detail="Invalid or expired state")
-    created_at = row[2]
+    created_at = row[3]
     if _now_ts() - created_at > OAUTH_STATE_TTL_SECONDS:
         raise HTTPException(status_code=400, detail="State expired")
-    return {"user_id": row[0], "platform": row[1], "meta": json.loads(row[3] or "{}")}
+    return {"user_id": row[0], "platform": row[1], "meta": json.loads(row[2] or "{}")}
+
+
+def purge_expired_oauth_states(batch_size: int = OAUTH_STATE_SWEEP_BATCH_SIZE) -> int:
+    """Delete expired OAuth states in small batches so the write lock is never held for long."""
+    cutoff = _now_ts() - OAUTH_STATE_TTL_SECONDS
+    batch_size = max(1, int(batch_size))
+    deleted = 0
+    con = db_conn()
+    cur = con.cursor()
+    while True:
+        cur.execute(
+            """
+            DELETE FROM oauth_states
+            WHERE rowid IN (
+                SELECT rowid FROM oauth_states WHERE created_at < ? LIMIT ?
+            )
+            """,
+            (cutoff, batch_size),
+        )
+        con.commit()
+        deleted += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+    con.close()
+    return deleted
 
 
 def get_meta_oauth_config() -> tuple[str, str, str]:
@@ -195,7 +1154,7 @@ def get_meta_oauth_config() -> tuple[str, str, str]:
 def exchange_meta_code_for_token(code: str) -> str:
     app_id, app_secret, redirect_uri = get_meta_oauth_config()
     url = f"{META_GRAPH_BASE}/oauth/access_token"
-    resp = requests.get(
+    resp = http_session.get(
         url,
         params={
             "client_id": app_id,
@@ -219,7 +1178,7 @@ def exchange_meta_code_for_token(code: str) -> str:
 
 def get_facebook_page_access_token(user_access_token: str, page_id: str) -> str:
     url = f"{META_GRAPH_BASE}/{page_id}"
-    resp = requests.get(
+    resp = http_session.get(
         url,
         params={
             "fields": "access_token",
@@ -239,33 +1198,180 @@ def get_facebook_page_access_token(user_access_token: str, page_id: str) -> str:
     return str(page_token)
 
 
-@app.post("/automation/blog/webhook")
-def automation_blog_webhook(payload: Dict[str, Any], background_tasks: BackgroundTasks):
-    """Called by your custom website when a blog post is published."""
-    blog_post_id = _insert_blog_post(payload)
-    background_tasks.add_task(process_blog_post, blog_post_id)
-    return {"status": "accepted", "blog_post_id": blog_post_id}
+GRAPH_BATCH_MAX_OPERATIONS = 50
 
 
-@app.get("/automation/blog/recent")
-def automation_recent_blog_posts(user_id: str, limit: int = 20):
-    limit = max(1, min(int(limit), 50))
+def graph_batch(
+    access_token: str,
+    operations: List[Dict[str, Any]],
+    base: Optional[str] = None,
+    files: Optional[Dict[str, Any]] = None,
+    platform: str = "facebook",
+) -> List[Optional[Dict[str, Any]]]:
+    """Run Graph API calls as batch requests and return one {"code", "body"} per operation.
+
+    Each operation is {"method", "relative_url"} plus optional "body" (form-encoded
+    string), "name" and "attached_files". A later operation can use an earlier result
+    through a JSONPath reference such as "{result=publish:$.id}", so dependent calls
+    must fall within the same batch of GRAPH_BATCH_MAX_OPERATIONS. An entry is None
+    when Graph leaves out that response (omit_response_on_success).
+    """
+    base = base or META_GRAPH_BASE
+    results: List[Optional[Dict[str, Any]]] = []
+    for i in range(0, len(operations), GRAPH_BATCH_MAX_OPERATIONS):
+        chunk = operations[i:i + GRAPH_BATCH_MAX_OPERATIONS]
+        resp = http_session.post(
+            base + "/",
+            data={"access_token": access_token, "batch": json.dumps(chunk), "include_headers": "false"},
+            files=files,
+            timeout=120 if files else 30,
+        )
+        try:
+            data = resp.json()
+        except Exception:
+            data = {"raw": resp.text}
+        if resp.status_code >= 400 or not isinstance(data, list):
+            raise HTTPException(status_code=400, detail={"platform": platform, "error": data})
+
+        for item in data:
+            if item is None:
+                results.append(None)
+                continue
+            try:
+                body = json.loads(item.get("body") or "{}")
+            except Exception:
+                body = {"raw": item.get("body")}
+            results.append({"code": item.get("code", 500), "body": body})
+    return results
+
+
+def graph_batch_body(result: Optional[Dict[str, Any]], platform: str = "facebook") -> Dict[str, Any]:
+    """Body of one batch result, raising the same error shape as a direct call would."""
+    if result is None:
+        return {}
+    if result["code"] >= 400:
+        raise HTTPException(status_code=400, detail={"platform": platform, "error": result["body"]})
+    return result["body"]
+
+
+def _blog_delivery_key(payload: Dict[str, Any], delivery_id: Optional[str] = None) -> str:
+    """Identify one publish event: the sender's delivery id, or else the post and its publish time.
+
+    Redeliveries of the same event map to the same key. Only an explicit delivery id is
+    trusted to tell a redelivery from a deliberate resend once the first job has finished.
+    """
+    delivery_id = delivery_id or str(payload.get("delivery_id") or "").strip()
+    if delivery_id:
+        return f"process_blog_post:delivery:{delivery_id}"
+    source = "\n".join(
+        str(payload.get(field) or "").strip() for field in ("user_id", "url", "published_at")
+    )
+    return f"process_blog_post:source:{hashlib.sha256(source.encode()).hexdigest()[:32]}"
+
+
+def _accept_blog_post(payload: Dict[str, Any], delivery_id: Optional[str] = None) -> tuple[int, int]:
+    """Store a published post and queue its processing, unless this delivery was already seen.
+
+    The job is looked up before the post is written, so a redelivery changes nothing. An
+    explicit delivery id is remembered after its job has finished; without one, only a job
+    that is still queued absorbs the request, and sending a post again reprocesses it.
+    """
+    delivery_id = delivery_id or str(payload.get("delivery_id") or "").strip() or None
+    dedupe_key = _blog_delivery_key(payload, delivery_id)
     con = db_conn()
-    cur = con.cursor()
-    cur.execute(
-        """
-        SELECT id, url, title, published_at, created_at
-        FROM blog_posts
-        WHERE user_id = ?
-        ORDER BY created_at DESC
-        LIMIT ?
-        """,
-        (user_id, limit),
+    try:
+        existing = _deduped_job(con.cursor(), dedupe_key, finished=bool(delivery_id))
+    finally:
+        con.close()
+    if existing:
+        return existing[1]["blog_post_id"], existing[0]
+    blog_post_id = _insert_blog_post(payload)
+    job_id = enqueue_job(
+        "process_blog_post",
+        {"blog_post_id": blog_post_id},
+        dedupe_key=dedupe_key,
+        dedupe_finished=bool(delivery_id),
     )
-    rows = cur.fetchall()
-    con.close()
-    return {
-        "items": [
+    return blog_post_id, job_id
+
+
+@app.post("/automation/blog/webhook")
+def automation_blog_webhook(payload: Dict[str, Any], x_delivery_id: Optional[str] = Header(None)):
+    """Called by your custom website when a blog post is published.
+
+    Senders that retry should repeat the same X-Delivery-Id (or "delivery_id") on every attempt.
+    """
+    with trace_span("blog.webhook") as span:
+        blog_post_id, job_id = _accept_blog_post(payload, x_delivery_id)
+        span.set_attribute("blog_post_id", blog_post_id)
+    return {"status": "accepted", "blog_post_id": blog_post_id, "job_id": job_id, "trace_id": span.trace_id}
+
+
+@app.post("/automation/replicate/webhook")
+async def automation_replicate_webhook(request: Request):
+    """Completion callback for SDXL predictions; queues the render stage and returns."""
+    body = await request.body()
+    try:
+        pdata = json.loads(body or b"{}")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(pdata, dict) or not pdata.get("id"):
+        raise HTTPException(status_code=400, detail="Missing prediction id")
+
+    if REPLICATE_WEBHOOK_SECRET:
+        if not _verify_replicate_webhook(request.headers, body):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    else:
+        # Unsigned callbacks are only a hint; take the result from Replicate itself.
+        pdata = await asyncio.to_thread(_fetch_prediction, pdata["id"])
+
+    completed = await asyncio.to_thread(_apply_prediction_update, pdata)
+    return {"ok": True, "completed": completed}
+
+
+@app.post("/automation/blog/backfill")
+def automation_blog_backfill(payload: Dict[str, Any]):
+    """Queue many blog posts at once, e.g. when a site republishes its archive.
+
+    Each post is processed by its own job; their captions are generated in batches.
+    """
+    posts = payload.get("posts") or []
+    if not isinstance(posts, list) or not posts:
+        raise HTTPException(status_code=400, detail="posts must be a non-empty list")
+    if len(posts) > 500:
+        raise HTTPException(status_code=400, detail="at most 500 posts per backfill")
+
+    accepted = []
+    errors = []
+    for index, item in enumerate(posts):
+        try:
+            blog_post_id, job_id = _accept_blog_post(item if isinstance(item, dict) else {})
+        except HTTPException as e:
+            errors.append({"index": index, "error": e.detail})
+            continue
+        accepted.append({"blog_post_id": blog_post_id, "job_id": job_id})
+    return {"status": "accepted", "items": accepted, "errors": errors}
+
+
+@app.get("/automation/blog/recent")
+def automation_recent_blog_posts(user_id: str, limit: int = 20):
+    limit = max(1, min(int(limit), 50))
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT id, url, title, published_at, created_at
+        FROM blog_posts
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT ?
+        """,
+        (user_id, limit),
+    )
+    rows = cur.fetchall()
+    con.close()
+    return {
+        "items": [
             {
                 "id": r[0],
                 "url": r[1],
@@ -311,14 +1417,153 @@ def automation_scheduled_posts(user_id: str, limit: int = 50):
     }
 
 
+class _QueueCollector:
+    """Publisher and job queue gauges, read from SQLite at scrape time so every worker reports the same values."""
+
+    def collect(self):
+        now = _now_ts()
+        con = db_conn()
+        cur = con.cursor()
+        cur.execute(
+            "SELECT platform, COUNT(*), MIN(scheduled_at) FROM scheduled_posts WHERE status = 'scheduled' AND scheduled_at <= ? GROUP BY platform",
+            (now,),
+        )
+        publisher_rows = cur.fetchall()
+        cur.execute(
+            """
+            SELECT kind, status, COUNT(*), MIN(run_at) FROM jobs
+            WHERE status IN ('queued', 'running')
+            GROUP BY kind, status
+            """
+        )
+        job_rows = cur.fetchall()
+        cur.execute("SELECT COUNT(*) FROM replicate_predictions WHERE status = 'pending'")
+        pending_predictions = cur.fetchone()[0]
+        con.close()
+
+        backlog = GaugeMetricFamily(
+            "postify_publisher_backlog", "Scheduled posts that are due but not yet published.", labels=["platform"]
+        )
+        lag = GaugeMetricFamily(
+            "postify_publisher_lag_seconds", "Age of the oldest due, unpublished post.", labels=["platform"]
+        )
+        for platform, count, oldest in publisher_rows:
+            backlog.add_metric([platform], count)
+            lag.add_metric([platform], max(0, now - oldest))
+        yield backlog
+        yield lag
+
+        depth = GaugeMetricFamily("postify_jobs", "Queued and running jobs.", labels=["kind", "status"])
+        job_lag = GaugeMetricFamily(
+            "postify_job_queue_lag_seconds", "Age of the oldest runnable queued job.", labels=["kind"]
+        )
+        for kind, status, count, oldest_run_at in job_rows:
+            depth.add_metric([kind, status], count)
+            if status == "queued":
+                job_lag.add_metric([kind], max(0, now - oldest_run_at))
+        yield depth
+        yield job_lag
+
+        yield GaugeMetricFamily(
+            "postify_replicate_predictions_pending", "SDXL predictions still running.", value=pending_predictions
+        )
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint, aggregated over all workers in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    queue_registry = CollectorRegistry()
+    queue_registry.register(_QueueCollector())
+    return Response(generate_latest(registry) + generate_latest(queue_registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def _require_admin(admin_token: Optional[str]) -> None:
+    if not ADMIN_TOKEN or not admin_token or not hmac.compare_digest(admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.get("/admin/profile")
+async def admin_profile(
+    seconds: float = 10,
+    format: str = "collapsed",
+    interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS,
+    pid: Optional[int] = None,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Sample this worker's threads for `seconds`; folded stacks for flamegraphs, or format=top."""
+    _require_admin(x_admin_token)
+    if format not in ("collapsed", "top"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'top'")
+    # Each gunicorn worker only profiles itself; callers targeting one pid retry until they land on it.
+    if pid is not None and pid != os.getpid():
+        raise HTTPException(status_code=409, detail={"error": "wrong worker", "pid": os.getpid()})
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    interval_ms = max(1.0, interval_ms)
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail={"error": "profile already running", "pid": os.getpid()})
+    try:
+        samples = await asyncio.to_thread(sample_profile, seconds, interval_ms)
+    finally:
+        _profile_lock.release()
+    headers = {"X-Worker-Pid": str(os.getpid())}
+    if format == "top":
+        return Response(
+            json.dumps(
+                {
+                    "pid": os.getpid(),
+                    "seconds": seconds,
+                    "interval_ms": interval_ms,
+                    "samples": sum(samples.values()),
+                    "functions": _top_functions(samples),
+                }
+            ),
+            media_type="application/json",
+            headers=headers,
+        )
+    body = "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items()))
+    return PlainTextResponse(body, headers=headers)
+
+
+@app.get("/admin/slow-captures")
+def admin_slow_captures(limit: int = 20, x_admin_token: Optional[str] = Header(None)):
+    """Most recent slow request / publisher cycle captures held by this worker."""
+    _require_admin(x_admin_token)
+    captures = list(_slow_captures)[-max(1, limit):]
+    return {"pid": os.getpid(), "captures": list(reversed(captures))}
+
+
 @app.on_event("startup")
 def on_startup():
     init_db()
+    preload_fonts()
 
     scheduler = BackgroundScheduler(timezone=ZoneInfo(DEFAULT_TZ))
     scheduler.add_job(publish_due_scheduled_posts, "interval", seconds=30)
+    scheduler.add_job(purge_expired_oauth_states, "interval", seconds=OAUTH_STATE_SWEEP_INTERVAL_SECONDS)
+    scheduler.add_job(gc_media, "interval", seconds=MEDIA_GC_INTERVAL_SECONDS)
+    scheduler.add_job(collect_post_metrics, "interval", seconds=METRICS_COLLECT_INTERVAL_SECONDS)
+    scheduler.add_job(purge_finished_jobs, "interval", seconds=3600)
+    scheduler.add_job(poll_replicate_predictions, "interval", seconds=REPLICATE_POLL_INTERVAL_SECONDS)
+    scheduler.add_job(refill_background_library, "interval", seconds=BACKGROUND_LIBRARY_REFILL_INTERVAL_SECONDS)
     scheduler.start()
 
+    start_job_workers()
+    start_access_log()
+    start_slow_watchdog()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_job_workers()
+    shutdown_render_pool()
+    stop_slow_watchdog()
+    stop_access_log()
+
 
 def _hex_to_rgb(h: str):
     h = (h or "").strip().lstrip("#")
@@ -329,16 +1574,30 @@ def _hex_to_rgb(h: str):
     return (int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16))
 
 
+@functools.lru_cache(maxsize=1)
+def _resolve_font_source() -> Optional[str]:
+    """Pick the first usable TrueType font once per process; None means Pillow's bitmap default."""
+    candidates = ([FONT_PATH] if FONT_PATH and Path(FONT_PATH).exists() else []) + FONT_FALLBACKS
+    for candidate in candidates:
+        try:
+            ImageFont.truetype(candidate, size=12)
+            return candidate
+        except Exception:
+            continue
+    return None
+
+
+@functools.lru_cache(maxsize=None)
 def _load_font(size: int) -> ImageFont.ImageFont:
-    try:
-        if FONT_PATH and Path(FONT_PATH).exists():
-            return ImageFont.truetype(FONT_PATH, size=size)
-    except Exception:
-        pass
-    try:
-        return ImageFont.truetype("arial.ttf", size=size)
-    except Exception:
-        return ImageFont.load_default()
+    source = _resolve_font_source()
+    if source:
+        return ImageFont.truetype(source, size=size)
+    return ImageFont.load_default()
+
+
+def preload_fonts(sizes: Optional[List[int]] = None) -> None:
+    for size in sizes if sizes is not None else FONT_PRELOAD_SIZES:
+        _load_font(size)
 
 
 def _now_ts() -> int:
@@ -369,224 +1628,950 @@ def _peak_time_for(platform: str, base_dt: datetime.datetime) -> datetime.dateti
     return base_dt.replace(hour=12, minute=0, second=0, microsecond=0)
 
 
-def _generate_captions_openai(title: str, url: str, excerpt: str, tags: List[str]) -> Dict[str, Any]:
-    if not OPENAI_API_KEY:
-        return {
-            "instagram": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog", "#marketing"]},
-            "facebook": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog"]},
-            "twitter": {"caption": f"{title}\n\n{url}", "hashtags": ["#marketing"]},
-            "linkedin": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#marketing"]},
-        }
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    prompt = {
-        "brand": BRAND_NAME,
-        "title": title,
-        "url": url,
-        "excerpt": excerpt,
-        "tags": tags,
-        "rules": [
-            "Do not invent facts or statistics.",
-            "Keep X (Twitter) concise and high-engagement.",
-            "Return JSON only.",
-        ],
-        "output_schema": {
-            "instagram": {"caption": "string", "hashtags": ["string"]},
-            "facebook": {"caption": "string", "hashtags": ["string"]},
-            "twitter": {"caption": "string", "hashtags": ["string"]},
-            "linkedin": {"caption": "string", "hashtags": ["string"]},
-        },
+def _fallback_captions(title: str, url: str, excerpt: str) -> Dict[str, Any]:
+    return {
+        "instagram": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog", "#marketing"]},
+        "facebook": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog"]},
+        "twitter": {"caption": f"{title}\n\n{url}", "hashtags": ["#marketing"]},
+        "linkedin": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#marketing"]},
     }
 
-    res = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a social media strategist."},
-            {"role": "user", "content": json.dumps(prompt)},
-        ],
-        temperature=0.7,
-    )
 
-    content = res.choices[0].message.content
-    try:
-        return json.loads(content)
-    except Exception:
-        return {
-            "instagram": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog", "#marketing"]},
-            "facebook": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#blog"]},
-            "twitter": {"caption": f"{title}\n\n{url}", "hashtags": ["#marketing"]},
-            "linkedin": {"caption": f"{title}\n\n{excerpt}\n\nRead: {url}", "hashtags": ["#marketing"]},
-        }
+@functools.lru_cache(maxsize=1)
+def _openai_client() -> OpenAI:
+    return OpenAI(api_key=OPENAI_API_KEY)
 
 
-def _replicate_sdxl_generate(prompt: str) -> Optional[bytes]:
-    if not REPLICATE_API_TOKEN or not REPLICATE_SDXL_MODEL_VERSION:
-        return None
+def _caption_cache_key(title: str, url: str, excerpt: str, tags: List[str]) -> str:
+    material = json.dumps(
+        [OPENAI_MODEL, BRAND_NAME, title, url, excerpt, list(tags or []), CAPTION_PROMPT_VERSION],
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
 
-    headers = {
-        "Authorization": f"Token {REPLICATE_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
 
-    create = requests.post(
-        "https://api.replicate.com/v1/predictions",
-        headers=headers,
-        json={
-            "version": REPLICATE_SDXL_MODEL_VERSION,
-            "input": {
-                "prompt": prompt,
-                "width": 1080,
-                "height": 1350,
-                "num_outputs": 1,
-            },
-        },
-        timeout=60,
+def _caption_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT captions FROM caption_cache WHERE cache_key = ? AND created_at > ?",
+        (key, now - CAPTION_CACHE_TTL_SECONDS),
     )
-    if create.status_code >= 400:
-        return None
-    pred = create.json()
-    pred_url = pred.get("urls", {}).get("get")
-    if not pred_url:
-        return None
+    row = cur.fetchone()
+    if row:
+        cur.execute("UPDATE caption_cache SET last_used_at = ? WHERE cache_key = ?", (now, key))
+        con.commit()
+    con.close()
+    return json.loads(row[0]) if row else None
 
-    for _ in range(30):
-        getp = requests.get(pred_url, headers=headers, timeout=30)
-        if getp.status_code >= 400:
-            return None
-        pdata = getp.json()
-        status = pdata.get("status")
-        if status == "succeeded":
-            out = pdata.get("output")
-            if isinstance(out, list) and out:
-                img_url = out[0]
-                img_resp = requests.get(img_url, timeout=60)
-                if img_resp.status_code >= 400:
-                    return None
-                return img_resp.content
-            return None
-        if status in ("failed", "canceled"):
-            return None
-        time.sleep(2)
 
-    return None
+def _caption_cache_put(key: str, captions: Dict[str, Any]) -> None:
+    """Store captions, then trim expired rows and the least recently used beyond CAPTION_CACHE_MAX_ENTRIES."""
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "INSERT OR REPLACE INTO caption_cache (cache_key, captions, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+        (key, json.dumps(captions), now, now),
+    )
+    cur.execute("DELETE FROM caption_cache WHERE created_at <= ?", (now - CAPTION_CACHE_TTL_SECONDS,))
+    cur.execute(
+        """
+        DELETE FROM caption_cache WHERE cache_key IN (
+            SELECT cache_key FROM caption_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+        )
+        """,
+        (CAPTION_CACHE_MAX_ENTRIES,),
+    )
+    con.commit()
+    con.close()
 
 
-def _fallback_background(size: tuple[int, int]) -> Image.Image:
-    w, h = size
-    primary = _hex_to_rgb(BRAND_PRIMARY)
-    secondary = _hex_to_rgb(BRAND_SECONDARY)
-    img = Image.new("RGB", (w, h), primary)
-    draw = ImageDraw.Draw(img)
-    for y in range(h):
-        t = y / max(h - 1, 1)
-        r = int(primary[0] * (1 - t) + secondary[0] * t)
-        g = int(primary[1] * (1 - t) + secondary[1] * t)
-        b = int(primary[2] * (1 - t) + secondary[2] * t)
-        draw.line([(0, y), (w, y)], fill=(r, g, b))
-    return img
+CAPTION_PLATFORMS = ("instagram", "facebook", "twitter", "linkedin")
+CAPTION_RULES = [
+    "Do not invent facts or statistics.",
+    "Keep X (Twitter) concise and high-engagement.",
+    "Return JSON only.",
+]
+CAPTION_OUTPUT_SCHEMA = {platform: {"caption": "string", "hashtags": ["string"]} for platform in CAPTION_PLATFORMS}
 
 
-def _render_template(background: Image.Image, title: str, cta: str) -> Image.Image:
-    img = background.convert("RGB")
-    w, h = img.size
-    draw = ImageDraw.Draw(img)
+def _validate_caption_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """Normalised section if entry has a non-empty caption and a list of string hashtags."""
+    if not isinstance(entry, dict):
+        return None
+    caption = entry.get("caption")
+    hashtags = entry.get("hashtags") or []
+    if not isinstance(caption, str) or not caption.strip():
+        return None
+    if not isinstance(hashtags, list) or not all(isinstance(h, str) for h in hashtags):
+        return None
+    return {"caption": caption.strip(), "hashtags": [h.strip() for h in hashtags if h.strip()]}
+
+
+def _valid_caption_sections(data: Any, platforms=CAPTION_PLATFORMS) -> Dict[str, Dict[str, Any]]:
+    if not isinstance(data, dict):
+        return {}
+    sections = {}
+    for platform in platforms:
+        entry = _validate_caption_entry(data.get(platform))
+        if entry is not None:
+            sections[platform] = entry
+    return sections
+
+
+def _iter_json_members(chunks: Iterable[str]) -> Iterator[tuple[str, Any]]:
+    """Yield (key, value) for each top-level member of a streamed JSON object as soon as it closes.
+
+    A member that does not parse is skipped rather than failing the whole object.
+    """
+    buf = ""
+    pos = 0
+    depth = 0
+    in_string = escaped = False
+    member_start = None
+    for chunk in chunks:
+        buf += chunk
+        while pos < len(buf):
+            ch = buf[pos]
+            member_end = False
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+                if depth == 1:
+                    member_start = pos + 1
+            elif ch in "}]":
+                member_end = depth == 1
+                depth -= 1
+            elif ch == "," and depth == 1:
+                member_end = True
+
+            if member_end and member_start is not None:
+                text = buf[member_start:pos].strip()
+                member_start = pos + 1
+                if text:
+                    try:
+                        member = json.loads("{" + text + "}")
+                    except ValueError:
+                        member = {}
+                    yield from member.items()
+            pos += 1
 
-    accent = _hex_to_rgb(BRAND_ACCENT)
-    card_h = int(h * 0.35)
-    draw.rectangle([0, h - card_h, w, h], fill=(255, 255, 255))
 
-    title_font = _load_font(54)
-    small_font = _load_font(28)
+def _caption_messages(title: str, url: str, excerpt: str, tags: List[str], platforms=CAPTION_PLATFORMS) -> List[Dict[str, str]]:
+    prompt = {
+        "brand": BRAND_NAME,
+        "title": title,
+        "url": url,
+        "excerpt": excerpt,
+        "tags": tags,
+        "rules": CAPTION_RULES,
+        "output_schema": {platform: CAPTION_OUTPUT_SCHEMA[platform] for platform in platforms},
+    }
+    return [
+        {"role": "system", "content": "You are a social media strategist."},
+        {"role": "user", "content": json.dumps(prompt)},
+    ]
+
+
+def _stream_caption_sections(
+    title: str, url: str, excerpt: str, tags: List[str], platforms=CAPTION_PLATFORMS
+) -> Dict[str, Dict[str, Any]]:
+    """Stream a JSON-mode completion for the given platforms and return the sections that validate.
+
+    Each platform section is validated the moment it closes, and the stream is dropped
+    as soon as every requested platform is valid. A cut-off stream keeps whatever
+    sections were already complete.
+    """
+    operation = "captions" if len(platforms) == len(CAPTION_PLATFORMS) else "caption_retry"
+    started = time.perf_counter()
+    try:
+        stream = _openai_client().chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=_caption_messages(title, url, excerpt, tags, platforms),
+            temperature=0.7,
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+    except Exception:
+        LLM_SECONDS.labels(operation, "error").observe(time.perf_counter() - started)
+        raise
+    sections: Dict[str, Dict[str, Any]] = {}
+    try:
+        deltas = (chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+        for key, value in _iter_json_members(deltas):
+            if key in platforms and key not in sections:
+                entry = _validate_caption_entry(value)
+                if entry is not None:
+                    sections[key] = entry
+                    if len(sections) == len(platforms):
+                        break
+    except Exception:
+        pass
+    finally:
+        stream.close()
+    status = "ok" if len(sections) == len(platforms) else "invalid"
+    LLM_SECONDS.labels(operation, status).observe(time.perf_counter() - started)
+    return sections
 
-    x_pad = 60
-    y = h - card_h + 40
-    max_width = w - (x_pad * 2)
 
-    words = (title or "").split()
-    lines: List[str] = []
-    cur = ""
-    for word in words:
-        test = (cur + " " + word).strip()
-        tw = draw.textlength(test, font=title_font)
-        if tw <= max_width:
-            cur = test
+def _complete_captions(
+    title: str, url: str, excerpt: str, tags: List[str], sections: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Fill in platforms missing from sections and cache the result if the model wrote all of them.
+
+    Missing or malformed platforms are asked for once more on their own, which is a
+    much smaller completion than the full set; any still missing use the templates.
+    """
+    sections = dict(sections)
+    missing = [platform for platform in CAPTION_PLATFORMS if platform not in sections]
+    if missing:
+        try:
+            sections.update(_stream_caption_sections(title, url, excerpt, tags, missing))
+        except Exception:
+            pass
+
+    if all(platform in sections for platform in CAPTION_PLATFORMS):
+        captions = {platform: sections[platform] for platform in CAPTION_PLATFORMS}
+        _caption_cache_put(_caption_cache_key(title, url, excerpt, tags), captions)
+        return captions
+    fallback = _fallback_captions(title, url, excerpt)
+    return {platform: sections.get(platform) or fallback[platform] for platform in CAPTION_PLATFORMS}
+
+
+def _generate_captions_openai(title: str, url: str, excerpt: str, tags: List[str]) -> Dict[str, Any]:
+    if not OPENAI_API_KEY:
+        return _fallback_captions(title, url, excerpt)
+
+    cache_key = _caption_cache_key(title, url, excerpt, tags)
+    cached = _caption_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    sections = _stream_caption_sections(title, url, excerpt, tags)
+    return _complete_captions(title, url, excerpt, tags, sections)
+
+
+def generate_captions_batch(posts: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Captions for several blog posts, keyed by post id.
+
+    Cached posts are served from the caption cache; the rest are sent CAPTION_BATCH_SIZE
+    at a time in one multi-item prompt. Each returned item is matched back by id and
+    validated per platform, and only the platforms the model dropped or malformed are
+    asked for again.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = []
+    for post in posts:
+        if not OPENAI_API_KEY:
+            results[post["id"]] = _fallback_captions(post["title"], post["url"], post["excerpt"])
+            continue
+        key = _caption_cache_key(post["title"], post["url"], post["excerpt"], post["tags"])
+        cached = _caption_cache_get(key)
+        if cached is not None:
+            results[post["id"]] = cached
         else:
-            if cur:
-                lines.append(cur)
-            cur = word
-    if cur:
-        lines.append(cur)
-    lines = lines[:3]
+            pending.append(post)
+
+    for i in range(0, len(pending), max(1, CAPTION_BATCH_SIZE)):
+        chunk = pending[i:i + max(1, CAPTION_BATCH_SIZE)]
+        if len(chunk) == 1:
+            post = chunk[0]
+            results[post["id"]] = _generate_captions_openai(post["title"], post["url"], post["excerpt"], post["tags"])
+            continue
+
+        prompt = {
+            "brand": BRAND_NAME,
+            "items": [
+                {
+                    "id": str(post["id"]),
+                    "title": post["title"],
+                    "url": post["url"],
+                    "excerpt": post["excerpt"],
+                    "tags": post["tags"],
+                }
+                for post in chunk
+            ],
+            "rules": CAPTION_RULES + ["Write captions for every item independently and return each with its id."],
+            "output_schema": {"items": [dict(id="string", **CAPTION_OUTPUT_SCHEMA)]},
+        }
+        started = time.perf_counter()
+        try:
+            res = _openai_client().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a social media strategist."},
+                    {"role": "user", "content": json.dumps(prompt)},
+                ],
+                temperature=0.7,
+                response_format={"type": "json_object"},
+            )
+            returned = json.loads(res.choices[0].message.content).get("items") or []
+            items = {str(item.get("id")): item for item in returned if isinstance(item, dict)}
+            LLM_SECONDS.labels("caption_batch", "ok").observe(time.perf_counter() - started)
+        except Exception:
+            items = {}
+            LLM_SECONDS.labels("caption_batch", "error").observe(time.perf_counter() - started)
 
-    for line in lines:
-        draw.text((x_pad, y), line, fill=(15, 23, 42), font=title_font)
-        y += 64
+        for post in chunk:
+            sections = _valid_caption_sections(items.get(str(post["id"])))
+            results[post["id"]] = _complete_captions(post["title"], post["url"], post["excerpt"], post["tags"], sections)
+    return results
 
-    badge_text = cta
-    badge_w = int(draw.textlength(badge_text, font=small_font)) + 44
-    badge_h = 52
-    bx = x_pad
-    by = h - 70
-    draw.rounded_rectangle([bx, by - badge_h, bx + badge_w, by], radius=14, fill=accent)
-    draw.text((bx + 22, by - badge_h + 12), badge_text, fill=(255, 255, 255), font=small_font)
 
-    draw.text((w - x_pad - 220, h - 60), BRAND_NAME, fill=(30, 41, 59), font=small_font)
-    return img
+def _replicate_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Token {REPLICATE_API_TOKEN}",
+        "Content-Type": "application/json",
+    }
 
 
-def _save_image(img: Image.Image, prefix: str) -> str:
-    Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
-    name = f"{prefix}_{uuid.uuid4().hex}.png"
-    path = Path(UPLOAD_DIR) / name
-    img.save(path, format="PNG", optimize=True)
-    return name
+def replicate_start_prediction(
+    prompt: str,
+    blog_post_id: Optional[int] = None,
+    library_key: Optional[str] = None,
+) -> Optional[str]:
+    """Submit an SDXL prediction and return its id without waiting for it.
 
+    The prediction is tracked in replicate_predictions and completed by the Replicate
+    webhook or by poll_replicate_predictions. With a library_key the output is also
+    added to that background library. Returns None when Replicate is not configured or
+    rejects the request, in which case callers use the fallback background.
+    """
+    if not REPLICATE_API_TOKEN or not REPLICATE_SDXL_MODEL_VERSION:
+        return None
 
-def _insert_blog_post(payload: Dict[str, Any]) -> int:
-    user_id = str(payload.get("user_id") or "").strip()
-    url = str(payload.get("url") or "").strip()
-    title = str(payload.get("title") or "").strip()
-    excerpt = str(payload.get("excerpt") or "").strip()
-    hero_image_url = str(payload.get("hero_image_url") or "").strip() or None
-    tags = payload.get("tags") or []
-    published_at = str(payload.get("published_at") or "").strip() or None
+    body: Dict[str, Any] = {
+        "version": REPLICATE_SDXL_MODEL_VERSION,
+        "input": {
+            "prompt": prompt,
+            "width": 1080,
+            "height": 1350,
+            "num_outputs": 1,
+        },
+    }
+    if REPLICATE_WEBHOOKS_ENABLED:
+        body["webhook"] = f"{BACKEND_PUBLIC_BASE}/automation/replicate/webhook"
+        body["webhook_events_filter"] = ["completed"]
 
-    if not user_id or not url or not title:
-        raise HTTPException(status_code=400, detail="user_id, url, title are required")
+    try:
+        create = http_session.post(f"{REPLICATE_API_BASE}/predictions", headers=_replicate_headers(), json=body, timeout=60)
+    except requests.RequestException:
+        return None
+    if create.status_code >= 400:
+        return None
+    prediction_id = create.json().get("id")
+    if not prediction_id:
+        return None
 
+    now = _now_ts()
+    first_poll = REPLICATE_WEBHOOK_POLL_GRACE_SECONDS if REPLICATE_WEBHOOKS_ENABLED else REPLICATE_POLL_INTERVAL_SECONDS
     con = db_conn()
     cur = con.cursor()
     cur.execute(
         """
-        INSERT OR IGNORE INTO blog_posts (user_id, url, title, excerpt, hero_image_url, tags, published_at, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT OR IGNORE INTO replicate_predictions
+            (id, blog_post_id, library_key, prompt, status, next_poll_at, trace_context, created_at, updated_at)
+        VALUES (?, ?, ?, ?, 'pending', ?, ?, ?, ?)
         """,
-        (
-            user_id,
-            url,
-            title,
-            excerpt,
-            hero_image_url,
-            json.dumps(tags),
-            published_at,
-            _now_ts(),
-        ),
+        (prediction_id, blog_post_id, library_key, prompt, now + first_poll, current_traceparent(), now, now),
     )
     con.commit()
-
-    cur.execute("SELECT id FROM blog_posts WHERE user_id = ? AND url = ?", (user_id, url))
-    row = cur.fetchone()
     con.close()
-    if not row:
-        raise HTTPException(status_code=500, detail="failed to insert blog post")
-    return int(row[0])
+    return prediction_id
 
 
-def _get_blog_post(blog_post_id: int) -> Dict[str, Any]:
+def _prediction_output_url(pdata: Dict[str, Any]) -> Optional[str]:
+    out = pdata.get("output")
+    if isinstance(out, list) and out:
+        return out[0]
+    if isinstance(out, str) and out:
+        return out
+    return None
+
+
+def _complete_prediction(prediction_id: str, status: str, output_url: Optional[str], error: Optional[str]) -> bool:
+    """Record a finished prediction and queue the stage waiting on it.
+
+    Only the first completion wins, so a webhook and the poller (or several API
+    processes) reporting the same prediction queue the follow-up once.
+    """
+    now = _now_ts()
     con = db_conn()
     cur = con.cursor()
     cur.execute(
-        "SELECT id, user_id, url, title, excerpt, hero_image_url, tags, published_at FROM blog_posts WHERE id = ?",
+        """
+        UPDATE replicate_predictions
+        SET status = ?, output_url = ?, error = ?, updated_at = ?
+        WHERE id = ? AND status = 'pending'
+        RETURNING blog_post_id, library_key, trace_context
+        """,
+        (status, output_url, error, now, prediction_id),
+    )
+    row = cur.fetchone()
+    con.commit()
+    con.close()
+    if not row:
+        return False
+    if row[0] is not None:
+        enqueue_job(
+            "render_blog_post",
+            {"blog_post_id": row[0], "prediction_id": prediction_id},
+            dedupe_key=f"render_blog_post:{prediction_id}",
+            trace_context=row[2],
+        )
+    elif row[1] is not None and status == "succeeded":
+        enqueue_job(
+            "store_library_background",
+            {"prediction_id": prediction_id},
+            dedupe_key=f"store_library_background:{prediction_id}",
+            trace_context=row[2],
+        )
+    return True
+
+
+def _apply_prediction_update(pdata: Dict[str, Any]) -> bool:
+    status = pdata.get("status")
+    if status not in ("succeeded", "failed", "canceled"):
+        return False
+    output_url = _prediction_output_url(pdata) if status == "succeeded" else None
+    error = pdata.get("error")
+    return _complete_prediction(pdata["id"], status, output_url, str(error) if error else None)
+
+
+def poll_replicate_predictions(limit: int = 50) -> int:
+    """Check each pending prediction once; never waits on one.
+
+    With webhooks enabled this only catches predictions whose callback was missed.
+    Predictions older than REPLICATE_PREDICTION_TIMEOUT_SECONDS are cancelled and
+    completed as failed, so their blog posts render on the fallback background.
+    """
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT id, created_at FROM replicate_predictions
+        WHERE status = 'pending' AND next_poll_at <= ?
+        ORDER BY next_poll_at ASC
+        LIMIT ?
+        """,
+        (now, max(1, int(limit))),
+    )
+    rows = cur.fetchall()
+    con.close()
+
+    completed = 0
+    for prediction_id, created_at in rows:
+        if now - created_at > REPLICATE_PREDICTION_TIMEOUT_SECONDS:
+            try:
+                http_session.post(
+                    f"{REPLICATE_API_BASE}/predictions/{prediction_id}/cancel", headers=_replicate_headers(), timeout=30
+                )
+            except requests.RequestException:
+                pass
+            completed += _complete_prediction(prediction_id, "failed", None, "timed out")
+            continue
+
+        try:
+            resp = http_session.get(f"{REPLICATE_API_BASE}/predictions/{prediction_id}", headers=_replicate_headers(), timeout=30)
+            pdata = resp.json() if resp.status_code < 400 else {}
+        except (requests.RequestException, ValueError):
+            pdata = {}
+        if pdata.get("id") == prediction_id and _apply_prediction_update(pdata):
+            completed += 1
+            continue
+
+        con = db_conn()
+        cur = con.cursor()
+        cur.execute(
+            "UPDATE replicate_predictions SET next_poll_at = ?, updated_at = ? WHERE id = ? AND status = 'pending'",
+            (now + REPLICATE_POLL_INTERVAL_SECONDS, now, prediction_id),
+        )
+        con.commit()
+        con.close()
+    return completed
+
+
+def _verify_replicate_webhook(headers: Any, body: bytes) -> bool:
+    """Check Replicate's webhook signature (the Standard Webhooks scheme)."""
+    webhook_id = headers.get("webhook-id") or ""
+    timestamp = headers.get("webhook-timestamp") or ""
+    signatures = headers.get("webhook-signature") or ""
+    if not webhook_id or not timestamp.isdigit() or abs(_now_ts() - int(timestamp)) > 5 * 60:
+        return False
+    key = base64.b64decode(REPLICATE_WEBHOOK_SECRET.split("_", 1)[-1])
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    return any(
+        hmac.compare_digest(expected, sig.split(",", 1)[-1]) for sig in signatures.split() if sig.startswith("v1,")
+    )
+
+
+def _fetch_prediction(prediction_id: str) -> Dict[str, Any]:
+    resp = http_session.get(f"{REPLICATE_API_BASE}/predictions/{prediction_id}", headers=_replicate_headers(), timeout=30)
+    try:
+        data = resp.json()
+    except Exception:
+        data = {"raw": resp.text}
+    if resp.status_code >= 400:
+        raise HTTPException(status_code=400, detail={"platform": "replicate", "error": data})
+    return data
+
+
+def _download_prediction_output(output_url: Optional[str]) -> Optional[bytes]:
+    if not output_url:
+        return None
+    try:
+        img_resp = http_session.get(output_url, timeout=60)
+    except requests.RequestException:
+        return None
+    if img_resp.status_code >= 400:
+        return None
+    return img_resp.content
+
+
+def _background_library_key(prompt: str) -> str:
+    material = json.dumps([prompt, REPLICATE_SDXL_MODEL_VERSION, BRAND_PRIMARY, BRAND_SECONDARY, BRAND_ACCENT])
+    return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+
+def take_library_background(prompt: str) -> Optional[bytes]:
+    """A ready background for prompt from the library, or None if it is empty.
+
+    The least used (then least recently used) background is served, so posts rotate
+    through the pool. It is retired once it reaches BACKGROUND_LIBRARY_MAX_USES.
+    """
+    if BACKGROUND_LIBRARY_SIZE <= 0:
+        return None
+    key = _background_library_key(prompt)
+    for _ in range(3):
+        now = _now_ts()
+        con = db_conn()
+        cur = con.cursor()
+        cur.execute(
+            """
+            UPDATE background_library SET uses = uses + 1, last_used_at = ?
+            WHERE id = (
+                SELECT id FROM background_library
+                WHERE library_key = ? AND uses < ?
+                ORDER BY uses ASC, last_used_at ASC
+                LIMIT 1
+            )
+            RETURNING id, media_name, uses
+            """,
+            (now, key, max(1, BACKGROUND_LIBRARY_MAX_USES)),
+        )
+        row = cur.fetchone()
+        con.commit()
+        con.close()
+        if not row:
+            return None
+        entry_id, media_name, uses = row
+        try:
+            img_bytes = _media_path(media_name).read_bytes()
+        except OSError:
+            img_bytes = None
+        if img_bytes is None or uses >= BACKGROUND_LIBRARY_MAX_USES:
+            _retire_library_background(entry_id, media_name)
+        if img_bytes is not None:
+            return img_bytes
+    return None
+
+
+def _retire_library_background(entry_id: int, media_name: str) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute("DELETE FROM background_library WHERE id = ?", (entry_id,))
+    deleted = cur.rowcount
+    con.commit()
+    con.close()
+    if deleted:
+        release_media(media_name)
+
+
+def add_library_background(library_key: str, img_bytes: bytes, uses: int = 0) -> None:
+    if uses >= BACKGROUND_LIBRARY_MAX_USES:
+        return
+    try:
+        fmt = Image.open(io.BytesIO(img_bytes)).format
+    except Exception:
+        return
+    media_name = store_media(img_bytes, IMAGE_FORMAT_EXTENSIONS.get(fmt, "png"))
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "INSERT INTO background_library (library_key, media_name, uses, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+        (library_key, media_name, uses, now, now),
+    )
+    con.commit()
+    con.close()
+
+
+def refill_background_library(prompt: Optional[str] = None) -> int:
+    """Start predictions until ready plus in-flight backgrounds reach BACKGROUND_LIBRARY_SIZE.
+
+    Returns how many were started. The deficit is claimed under the write lock with
+    'claimed' placeholder rows before any prediction starts, so concurrent refills (several
+    workers, or a burst of blog posts) never over-request. Predictions complete
+    asynchronously and are added to the library by the store_library_background job.
+    """
+    if BACKGROUND_LIBRARY_SIZE <= 0 or not REPLICATE_API_TOKEN or not REPLICATE_SDXL_MODEL_VERSION:
+        return 0
+    prompt = prompt or _blog_background_prompt()
+    key = _background_library_key(prompt)
+    now = _now_ts()
+    con = db_conn()
+    try:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        # A claim outlives its refill only if that process died mid-request.
+        cur.execute(
+            "DELETE FROM replicate_predictions WHERE status = 'claimed' AND created_at < ?",
+            (now - LIBRARY_CLAIM_TTL_SECONDS,),
+        )
+        cur.execute("SELECT COUNT(*) FROM background_library WHERE library_key = ?", (key,))
+        ready = cur.fetchone()[0]
+        cur.execute(
+            "SELECT COUNT(*) FROM replicate_predictions WHERE library_key = ? AND status IN ('pending', 'claimed')",
+            (key,),
+        )
+        in_flight = cur.fetchone()[0]
+        claims = [f"claim:{uuid.uuid4().hex}" for _ in range(BACKGROUND_LIBRARY_SIZE - ready - in_flight)]
+        cur.executemany(
+            """
+            INSERT INTO replicate_predictions
+                (id, blog_post_id, library_key, prompt, status, next_poll_at, created_at, updated_at)
+            VALUES (?, NULL, ?, ?, 'claimed', 0, ?, ?)
+            """,
+            [(claim, key, prompt, now, now) for claim in claims],
+        )
+        con.commit()
+    finally:
+        con.close()
+
+    started = 0
+    try:
+        for claim in claims:
+            if replicate_start_prediction(prompt, library_key=key) is None:
+                break
+            started += 1
+            # The prediction's own pending row now holds this slot.
+            _release_library_claims([claim])
+    finally:
+        _release_library_claims(claims[started:])
+    return started
+
+
+def _release_library_claims(claims: List[str]) -> None:
+    if not claims:
+        return
+    con = db_conn()
+    try:
+        con.executemany("DELETE FROM replicate_predictions WHERE id = ? AND status = 'claimed'", [(c,) for c in claims])
+        con.commit()
+    finally:
+        con.close()
+
+
+@functools.lru_cache(maxsize=8)
+def _gradient_background(size: tuple[int, int], primary: str, secondary: str) -> Image.Image:
+    w, h = size
+    start = _hex_to_rgb(primary)
+    end = _hex_to_rgb(secondary)
+    # Colour a single 1px column through per-channel lookup tables, then stretch it sideways.
+    ramp = Image.frombytes("L", (1, h), bytes(255 * y // max(h - 1, 1) for y in range(h)))
+    bands = [
+        ramp.point([int(start[c] + (end[c] - start[c]) * v / 255) for v in range(256)])
+        for c in range(3)
+    ]
+    return Image.merge("RGB", bands).resize((w, h), Image.Resampling.NEAREST)
+
+
+def _brand_defaults() -> Dict[str, str]:
+    return {
+        "name": BRAND_NAME,
+        "primary": BRAND_PRIMARY,
+        "secondary": BRAND_SECONDARY,
+        "accent": BRAND_ACCENT,
+    }
+
+
+def _fallback_background(size: tuple[int, int], brand: Optional[Dict[str, str]] = None) -> Image.Image:
+    brand = brand or _brand_defaults()
+    return _gradient_background(tuple(size), brand["primary"], brand["secondary"]).copy()
+
+
+def _render_template(background: Image.Image, title: str, cta: str, brand: Optional[Dict[str, str]] = None) -> Image.Image:
+    brand = brand or _brand_defaults()
+    img = background.convert("RGB")
+    w, h = img.size
+    draw = ImageDraw.Draw(img)
+
+    accent = _hex_to_rgb(brand["accent"])
+    card_h = int(h * 0.35)
+    draw.rectangle([0, h - card_h, w, h], fill=(255, 255, 255))
+
+    title_font = _load_font(54)
+    small_font = _load_font(28)
+
+    x_pad = 60
+    y = h - card_h + 40
+    max_width = w - (x_pad * 2)
+
+    words = (title or "").split()
+    lines: List[str] = []
+    cur = ""
+    for word in words:
+        test = (cur + " " + word).strip()
+        tw = draw.textlength(test, font=title_font)
+        if tw <= max_width:
+            cur = test
+        else:
+            if cur:
+                lines.append(cur)
+            cur = word
+    if cur:
+        lines.append(cur)
+    lines = lines[:3]
+
+    for line in lines:
+        draw.text((x_pad, y), line, fill=(15, 23, 42), font=title_font)
+        y += 64
+
+    badge_text = cta
+    badge_w = int(draw.textlength(badge_text, font=small_font)) + 44
+    badge_h = 52
+    bx = x_pad
+    by = h - 70
+    draw.rounded_rectangle([bx, by - badge_h, bx + badge_w, by], radius=14, fill=accent)
+    draw.text((bx + 22, by - badge_h + 12), badge_text, fill=(255, 255, 255), font=small_font)
+
+    draw.text((w - x_pad - 220, h - 60), brand["name"], fill=(30, 41, 59), font=small_font)
+    return img
+
+
+IMAGE_FORMAT_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp", "AVIF": "avif"}
+
+# Upload formats each platform accepts for feed images.
+PLATFORM_IMAGE_FORMATS = {
+    "instagram": {"JPEG"},
+    "facebook": {"JPEG", "PNG", "WEBP"},
+    "linkedin": {"JPEG", "PNG"},
+    "twitter": {"JPEG", "PNG", "WEBP"},
+}
+
+# Which composed variant each platform publishes; see _render_variants.
+PLATFORM_IMAGE_VARIANT = {
+    "instagram": "ig_4_5",
+    "facebook": "fb_1_91",
+    "linkedin": "fb_1_91",
+    "twitter": "x_4_5",
+}
+
+DEFAULT_PLATFORM_ENCODINGS = {
+    "instagram": ("JPEG", 90),
+    "facebook": ("JPEG", 88),
+    "linkedin": ("JPEG", 88),
+    "twitter": ("JPEG", 85),
+}
+
+
+def _encode_options(fmt: str, quality: int) -> Dict[str, Any]:
+    if fmt == "PNG":
+        return {"optimize": True}
+    if fmt == "JPEG":
+        return {"quality": quality, "optimize": True, "progressive": True}
+    if fmt == "WEBP":
+        return {"quality": quality, "method": 4}
+    return {"quality": quality}
+
+
+@functools.lru_cache(maxsize=1)
+def _platform_encodings() -> Dict[str, tuple[str, int]]:
+    """Resolve CREATIVE_ENCODINGS against what Pillow can write and what each platform accepts."""
+    Image.init()
+    encodings = dict(DEFAULT_PLATFORM_ENCODINGS)
+    for item in CREATIVE_ENCODINGS.split(","):
+        if "=" not in item:
+            continue
+        platform, spec = (x.strip() for x in item.split("=", 1))
+        if platform not in encodings:
+            continue
+        fmt, _, quality = spec.partition(":")
+        fmt = fmt.strip().upper()
+        if fmt not in IMAGE_FORMAT_EXTENSIONS or fmt not in Image.SAVE:
+            continue
+        if fmt not in PLATFORM_IMAGE_FORMATS[platform]:
+            continue
+        encodings[platform] = (fmt, int(quality) if quality.strip() else encodings[platform][1])
+    return encodings
+
+
+def _save_image(img: Image.Image, fmt: str = "PNG", **options: Any) -> str:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **(options or {"optimize": True}))
+    return store_media(buf.getvalue(), IMAGE_FORMAT_EXTENSIONS[fmt])
+
+
+def _render_variants(final: Image.Image, background: Image.Image) -> Dict[str, str]:
+    """Store every platform's image of an already composed creative, keyed by platform.
+
+    Platforms that share a variant and an encoding (Facebook and LinkedIn by default)
+    end up with the same stored file.
+    """
+    # 1.91:1 link-share size: the portrait creative centred on its own background.
+    wide = ImageOps.fit(background, (1200, 628), Image.Resampling.LANCZOS)
+    inset = final.resize((round(final.width * 628 / final.height), 628), Image.Resampling.LANCZOS)
+    wide.paste(inset, ((wide.width - inset.width) // 2, 0))
+
+    x_img = final
+    if x_img.width > 1000:
+        x_img = x_img.resize((1000, round(x_img.height * 1000 / x_img.width)), Image.Resampling.LANCZOS)
+
+    variants = {"ig_4_5": final, "fb_1_91": wide, "x_4_5": x_img}
+    images = {}
+    for platform, variant in PLATFORM_IMAGE_VARIANT.items():
+        fmt, quality = _platform_encodings()[platform]
+        images[platform] = _save_image(variants[variant], fmt, **_encode_options(fmt, quality))
+    return images
+
+
+def _render_creative_job(
+    background_bytes: Optional[bytes],
+    title: str,
+    cta: str,
+    brand: Dict[str, str],
+    size: tuple[int, int],
+) -> Dict[str, str]:
+    """Decode, compose and store one creative. Runs inside a render pool worker process."""
+    if background_bytes:
+        bg = Image.open(io.BytesIO(background_bytes)).convert("RGB")
+        bg = bg.resize(size)
+    else:
+        bg = _fallback_background(size, brand)
+    final = _render_template(bg, title, cta, brand)
+    return _render_variants(final, bg)
+
+
+# Render pool workers are spawned, so each one re-imports this module and reads its
+# configuration from the environment, not from the parent's runtime state. Importing it
+# must therefore stay inert: the app, metrics, loggers and http_session are only built,
+# and everything that starts threads or touches the network lives in on_startup, which
+# workers never run. tests/test_render_pool.py checks this in a real worker.
+_render_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+_render_slots = threading.BoundedSemaphore(max(1, RENDER_MAX_PENDING))
+
+
+def _get_render_pool() -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    global _render_pool
+    if RENDER_POOL_SIZE <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn, not fork: the web worker already runs uvicorn and scheduler threads.
+            _render_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=RENDER_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=preload_fonts,
+            )
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=True, cancel_futures=True)
+            _render_pool = None
+
+
+def render_creative(
+    background_bytes: Optional[bytes],
+    title: str,
+    cta: str,
+    brand: Optional[Dict[str, str]] = None,
+    size: tuple[int, int] = (1080, 1350),
+) -> Dict[str, str]:
+    """Render a creative in the render pool and return its stored variants by name.
+
+    At most RENDER_MAX_PENDING jobs may be queued or running at once; callers beyond
+    that block, and give up after RENDER_SUBMIT_TIMEOUT_SECONDS.
+    """
+    brand = brand or _brand_defaults()
+    pool = _get_render_pool()
+    if pool is None:
+        with RENDER_SECONDS.labels("inline").time():
+            return _render_creative_job(background_bytes, title, cta, brand, size)
+
+    with RENDER_SECONDS.labels("pool").time():
+        if not _render_slots.acquire(timeout=RENDER_SUBMIT_TIMEOUT_SECONDS):
+            raise RuntimeError("render queue is full")
+        try:
+            future = pool.submit(_render_creative_job, background_bytes, title, cta, brand, size)
+        except Exception:
+            _render_slots.release()
+            raise
+        future.add_done_callback(lambda _: _render_slots.release())
+        return future.result()
+
+
+def _insert_blog_post(payload: Dict[str, Any]) -> int:
+    user_id = str(payload.get("user_id") or "").strip()
+    url = str(payload.get("url") or "").strip()
+    title = str(payload.get("title") or "").strip()
+    excerpt = str(payload.get("excerpt") or "").strip()
+    hero_image_url = str(payload.get("hero_image_url") or "").strip() or None
+    tags = payload.get("tags") or []
+    published_at = str(payload.get("published_at") or "").strip() or None
+
+    if not user_id or not url or not title:
+        raise HTTPException(status_code=400, detail="user_id, url, title are required")
+
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO blog_posts (user_id, url, title, excerpt, hero_image_url, tags, published_at, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            url,
+            title,
+            excerpt,
+            hero_image_url,
+            json.dumps(tags),
+            published_at,
+            _now_ts(),
+        ),
+    )
+    con.commit()
+
+    cur.execute("SELECT id FROM blog_posts WHERE user_id = ? AND url = ?", (user_id, url))
+    row = cur.fetchone()
+    con.close()
+    if not row:
+        raise HTTPException(status_code=500, detail="failed to insert blog post")
+    return int(row[0])
+
+
+def _get_blog_post(blog_post_id: int) -> Dict[str, Any]:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT id, user_id, url, title, excerpt, hero_image_url, tags, published_at FROM blog_posts WHERE id = ?",
         (blog_post_id,),
     )
     row = cur.fetchone()
@@ -605,36 +2590,38 @@ def _get_blog_post(blog_post_id: int) -> Dict[str, Any]:
     }
 
 
+def _public_media_url(name: str) -> str:
+    """URL of a stored media object, for platforms that fetch media themselves."""
+    return f"{BACKEND_PUBLIC_BASE}/uploads/{name}"
+
+
 def instagram_upload_media(
     access_token: str,
-    media_bytes: bytes,
-    filename: str,
-    media_type: str = 'IMAGE'
+    ig_user_id: str,
+    media_name: str,
+    caption: str = '',
+    carousel_item: bool = False
 ) -> Dict[str, Any]:
-    """Upload media to Instagram and return media ID."""
+    """Create a media container for a stored file and wait until it is ready to publish.
+
+    Instagram fetches the file from BACKEND_PUBLIC_BASE/uploads itself, so it must
+    stay stored until the container is published.
+    """
     
-    # Determine media type based on file extension
-    is_video = filename.lower().endswith('.mp4')
-    is_carousel = media_type.upper() == 'CAROUSEL'
+    media_url = _public_media_url(media_name)
+    container_data = {"access_token": access_token}
+    if media_name.lower().endswith('.mp4'):
+        container_data["media_type"] = "VIDEO" if carousel_item else "REELS"
+        container_data["video_url"] = media_url
+    else:
+        container_data["image_url"] = media_url
+    if carousel_item:
+        container_data["is_carousel_item"] = "true"
+    elif caption:
+        container_data["caption"] = caption
     
     try:
-        # Create media container
-        container_url = f"https://graph.facebook.com/v18.0/ig_user_id/media"
-        
-        container_data = {
-            "media_type": f"{media_type.upper()}{'_CHILD' if is_carousel else ''}",
-            "upload_type": "RESUMABLE"
-        }
-        
-        if is_video:
-            container_data["media_type"] = "REELS"
-        
-        resp = requests.post(
-            container_url,
-            params={"access_token": access_token},
-            json=container_data,
-            timeout=30
-        )
+        resp = http_session.post(f"{META_GRAPH_BASE}/{ig_user_id}/media", data=container_data, timeout=30)
         
         if resp.status_code >= 400:
             try:
@@ -647,7 +2634,8 @@ def instagram_upload_media(
         if not container_id:
             raise HTTPException(status_code=400, detail="Failed to create Instagram media container")
         
-        return {"container_id": container_id, "status": "created"}
+        instagram_wait_for_container(access_token, container_id)
+        return {"container_id": container_id, "status": "ready"}
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Instagram media upload failed: {str(e)}")
@@ -655,45 +2643,39 @@ def instagram_upload_media(
 
 def instagram_publish_media(
     access_token: str,
-    container_id: str,
-    caption: str = ''
+    ig_user_id: str,
+    container_id: str
 ) -> Dict[str, Any]:
-    """Publish media container to Instagram."""
+    """Publish a ready media container to Instagram."""
     
     try:
-        publish_url = f"https://graph.facebook.com/v18.0/ig_user_id/media_publish"
-        
-        publish_data = {
-            "creation_id": container_id,
-            "caption": caption,
-        }
-        
-        resp = requests.post(
-            publish_url,
-            params={"access_token": access_token},
-            json=publish_data,
-            timeout=30
+        # Publish and read back the permalink in a single batch request
+        results = graph_batch(
+            access_token,
+            [
+                {
+                    "method": "POST",
+                    "relative_url": f"{ig_user_id}/media_publish",
+                    "body": urllib.parse.urlencode({"creation_id": container_id}),
+                    "name": "publish",
+                    "omit_response_on_success": False,
+                },
+                {
+                    "method": "GET",
+                    "relative_url": "{result=publish:$.id}?fields=permalink",
+                },
+            ],
+            platform="instagram",
         )
         
-        if resp.status_code >= 400:
-            try:
-                data = resp.json()
-            except Exception:
-                data = {"raw": resp.text}
-            raise HTTPException(status_code=400, detail={"platform": "instagram", "error": data})
-        
-        media_id = resp.json().get("id")
+        media_id = graph_batch_body(results[0], "instagram").get("id")
         if not media_id:
             raise HTTPException(status_code=400, detail="Failed to publish Instagram media")
         
         # Get permalink
-        permalink_url = f"https://graph.facebook.com/v18.0/{media_id}?fields=permalink&access_token={access_token}"
-        permalink_resp = requests.get(permalink_url, timeout=30)
-        
         permalink = ""
-        if permalink_resp.status_code == 200:
-            permalink_data = permalink_resp.json()
-            permalink = permalink_data.get("permalink", "")
+        if results[1] and results[1]["code"] == 200:
+            permalink = results[1]["body"].get("permalink", "")
         
         return {
             "id": media_id,
@@ -705,41 +2687,92 @@ def instagram_publish_media(
         raise HTTPException(status_code=400, detail=f"Instagram media publish failed: {str(e)}")
 
 
-def instagram_create_media_carousel(
+def instagram_wait_for_container(
     access_token: str,
-    media_items: List[Dict[str, Any]],
-    caption: str = ''
-) -> Dict[str, Any]:
-    """Create and publish a carousel of media items."""
+    container_id: str,
+    timeout: int = INSTAGRAM_CONTAINER_TIMEOUT_SECONDS
+) -> None:
+    """Poll a media container until its status_code is FINISHED."""
     
-    try:
-        # Create carousel container
-        container_url = f"https://graph.facebook.com/v18.0/ig_user_id/media"
-        
-        children_ids = []
-        for media_item in media_items:
-            # Upload each media item first
-            upload_result = instagram_upload_media(
-                access_token=access_token,
-                media_bytes=media_item["bytes"],
-                filename=media_item["filename"],
-                media_type="CAROUSEL"
-            )
-            children_ids.append(upload_result["container_id"])
+    deadline = time.monotonic() + timeout
+    delay = 1.0
+    while True:
+        resp = http_session.get(
+            f"{META_GRAPH_BASE}/{container_id}",
+            params={"fields": "status_code", "access_token": access_token},
+            timeout=30
+        )
+        if resp.status_code >= 400:
+            try:
+                data = resp.json()
+            except Exception:
+                data = {"raw": resp.text}
+            raise HTTPException(status_code=400, detail={"platform": "instagram", "error": data})
         
+        status = resp.json().get("status_code")
+        if status in ("FINISHED", "PUBLISHED"):
+            return
+        if status in ("ERROR", "EXPIRED"):
+            raise HTTPException(status_code=400, detail=f"Instagram container {container_id} is {status}")
+        if time.monotonic() + delay > deadline:
+            raise HTTPException(status_code=400, detail=f"Instagram container {container_id} not ready in time")
+        time.sleep(delay)
+        delay = min(delay * 2, 10.0)
+
+
+def instagram_create_media_carousel(
+    access_token: str,
+    ig_user_id: str,
+    media_items: List[Dict[str, Any]],
+    caption: str = ''
+) -> Dict[str, Any]:
+    """Create and publish a carousel of stored media items ({"name", "bytes"} each).
+
+    Child containers are created concurrently (at most INSTAGRAM_CAROUSEL_CONCURRENCY
+    in flight) and each is polled until ready. Created children are remembered per
+    account and content, so a retry after a failure reuses them instead of creating
+    new ones.
+    """
+    
+    if not 2 <= len(media_items) <= INSTAGRAM_CAROUSEL_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"Instagram carousels take 2 to {INSTAGRAM_CAROUSEL_MAX_ITEMS} items."
+        )
+    
+    def create_child(media_item: Dict[str, Any]) -> str:
+        container_id = get_media_handle("instagram_carousel_item", access_token, media_item["bytes"])
+        if container_id:
+            try:
+                instagram_wait_for_container(access_token, container_id)
+                return container_id
+            except Exception:
+                # Expired or failed since the last attempt: create it again.
+                forget_media_handle("instagram_carousel_item", access_token, media_item["bytes"])
+        container_id = instagram_upload_media(
+            access_token=access_token,
+            ig_user_id=ig_user_id,
+            media_name=media_item["name"],
+            carousel_item=True
+        )["container_id"]
+        put_media_handle("instagram_carousel_item", access_token, media_item["bytes"], container_id)
+        return container_id
+    
+    try:
+        # Upload the media items concurrently; the futures keep the carousel order
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, INSTAGRAM_CAROUSEL_CONCURRENCY)) as ex:
+            # Each child runs in a copy of this context, so its calls stay in the current trace.
+            futures = [ex.submit(contextvars.copy_context().run, create_child, item) for item in media_items]
+            children_ids = [future.result() for future in futures]
+
         # Create carousel container
         carousel_data = {
             "media_type": "CAROUSEL",
-            "children": children_ids,
+            "children": ",".join(children_ids),
             "caption": caption,
+            "access_token": access_token,
         }
         
-        resp = requests.post(
-            container_url,
-            params={"access_token": access_token},
-            json=carousel_data,
-            timeout=30
-        )
+        resp = http_session.post(f"{META_GRAPH_BASE}/{ig_user_id}/media", data=carousel_data, timeout=30)
         
         if resp.status_code >= 400:
             try:
@@ -752,39 +2785,324 @@ def instagram_create_media_carousel(
         if not carousel_id:
             raise HTTPException(status_code=400, detail="Failed to create Instagram carousel")
         
-        # Publish carousel
+        # Publish carousel once it is ready
+        instagram_wait_for_container(access_token, carousel_id)
         publish_result = instagram_publish_media(
             access_token=access_token,
-            container_id=carousel_id,
-            caption=caption
+            ig_user_id=ig_user_id,
+            container_id=carousel_id
         )
         
+        # Published children are consumed; never hand them to another carousel
+        for media_item in media_items:
+            forget_media_handle("instagram_carousel_item", access_token, media_item["bytes"])
+        
         return publish_result
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Instagram carousel creation failed: {str(e)}")
 
 
+def _media_path(name: str) -> Path:
+    return Path(UPLOAD_DIR) / name
+
+
+def _reference_media(digest: str, ext: str, size: int) -> str:
+    """Take a reference on the media object with this digest and return its name."""
+    ext = ext.lstrip(".").lower() or "bin"
+    name = f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        INSERT INTO media_objects (name, digest, size, refcount, created_at, updated_at)
+        VALUES (?, ?, ?, 1, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET refcount = refcount + 1, updated_at = excluded.updated_at
+        """,
+        (name, digest, size, now, now),
+    )
+    con.commit()
+    con.close()
+    return name
+
+
+def store_media(media_bytes: bytes, ext: str) -> str:
+    """Store bytes under their SHA-256 and take a reference; returns the name relative to UPLOAD_DIR.
+
+    Files live in two levels of sharded subdirectories (ab/cd/abcd....ext) so no
+    directory grows unbounded, and identical media is only ever written once.
+    """
+    name = _reference_media(hashlib.sha256(media_bytes).hexdigest(), ext, len(media_bytes))
+    # Written after the reference is taken, so gc_media can never collect it in between.
+    path = _media_path(name)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(media_bytes)
+        os.replace(tmp, path)
+    return name
+
+
+def store_media_file(fileobj, ext: str) -> str:
+    """store_media for a file object: spooled to disk in chunks and hashed on the way, never held in memory."""
+    spool = Path(UPLOAD_DIR) / f".spool.{uuid.uuid4().hex}.tmp"
+    spool.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(spool, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(MEDIA_SPOOL_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        name = _reference_media(digest.hexdigest(), ext, size)
+        path = _media_path(name)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(spool, path)
+        return name
+    finally:
+        spool.unlink(missing_ok=True)
+
+
+def _retain_media(cur, name: str) -> None:
+    cur.execute("UPDATE media_objects SET refcount = refcount + 1, updated_at = ? WHERE name = ?", (_now_ts(), name))
+
+
+def _release_media(cur, name: str) -> None:
+    cur.execute(
+        "UPDATE media_objects SET refcount = MAX(refcount - 1, 0), updated_at = ? WHERE name = ?",
+        (_now_ts(), name),
+    )
+
+
+def release_media(name: str) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    _release_media(cur, name)
+    con.commit()
+    con.close()
+
+
+# Upload names from before the content-addressed store: "{stem}_{8 hex}.ext" and "{prefix}_{32 hex}.ext".
+_LEGACY_MEDIA_NAME = re.compile(r"^.+_[0-9a-f]{8}(?:[0-9a-f]{24})?\.[A-Za-z0-9]+$")
+_SHARD_DIR = re.compile(r"^[0-9a-f]{2}$")
+# Directory (relative to UPLOAD_DIR) the last orphan sweep stopped after; None starts over.
+_media_sweep_cursor: Optional[str] = None
+
+
+def _media_sweep_dirs() -> List[str]:
+    root = Path(UPLOAD_DIR)
+    dirs = [""]
+    for top in sorted(p for p in root.iterdir() if p.is_dir() and _SHARD_DIR.match(p.name)):
+        dirs += sorted(f"{top.name}/{p.name}" for p in top.iterdir() if p.is_dir() and _SHARD_DIR.match(p.name))
+    return dirs
+
+
+def _sweep_orphan_media(con: sqlite3.Connection, cutoff: int, limit: int, batch_size: int) -> int:
+    """Delete files in UPLOAD_DIR older than cutoff that no row owns; returns how many.
+
+    These are interrupted writes (*.tmp, including .spool.*.tmp at the top level), files
+    whose media_objects row was never committed, and flat-layout uploads from before the
+    shard tree. Names a post, asset or library entry still points at are kept. Each call
+    looks at about `limit` files and the next one carries on from there, so a large tree
+    is covered over several runs.
+    """
+    global _media_sweep_cursor
+    root = Path(UPLOAD_DIR)
+    dirs = _media_sweep_dirs()
+    start = 0
+    if _media_sweep_cursor is not None:
+        start = next((i for i, d in enumerate(dirs) if d > _media_sweep_cursor), 0)
+    candidates: List[str] = []
+    examined = 0
+    for i in range(start, len(dirs)):
+        for path in (root / dirs[i]).iterdir():
+            if not path.is_file():
+                continue
+            if not dirs[i] and not (
+                (path.name.startswith(".spool.") and path.name.endswith(".tmp"))
+                or _LEGACY_MEDIA_NAME.match(path.name)
+            ):
+                continue
+            examined += 1
+            if path.stat().st_mtime < cutoff:
+                candidates.append(path.relative_to(root).as_posix())
+        _media_sweep_cursor = dirs[i] if i < len(dirs) - 1 else None
+        if examined >= limit:
+            break
+
+    removed = 0
+    cur = con.cursor()
+    for offset in range(0, len(candidates), batch_size):
+        names = candidates[offset:offset + batch_size]
+        marks = ",".join("?" * len(names))
+        # Checked and unlinked under the write lock, like the row sweep: a store_media of the
+        # same bytes waits for the commit and then writes the file again.
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            f"""
+            SELECT name FROM media_objects WHERE name IN ({marks})
+            UNION SELECT image_path FROM scheduled_posts WHERE image_path IN ({marks})
+            UNION SELECT media_name FROM background_library WHERE media_name IN ({marks})
+            UNION SELECT j.value FROM content_assets, json_each(content_assets.images) AS j
+                WHERE j.value IN ({marks})
+            """,
+            names * 4,
+        )
+        owned = {r[0] for r in cur.fetchall()}
+        for name in names:
+            if name not in owned:
+                _media_path(name).unlink(missing_ok=True)
+                removed += 1
+        con.commit()
+    return removed
+
+
+def gc_media(batch_size: int = MEDIA_GC_BATCH_SIZE) -> int:
+    """Delete media unreferenced for longer than MEDIA_GC_GRACE_SECONDS, in batches.
+
+    A bounded sweep of the files themselves then removes old files that have no row.
+    """
+    cutoff = _now_ts() - MEDIA_GC_GRACE_SECONDS
+    batch_size = max(1, int(batch_size))
+    removed = 0
+
+    con = db_conn()
+    cur = con.cursor()
+    while True:
+        # Files are unlinked before the batch commits, under the write lock: a concurrent
+        # store_media of the same bytes waits for the commit and then finds the file gone.
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            """
+            DELETE FROM media_objects
+            WHERE name IN (
+                SELECT name FROM media_objects WHERE refcount <= 0 AND updated_at < ? LIMIT ?
+            )
+            RETURNING name
+            """,
+            (cutoff, batch_size),
+        )
+        names = [r[0] for r in cur.fetchall()]
+        for name in names:
+            _media_path(name).unlink(missing_ok=True)
+        con.commit()
+        removed += len(names)
+        if len(names) < batch_size:
+            break
+
+    now = _now_ts()
+    cur.execute("DELETE FROM media_handles WHERE expires_at <= ?", (now,))
+    cur.execute(
+        "DELETE FROM upload_parts WHERE session_key IN (SELECT session_key FROM upload_sessions WHERE expires_at <= ?)",
+        (now,),
+    )
+    cur.execute("DELETE FROM upload_sessions WHERE expires_at <= ?", (now,))
+    con.commit()
+
+    removed += _sweep_orphan_media(con, cutoff, max(1, MEDIA_GC_SWEEP_FILES), batch_size)
+    con.close()
+    return removed
+
+
 def save_upload_to_disk(
     media_bytes: bytes,
     filename: str
 ) -> str:
-    """Save uploaded media to disk and return filename."""
-    
-    Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    file_ext = Path(filename).suffix
-    base_name = Path(filename).stem
-    unique_name = f"{base_name}_{uuid.uuid4().hex[:8]}{file_ext}"
-    
-    file_path = Path(UPLOAD_DIR) / unique_name
-    
-    # Save file
-    with open(file_path, 'wb') as f:
-        f.write(media_bytes)
-    
-    return unique_name
+    """Save uploaded media to the media store and return its name."""
+
+    return store_media(media_bytes, Path(filename).suffix)
+
+
+def _media_handle_key(platform: str, access_token: str, media: Union[bytes, Path]) -> tuple[str, str, str]:
+    # The account is identified by a digest of its credential, so a reconnected
+    # or different account never sees another account's handles.
+    account = hashlib.sha256(access_token.encode()).hexdigest()[:32]
+    if isinstance(media, bytes):
+        return _media_digest(media, None), platform, account
+    return _media_digest(None, media), platform, account
+
+
+def get_media_handle(platform: str, access_token: str, media: Union[bytes, Path]) -> Optional[str]:
+    if MEDIA_HANDLE_TTL_SECONDS.get(platform, 0) <= 0:
+        return None
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT handle FROM media_handles WHERE content_hash = ? AND platform = ? AND account = ? AND expires_at > ?",
+        (*_media_handle_key(platform, access_token, media), _now_ts()),
+    )
+    row = cur.fetchone()
+    con.close()
+    return row[0] if row else None
+
+
+def put_media_handle(platform: str, access_token: str, media: Union[bytes, Path], handle: str) -> None:
+    ttl = MEDIA_HANDLE_TTL_SECONDS.get(platform, 0)
+    if ttl <= 0 or not handle:
+        return
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        INSERT INTO media_handles (content_hash, platform, account, handle, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash, platform, account)
+        DO UPDATE SET handle=excluded.handle, created_at=excluded.created_at, expires_at=excluded.expires_at
+        """,
+        (*_media_handle_key(platform, access_token, media), handle, now, now + ttl),
+    )
+    con.commit()
+    con.close()
+
+
+# How each platform reports a media handle it no longer knows (expired or purged on its side).
+_STALE_MEDIA_ERRORS = {
+    "twitter": re.compile(r"media[ _]?ids? (?:is |are )?invalid|invalid media[ _]?id|media[ _]?id\S* (?:was )?not found", re.I),
+    "linkedin": re.compile(r"(?:asset|image|video|urn:li:\w+:\S+)\W.{0,80}?(?:not found|does not exist|expired)", re.I),
+}
+
+
+def _is_stale_media_error(platform: str, error: Exception) -> bool:
+    pattern = _STALE_MEDIA_ERRORS.get(platform)
+    message = str(error.detail) if isinstance(error, HTTPException) else str(error)
+    return bool(pattern and pattern.search(message))
+
+
+def post_with_media_cached(platform: str, access_token: str, media: Union[bytes, Path], upload, post):
+    """Call post(handle) with a cached handle for this media (bytes or a stored file), or one from upload().
+
+    A platform can reject a cached handle early (expired, deleted on its side); the
+    handle is then dropped and the post is retried once with a fresh upload. Any other
+    failure is raised as is: the post may have been created anyway (timeout, 5xx), and
+    retrying while rate limited only burns more calls.
+    """
+    handle = get_media_handle(platform, access_token, media)
+    if handle:
+        try:
+            return post(handle)
+        except Exception as e:
+            if not _is_stale_media_error(platform, e):
+                raise
+            forget_media_handle(platform, access_token, media)
+    handle = upload()
+    put_media_handle(platform, access_token, media, handle)
+    return post(handle)
+
+
+def forget_media_handle(platform: str, access_token: str, media: Union[bytes, Path]) -> None:
+    """Drop a cached handle, e.g. after the platform rejected a post that used it."""
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "DELETE FROM media_handles WHERE content_hash = ? AND platform = ? AND account = ?",
+        _media_handle_key(platform, access_token, media),
+    )
+    con.commit()
+    con.close()
 
 
 def instagram_handle_errors(error_response: str) -> str:
@@ -876,13 +3194,13 @@ def instagram_get_user_info(access_token: str) -> Dict[str, Any]:
     """Get current Instagram user information."""
     
     try:
-        url = "https://graph.facebook.com/v18.0/me"
+        url = f"{META_GRAPH_BASE}/me"
         params = {
             "fields": "id,username,account_type,media_count,followers_count,follows_count",
             "access_token": access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Instagram user info")
@@ -913,13 +3231,13 @@ def instagram_get_media_insights(
         metrics = ["impressions", "reach", "likes", "comments", "shares", "saves"]
     
     try:
-        url = f"https://graph.facebook.com/v18.0/{media_id}/insights"
+        url = f"{META_GRAPH_BASE}/{media_id}/insights"
         params = {
             "metric": ",".join(metrics),
             "access_token": access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Instagram media insights")
@@ -935,13 +3253,164 @@ def instagram_get_media_insights(
         raise HTTPException(status_code=400, detail=f"Failed to get Instagram insights: {str(e)}")
 
 
+def instagram_get_media_insights_batch(
+    access_token: str,
+    media_ids: List[str],
+    metrics: List[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Get insights for many media items, GRAPH_BATCH_MAX_OPERATIONS per request."""
+    
+    if not metrics:
+        metrics = ["impressions", "reach", "likes", "comments", "shares", "saves"]
+    
+    results = graph_batch(
+        access_token,
+        [
+            {"method": "GET", "relative_url": f"{media_id}/insights?metric={','.join(metrics)}"}
+            for media_id in media_ids
+        ],
+        platform="instagram",
+    )
+    out = {}
+    for media_id, result in zip(media_ids, results):
+        if result and result["code"] < 400:
+            out[media_id] = {"media_id": media_id, "insights": result["body"].get("data", [])}
+        else:
+            out[media_id] = {"media_id": media_id, "error": result["body"] if result else None}
+    return out
+
+
+def _media_size(media_bytes: Optional[bytes], media_path: Optional[Path]) -> int:
+    return len(media_bytes) if media_bytes is not None else Path(media_path).stat().st_size
+
+
+def _read_media_range(media_bytes: Optional[bytes], media_path: Optional[Path], start: int, end: int) -> bytes:
+    """Return bytes [start, end) from memory, or read just that range from disk."""
+    if media_bytes is not None:
+        return media_bytes[start:end]
+    with open(media_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _media_digest(media_bytes: Optional[bytes], media_path: Optional[Path]) -> str:
+    if media_bytes is not None:
+        return hashlib.sha256(media_bytes).hexdigest()
+    with open(media_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _upload_session_key(platform: str, access_token: str, digest: str) -> str:
+    return hashlib.sha256(f"{platform}:{access_token}:{digest}".encode()).hexdigest()
+
+
+def _load_upload_session(session_key: str) -> Optional[Dict[str, Any]]:
+    """Return a live upload session and its confirmed parts, or None if absent or expired."""
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute("SELECT state, expires_at FROM upload_sessions WHERE session_key = ?", (session_key,))
+    row = cur.fetchone()
+    if not row or row[1] <= _now_ts():
+        cur.execute("DELETE FROM upload_sessions WHERE session_key = ?", (session_key,))
+        cur.execute("DELETE FROM upload_parts WHERE session_key = ?", (session_key,))
+        con.commit()
+        con.close()
+        return None
+    cur.execute("SELECT part_index, result FROM upload_parts WHERE session_key = ?", (session_key,))
+    parts = {r[0]: r[1] for r in cur.fetchall()}
+    con.close()
+    return {"state": json.loads(row[0]), "parts": parts, "expires_at": row[1]}
+
+
+def _save_upload_session(session_key: str, platform: str, state: Dict[str, Any], expires_at: int) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        INSERT INTO upload_sessions (session_key, platform, state, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(session_key) DO UPDATE SET state=excluded.state, expires_at=excluded.expires_at
+        """,
+        (session_key, platform, json.dumps(state), _now_ts(), expires_at),
+    )
+    con.commit()
+    con.close()
+
+
+def _record_upload_part(session_key: str, part_index: int, result: str) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "INSERT OR REPLACE INTO upload_parts (session_key, part_index, result) VALUES (?, ?, ?)",
+        (session_key, part_index, result),
+    )
+    con.commit()
+    con.close()
+
+
+def _finish_upload_session(session_key: str) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute("DELETE FROM upload_sessions WHERE session_key = ?", (session_key,))
+    cur.execute("DELETE FROM upload_parts WHERE session_key = ?", (session_key,))
+    con.commit()
+    con.close()
+
+
+def _upload_parts_parallel(
+    session_key: str,
+    part_count: int,
+    send_part,
+    done: Dict[int, str],
+    concurrency: int,
+) -> List[str]:
+    """Send every part not already in `done` using a thread pool, and return all results in order.
+
+    send_part(index) uploads one part and returns its confirmation (an ETag, for example).
+    Each confirmation is saved as soon as it arrives. If some parts fail, the next attempt
+    resumes with only the missing ones.
+    """
+    results = dict(done)
+
+    def attempt(index: int) -> str:
+        for i in range(UPLOAD_PART_RETRIES):
+            try:
+                return send_part(index)
+            except Exception:
+                if i == UPLOAD_PART_RETRIES - 1:
+                    raise
+                time.sleep(2 ** i)
+
+    pending = [i for i in range(part_count) if i not in results]
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = {ex.submit(contextvars.copy_context().run, attempt, i): i for i in pending}
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            _record_upload_part(session_key, index, results[index])
+    if errors:
+        raise errors[0]
+    return [results[i] for i in range(part_count)]
+
+
 def linkedin_upload_media(
     access_token: str, 
     author_urn: str, 
-    media_bytes: bytes, 
-    filename: str
+    media_bytes: Optional[bytes], 
+    filename: str,
+    media_path: Optional[Path] = None,
 ) -> Dict[str, Any]:
-    """Upload media (image/video/document) to LinkedIn and return media URN."""
+    """Upload media (image/video/document) to LinkedIn and return media URN.
+
+    Pass media_path instead of media_bytes to read each part from disk. Video parts
+    are sent in parallel. Confirmed part ETags are kept in upload_parts, so if an
+    upload of the same file fails, the next attempt continues from where it stopped.
+    """
     
     # Determine media type
     is_video = filename.lower().endswith('.mp4')
@@ -954,86 +3423,104 @@ def linkedin_upload_media(
     else:
         endpoint = 'images'
     
-    # Initialize upload
-    init_url = f"https://api.linkedin.com/rest/{endpoint}?action=initializeUpload"
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
         'X-Restli-Protocol-Version': '2.0.0',
         'LinkedIn-Version': '202601',
     }
+    file_size = _media_size(media_bytes, media_path)
+    session_key = _upload_session_key("linkedin", access_token, _media_digest(media_bytes, media_path))
+    session = _load_upload_session(session_key)
     
-    init_body = {
-        "initializeUploadRequest": {
-            "owner": author_urn,
+    if session:
+        state = session["state"]
+    else:
+        # Initialize upload
+        init_url = f"{LINKEDIN_API_BASE}/{endpoint}?action=initializeUpload"
+        init_body = {
+            "initializeUploadRequest": {
+                "owner": author_urn,
+            }
+        }
+        
+        if is_video:
+            init_body["initializeUploadRequest"]["fileSizeBytes"] = file_size
+            init_body["initializeUploadRequest"]["uploadCaptions"] = False
+            init_body["initializeUploadRequest"]["uploadThumbnail"] = False
+        
+        resp = http_session.post(init_url, headers=headers, json=init_body, timeout=30)
+        if resp.status_code >= 400:
+            try:
+                data = resp.json()
+            except Exception:
+                data = {"raw": resp.text}
+            raise HTTPException(status_code=400, detail={"platform": "linkedin", "error": data})
+        
+        value = resp.json().get("value", {})
+        media_id = value.get("image") or value.get("video") or value.get("document")
+        if value.get("uploadInstructions"):
+            instructions = [
+                {"url": ins["uploadUrl"], "first": ins["firstByte"], "last": ins["lastByte"]}
+                for ins in value["uploadInstructions"]
+            ]
+        elif value.get("uploadUrl"):
+            instructions = [{"url": value["uploadUrl"], "first": 0, "last": file_size - 1}]
+        else:
+            instructions = []
+        
+        if not instructions or not media_id:
+            raise HTTPException(status_code=400, detail="Failed to initialize LinkedIn media upload")
+        
+        state = {
+            "media_id": media_id,
+            "upload_token": value.get("uploadToken") or "",
+            "instructions": instructions,
         }
+        # uploadUrlsExpireAt is in milliseconds; without it, fall back to our own TTL.
+        expires_at = int(value["uploadUrlsExpireAt"] / 1000) if value.get("uploadUrlsExpireAt") else _now_ts() + UPLOAD_SESSION_TTL_SECONDS
+        _save_upload_session(session_key, "linkedin", state, expires_at)
+        session = {"state": state, "parts": {}}
+    
+    upload_headers = {
+        'Authorization': f'Bearer {access_token}',
+        'X-Restli-Protocol-Version': '2.0.0',
+        'LinkedIn-Version': '202601',
     }
     
     if is_video:
-        init_body["initializeUploadRequest"]["fileSizeBytes"] = len(media_bytes)
-        init_body["initializeUploadRequest"]["uploadCaptions"] = False
-        init_body["initializeUploadRequest"]["uploadThumbnail"] = False
-    
-    resp = requests.post(init_url, headers=headers, json=init_body, timeout=30)
-    if resp.status_code >= 400:
-        try:
-            data = resp.json()
-        except Exception:
-            data = {"raw": resp.text}
-        raise HTTPException(status_code=400, detail={"platform": "linkedin", "error": data})
-    
-    init_data = resp.json()
-    upload_url = init_data.get("value", {}).get("uploadUrl")
-    media_id = None
-    
-    if "image" in init_data.get("value", {}):
-        media_id = init_data["value"]["image"]
-    elif "video" in init_data.get("value", {}):
-        media_id = init_data["value"]["video"]
-    elif "document" in init_data.get("value", {}):
-        media_id = init_data["value"]["document"]
-    
-    if not upload_url or not media_id:
-        raise HTTPException(status_code=400, detail="Failed to initialize LinkedIn media upload")
-    
-    # Upload the file in chunks
-    chunk_size = 1024 * 1024 * 2  # 2MB chunks
-    etags = []
+        upload_headers['Content-Type'] = 'application/octet-stream'
+    elif is_pdf:
+        upload_headers['Content-Type'] = 'application/pdf'
     
-    for i in range(0, len(media_bytes), chunk_size):
-        chunk = media_bytes[i:i + chunk_size]
-        
-        upload_headers = {
-            'Authorization': f'Bearer {access_token}',
-            'X-Restli-Protocol-Version': '2.0.0',
-            'LinkedIn-Version': '202601',
-        }
-        
-        if is_video:
-            upload_headers['Content-Type'] = 'application/octet-stream'
-        elif is_pdf:
-            upload_headers['Content-Type'] = 'application/pdf'
-        
-        chunk_resp = requests.put(upload_url, headers=upload_headers, data=chunk, timeout=30)
+    def send_part(index: int) -> str:
+        ins = state["instructions"][index]
+        chunk = _read_media_range(media_bytes, media_path, ins["first"], ins["last"] + 1)
+        chunk_resp = http_session.put(ins["url"], headers=upload_headers, data=chunk, timeout=60)
         if chunk_resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to upload media chunk")
-        
-        etag = chunk_resp.headers.get('etag')
-        if etag:
-            etags.append(etag)
+        return chunk_resp.headers.get('etag') or ""
+    
+    etags = _upload_parts_parallel(
+        session_key,
+        len(state["instructions"]),
+        send_part,
+        session["parts"],
+        LINKEDIN_UPLOAD_CONCURRENCY if is_video else 1,
+    )
     
     # Finalize video upload if needed
-    if is_video and etags:
-        finalize_url = "https://api.linkedin.com/rest/videos?action=finalizeUpload"
+    if is_video:
+        finalize_url = f"{LINKEDIN_API_BASE}/videos?action=finalizeUpload"
         finalize_body = {
             "finalizeUploadRequest": {
-                "video": media_id,
-                "uploadToken": "",
+                "video": state["media_id"],
+                "uploadToken": state["upload_token"],
                 "uploadedPartIds": etags,
             }
         }
         
-        finalize_resp = requests.post(finalize_url, headers=headers, json=finalize_body, timeout=30)
+        finalize_resp = http_session.post(finalize_url, headers=headers, json=finalize_body, timeout=30)
         if finalize_resp.status_code >= 400:
             try:
                 data = finalize_resp.json()
@@ -1041,7 +3528,8 @@ def linkedin_upload_media(
                 data = {"raw": finalize_resp.text}
             raise HTTPException(status_code=400, detail={"platform": "linkedin", "error": data})
     
-    return {"media_urn": media_id, "status": "uploaded"}
+    _finish_upload_session(session_key)
+    return {"media_urn": state["media_id"], "status": "uploaded"}
 
 
 def linkedin_fix_text(text: str) -> str:
@@ -1151,7 +3639,7 @@ def linkedin_share_post(author_urn: str, access_token: str, text: str, article_u
         body["content"] = content
     
     # Use the new posts API endpoint
-    url = "https://api.linkedin.com/rest/posts"
+    url = f"{LINKEDIN_API_BASE}/posts"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "X-Restli-Protocol-Version": "2.0.0",
@@ -1159,7 +3647,7 @@ def linkedin_share_post(author_urn: str, access_token: str, text: str, article_u
         "LinkedIn-Version": "202601",
     }
 
-    resp = requests.post(url, headers=headers, json=body, timeout=30)
+    resp = http_session.post(url, headers=headers, json=body, timeout=30)
     if resp.status_code not in (200, 201):
         try:
             data = resp.json()
@@ -1171,74 +3659,615 @@ def linkedin_share_post(author_urn: str, access_token: str, text: str, article_u
     return {"restli_id": restli_id, "status_code": resp.status_code, "post_url": f"https://www.linkedin.com/feed/update/{restli_id}" if restli_id else None}
 
 
-def process_blog_post(blog_post_id: int):
-    post = _get_blog_post(blog_post_id)
-    captions = _generate_captions_openai(post["title"], post["url"], post["excerpt"], post["tags"])
-
-    base_prompt = f"Professional tech event / blog hero background, abstract gradient, geometric lines, corporate modern, brand palette {BRAND_PRIMARY} {BRAND_SECONDARY} {BRAND_ACCENT}, no text"
-    img_bytes = _replicate_sdxl_generate(base_prompt)
-    if img_bytes:
-        bg = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        bg = bg.resize((1080, 1350))
-    else:
-        bg = _fallback_background((1080, 1350))
+def _generate_captions_with_queued_peers(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Captions for post, generated in one batch with blog posts still waiting in the job queue.
 
-    final = _render_template(bg, post["title"], "Read the blog")
-    image_name = _save_image(final, "blog")
+    During a burst or backfill the peers' captions land in the caption cache, so their
+    own jobs later skip the LLM call. Peers are claimed on their job row under the write
+    lock, so concurrent workers never caption the same peer twice. A post whose captions
+    are already cached (typically a peer of an earlier batch) returns them without
+    batching anyone.
+    """
+    if not OPENAI_API_KEY:
+        return _fallback_captions(post["title"], post["url"], post["excerpt"])
+    cached = _caption_cache_get(_caption_cache_key(post["title"], post["url"], post["excerpt"], post["tags"]))
+    if cached is not None:
+        return cached
 
+    now = _now_ts()
     con = db_conn()
-    cur = con.cursor()
-    cur.execute(
-        "INSERT INTO content_assets (blog_post_id, captions, prompts, images, created_at) VALUES (?, ?, ?, ?, ?)",
-        (
-            blog_post_id,
-            json.dumps(captions),
-            json.dumps({"sdxl_prompt": base_prompt, "provider": SDXL_PROVIDER}),
-            json.dumps({"ig_4_5": image_name}),
-            _now_ts(),
-        ),
-    )
-
-    tz = ZoneInfo(DEFAULT_TZ)
-    now_dt = datetime.datetime.now(tz=tz)
-    for platform in ["instagram", "facebook", "twitter", "linkedin"]:
-        peak_dt = _peak_time_for(platform, now_dt)
-        if peak_dt <= now_dt:
-            peak_dt = peak_dt + datetime.timedelta(days=1)
-        scheduled_at = int(peak_dt.timestamp())
-
-        platform_caption = captions.get(platform, {}).get("caption") or f"{post['title']}\n{post['url']}"
-        if platform == "twitter":
-            hashtags = captions.get(platform, {}).get("hashtags") or []
-            if hashtags:
-                platform_caption = platform_caption.strip() + "\n\n" + " ".join(hashtags[:4])
-
-        cur.execute(
+    try:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        # A claim lapses after a lease's worth of time, in case its batch never finished.
+        cur.execute(
             """
-            INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            UPDATE jobs SET captions_claimed_at = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE kind = 'process_blog_post' AND status = 'queued'
+                    AND (captions_claimed_at IS NULL OR captions_claimed_at < ?)
+                    AND json_extract(payload, '$.blog_post_id') IS NOT ?
+                ORDER BY run_at ASC, id ASC
+                LIMIT ?
+            )
+            RETURNING payload
             """,
+            (now, now - JOB_VISIBILITY_TIMEOUT_SECONDS, post["id"], max(0, CAPTION_BATCH_SIZE - 1)),
+        )
+        peer_ids = {json.loads(r[0]).get("blog_post_id") for r in cur.fetchall()}
+        con.commit()
+    finally:
+        con.close()
+
+    posts = [post]
+    for peer_id in peer_ids - {post["id"], None}:
+        try:
+            posts.append(_get_blog_post(int(peer_id)))
+        except HTTPException:
+            continue
+    return generate_captions_batch(posts)[post["id"]]
+
+
+def _blog_background_prompt() -> str:
+    return f"Professional tech event / blog hero background, abstract gradient, geometric lines, corporate modern, brand palette {BRAND_PRIMARY} {BRAND_SECONDARY} {BRAND_ACCENT}, no text"
+
+
+def process_blog_post(blog_post_id: int):
+    """Caption, render and schedule a post on a background from the library.
+
+    If the library has nothing ready, an SDXL background is started for this post and
+    its captions are written while Replicate works; rendering and scheduling then resume
+    in a render_blog_post job once the prediction completes (webhook or poller). Without
+    Replicate they run right away on the fallback background.
+    """
+    post = _get_blog_post(blog_post_id)
+    base_prompt = _blog_background_prompt()
+    with trace_span("blog.background", blog_post_id=blog_post_id) as span:
+        background = take_library_background(base_prompt)
+        span.set_attribute("library_hit", background is not None)
+        prediction_id = None
+        if background is None:
+            # Library empty (cold start or disabled): generate one for this post, and keep it
+            # for the library too.
+            library_key = _background_library_key(base_prompt) if BACKGROUND_LIBRARY_SIZE > 0 else None
+            prediction_id = replicate_start_prediction(base_prompt, blog_post_id, library_key=library_key)
+            span.set_attribute("prediction_id", prediction_id)
+        refill_background_library(base_prompt)
+
+    with trace_span("blog.captions", blog_post_id=blog_post_id):
+        captions = _generate_captions_with_queued_peers(post)
+    if background is not None or prediction_id is None:
+        render_and_schedule_blog_post(post, background, base_prompt, captions)
+
+
+def render_and_schedule_blog_post(
+    post: Dict[str, Any],
+    img_bytes: Optional[bytes],
+    base_prompt: str,
+    captions: Optional[Dict[str, Any]] = None,
+):
+    """Render the creative on img_bytes (or the fallback background) and schedule every platform."""
+    blog_post_id = post["id"]
+    if captions is None:
+        # Normally a cache hit: process_blog_post generated them while the background rendered.
+        with trace_span("blog.captions", blog_post_id=blog_post_id):
+            captions = _generate_captions_with_queued_peers(post)
+    with trace_span("blog.render", blog_post_id=blog_post_id, fallback_background=img_bytes is None):
+        images = render_creative(img_bytes, post["title"], "Read the blog")
+
+    with trace_span("blog.schedule", blog_post_id=blog_post_id) as schedule_span:
+        con = db_conn()
+        cur = con.cursor()
+        cur.execute(
+            "INSERT INTO content_assets (blog_post_id, captions, prompts, images, created_at) VALUES (?, ?, ?, ?, ?)",
             (
                 blog_post_id,
-                post["user_id"],
-                platform,
-                scheduled_at,
-                "scheduled",
-                platform_caption,
-                image_name,
+                json.dumps(captions),
+                json.dumps({"sdxl_prompt": base_prompt, "provider": SDXL_PROVIDER}),
+                json.dumps(images),
                 _now_ts(),
             ),
         )
 
+        tz = ZoneInfo(DEFAULT_TZ)
+        now_dt = datetime.datetime.now(tz=tz)
+        for platform in ["instagram", "facebook", "twitter", "linkedin"]:
+            peak_dt = _peak_time_for(platform, now_dt)
+            if peak_dt <= now_dt:
+                peak_dt = peak_dt + datetime.timedelta(days=1)
+            scheduled_at = int(peak_dt.timestamp())
+
+            platform_caption = captions.get(platform, {}).get("caption") or f"{post['title']}\n{post['url']}"
+            if platform == "twitter":
+                hashtags = captions.get(platform, {}).get("hashtags") or []
+                if hashtags:
+                    platform_caption = platform_caption.strip() + "\n\n" + " ".join(hashtags[:4])
+
+            image_name = images.get(platform)
+            cur.execute(
+                """
+                INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, trace_context, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    blog_post_id,
+                    post["user_id"],
+                    platform,
+                    scheduled_at,
+                    "scheduled",
+                    platform_caption,
+                    image_name,
+                    schedule_span.traceparent,
+                    _now_ts(),
+                ),
+            )
+            if image_name:
+                _retain_media(cur, image_name)
+
+        # Each scheduled post now holds its own reference; drop the ones taken by rendering.
+        for image_name in images.values():
+            _release_media(cur, image_name)
+        con.commit()
+        con.close()
+
+
+def _deduped_job(cur: sqlite3.Cursor, dedupe_key: str, finished: bool = False) -> Optional[tuple[int, Dict[str, Any]]]:
+    """(id, payload) of the job a new job with this dedupe_key would be merged into, if any.
+
+    That is the queued job, or with finished, the latest one that did not fail.
+    """
+    status = "status NOT IN ('failed', 'superseded')" if finished else "status = 'queued'"
+    cur.execute(
+        f"SELECT id, payload FROM jobs WHERE dedupe_key = ? AND {status} ORDER BY id DESC LIMIT 1",
+        (dedupe_key,),
+    )
+    row = cur.fetchone()
+    return (row[0], json.loads(row[1] or "{}")) if row else None
+
+
+def enqueue_job(
+    kind: str,
+    payload: Dict[str, Any],
+    dedupe_key: Optional[str] = None,
+    delay_seconds: int = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    trace_context: Optional[str] = None,
+    dedupe_finished: bool = False,
+) -> int:
+    """Persist a job for the worker threads and return its id.
+
+    If a job with the same dedupe_key is still queued, that job's id is returned instead;
+    with dedupe_finished, so is one that is running or done (until it is purged).
+    The job runs in the trace of trace_context, or of the current span.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    if dedupe_key and dedupe_finished:
+        existing = _deduped_job(cur, dedupe_key, finished=True)
+        if existing:
+            con.close()
+            return existing[0]
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO jobs
+            (kind, payload, dedupe_key, status, attempts, max_attempts, run_at, trace_context, created_at, updated_at)
+        VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?, ?)
+        """,
+        (
+            kind,
+            json.dumps(payload),
+            dedupe_key,
+            max(1, int(max_attempts)),
+            now + max(0, int(delay_seconds)),
+            trace_context or current_traceparent(),
+            now,
+            now,
+        ),
+    )
+    job_id = cur.lastrowid if cur.rowcount else None
+    if job_id is None:
+        cur.execute("SELECT id FROM jobs WHERE dedupe_key = ? AND status = 'queued'", (dedupe_key,))
+        job_id = cur.fetchone()[0]
+    con.commit()
+    con.close()
+    _job_wakeup.set()
+    return job_id
+
+
+def _claim_job() -> Optional[Dict[str, Any]]:
+    """Lease the next runnable job: a due queued job, or a running one whose lease ran out."""
+    now = _now_ts()
+    token = secrets.token_hex(8)
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        UPDATE jobs
+        SET status = 'running', attempts = attempts + 1, lease_token = ?, locked_until = ?,
+            started_at = ?, updated_at = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?)
+            ORDER BY run_at ASC, id ASC
+            LIMIT 1
+        )
+        RETURNING id, kind, payload, attempts, max_attempts, created_at, trace_context, dedupe_key
+        """,
+        (token, now + JOB_VISIBILITY_TIMEOUT_SECONDS, now, now, now, now),
+    )
+    row = cur.fetchone()
     con.commit()
     con.close()
+    if not row:
+        return None
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "payload": json.loads(row[2] or "{}"),
+        "attempts": row[3],
+        "max_attempts": row[4],
+        "created_at": row[5],
+        "trace_context": row[6],
+        "dedupe_key": row[7],
+        "lease_token": token,
+    }
+
+
+def _extend_job_lease(job: Dict[str, Any]) -> bool:
+    """Push out a running job's lease; False if another worker has taken it over."""
+    now = _now_ts()
+    con = db_conn()
+    try:
+        cur = con.cursor()
+        cur.execute(
+            "UPDATE jobs SET locked_until = ?, updated_at = ? WHERE id = ? AND lease_token = ?",
+            (now + JOB_VISIBILITY_TIMEOUT_SECONDS, now, job["id"], job["lease_token"]),
+        )
+        con.commit()
+        return cur.rowcount > 0
+    finally:
+        con.close()
+
+
+@contextlib.contextmanager
+def _job_lease_heartbeat(job: Dict[str, Any]):
+    """Keep extending the job's lease while its handler runs.
+
+    Without this, a render or caption call that outlives JOB_VISIBILITY_TIMEOUT_SECONDS
+    would be claimed and run a second time by another worker. If this process dies the
+    heartbeat stops with it and the lease expires as usual.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(max(1, JOB_VISIBILITY_TIMEOUT_SECONDS // 3)):
+            try:
+                if not _extend_job_lease(job):
+                    _job_logger.warning("job %s lost its lease while running", job["id"])
+                    return
+            except Exception:
+                _job_logger.exception("could not extend the lease of job %s", job["id"])
+
+    thread = threading.Thread(target=beat, name=f"job-lease-{job['id']}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish_job(job: Dict[str, Any], error: Optional[str] = None) -> None:
+    """Mark a leased job done, requeue it with backoff, or fail it once attempts run out.
+
+    A retry that an identical queued job will cover is marked superseded instead.
+
+    The update is conditional on the lease token, so a worker whose lease expired and was
+    taken over cannot overwrite the newer attempt's outcome.
+    """
+    now = _now_ts()
+    if error is None:
+        status, run_at = "done", None
+    elif job["attempts"] >= job["max_attempts"]:
+        status, run_at = "failed", None
+    else:
+        status = "queued"
+        run_at = now + min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))
+    con = db_conn()
+    try:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        if status == "queued" and job.get("dedupe_key"):
+            # Only one job per dedupe key may be queued. If an identical job was queued
+            # meanwhile, it will do this work: retire this one instead of requeueing it.
+            cur.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status = 'queued' AND id != ?",
+                (job["dedupe_key"], job["id"]),
+            )
+            row = cur.fetchone()
+            if row:
+                status, run_at = "superseded", None
+                error = f"{error} (retry merged into queued job {row[0]})"
+        cur.execute(
+            """
+            UPDATE jobs
+            SET status = ?, run_at = COALESCE(?, run_at), lease_token = NULL, locked_until = NULL,
+                last_error = ?, finished_at = ?, updated_at = ?
+            WHERE id = ? AND lease_token = ?
+            """,
+            (
+                status,
+                run_at,
+                error[:2000] if error else None,
+                now if run_at is None else None,
+                now,
+                job["id"],
+                job["lease_token"],
+            ),
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def _blog_post_progress(blog_post_id: int, since: int) -> tuple[bool, bool]:
+    """Whether a background prediction was started / content assets were written since a timestamp."""
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT 1 FROM replicate_predictions WHERE blog_post_id = ? AND created_at >= ? LIMIT 1",
+        (blog_post_id, since),
+    )
+    started = cur.fetchone() is not None
+    cur.execute(
+        "SELECT 1 FROM content_assets WHERE blog_post_id = ? AND created_at >= ? LIMIT 1",
+        (blog_post_id, since),
+    )
+    rendered = cur.fetchone() is not None
+    con.close()
+    return started, rendered
+
+
+def _run_process_blog_post_job(job: Dict[str, Any]) -> None:
+    blog_post_id = int(job["payload"]["blog_post_id"])
+    if job["attempts"] > 1:
+        # An earlier attempt may have got further and then failed or lost its lease
+        # before the job was marked done; don't pay for or schedule the same post twice.
+        started, rendered = _blog_post_progress(blog_post_id, job["created_at"])
+        if rendered:
+            return
+        if started:
+            _generate_captions_with_queued_peers(_get_blog_post(blog_post_id))
+            return
+    process_blog_post(blog_post_id)
+
+
+def _run_render_blog_post_job(job: Dict[str, Any]) -> None:
+    blog_post_id = int(job["payload"]["blog_post_id"])
+    if job["attempts"] > 1 and _blog_post_progress(blog_post_id, job["created_at"])[1]:
+        return
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT prompt, status, output_url, library_key FROM replicate_predictions WHERE id = ?",
+        (job["payload"]["prediction_id"],),
+    )
+    row = cur.fetchone()
+    con.close()
+    if not row:
+        raise ValueError(f"unknown prediction {job['payload']['prediction_id']}")
+    prompt, status, output_url, library_key = row
+    img_bytes = _download_prediction_output(output_url) if status == "succeeded" else None
+    render_and_schedule_blog_post(_get_blog_post(blog_post_id), img_bytes, prompt)
+    if img_bytes is not None and library_key:
+        add_library_background(library_key, img_bytes, uses=1)
+
+
+def _run_store_library_background_job(job: Dict[str, Any]) -> None:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT library_key, output_url FROM replicate_predictions WHERE id = ?",
+        (job["payload"]["prediction_id"],),
+    )
+    row = cur.fetchone()
+    con.close()
+    if not row:
+        return
+    img_bytes = _download_prediction_output(row[1])
+    if img_bytes is None:
+        raise ValueError(f"could not download output of prediction {job['payload']['prediction_id']}")
+    add_library_background(row[0], img_bytes)
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "process_blog_post": _run_process_blog_post_job,
+    "render_blog_post": _run_render_blog_post_job,
+    "store_library_background": _run_store_library_background_job,
+}
+
+_job_logger = logging.getLogger("postify.jobs")
+_job_stop = threading.Event()
+_job_wakeup = threading.Event()
+_job_threads: List[threading.Thread] = []
+
+
+def run_next_job() -> bool:
+    """Claim and run one job. Returns False when nothing was runnable."""
+    job = _claim_job()
+    if job is None:
+        return False
+    if job["attempts"] > job["max_attempts"]:
+        # Lease expired on the final attempt (worker killed or hung); don't run it again.
+        job["attempts"] = job["max_attempts"]
+        _finish_job(job, "lease expired on final attempt")
+        return True
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        job["attempts"] = job["max_attempts"]
+        _finish_job(job, f"no handler for job kind {job['kind']}")
+        return True
+    started = time.perf_counter()
+    span = start_span(f"job {job['kind']}", parent=job["trace_context"], job_id=job["id"], attempt=job["attempts"])
+    try:
+        with _job_lease_heartbeat(job):
+            handler(job)
+    except Exception as e:
+        JOB_SECONDS.labels(job["kind"], "error").observe(time.perf_counter() - started)
+        end_span(span, e)
+        _finish_job(job, f"{type(e).__name__}: {e}")
+    else:
+        JOB_SECONDS.labels(job["kind"], "ok").observe(time.perf_counter() - started)
+        end_span(span)
+        _finish_job(job)
+    return True
+
+
+def _job_worker_loop() -> None:
+    while not _job_stop.is_set():
+        try:
+            if run_next_job():
+                continue
+        except Exception:
+            # Queue bookkeeping failed (e.g. database locked); back off and try again.
+            _job_logger.exception("job worker could not claim or finish a job")
+        _job_wakeup.wait(JOB_POLL_INTERVAL_SECONDS)
+        _job_wakeup.clear()
+
+
+def start_job_workers(count: int = JOB_WORKERS) -> None:
+    _job_stop.clear()
+    for i in range(max(0, int(count)) - len(_job_threads)):
+        t = threading.Thread(target=_job_worker_loop, name=f"job-worker-{i}", daemon=True)
+        t.start()
+        _job_threads.append(t)
+
+
+def stop_job_workers(timeout: float = 10.0) -> None:
+    """Stop picking up jobs. A job still running past the timeout is left leased and is
+    retried by another process once its visibility timeout expires."""
+    _job_stop.set()
+    _job_wakeup.set()
+    deadline = time.monotonic() + timeout
+    for t in _job_threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    _job_threads.clear()
+
+
+def purge_finished_jobs(batch_size: int = 1000) -> int:
+    """Delete done/failed/superseded jobs older than JOB_RETENTION_SECONDS, in small batches."""
+    cutoff = _now_ts() - JOB_RETENTION_SECONDS
+    batch_size = max(1, int(batch_size))
+    deleted = 0
+    con = db_conn()
+    cur = con.cursor()
+    while True:
+        cur.execute(
+            """
+            DELETE FROM jobs
+            WHERE id IN (
+                SELECT id FROM jobs WHERE status IN ('done', 'failed', 'superseded') AND finished_at < ? LIMIT ?
+            )
+            """,
+            (cutoff, batch_size),
+        )
+        con.commit()
+        deleted += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+    con.close()
+    return deleted
 
 
+@app.get("/automation/jobs/stats")
+def automation_job_stats(window_seconds: int = 3600):
+    """Queue depth, lag and recent throughput, per job kind."""
+    window_seconds = max(60, min(int(window_seconds), 7 * 24 * 60 * 60))
+    now = _now_ts()
+    since = now - window_seconds
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT kind,
+               SUM(status = 'queued' AND run_at <= ?),
+               SUM(status = 'queued' AND run_at > ?),
+               SUM(status = 'running' AND locked_until > ?),
+               SUM(status = 'running' AND locked_until <= ?),
+               MIN(CASE WHEN status = 'queued' AND run_at <= ? THEN run_at END),
+               SUM(status = 'done' AND finished_at >= ?),
+               SUM(status = 'failed' AND finished_at >= ?),
+               AVG(CASE WHEN status = 'done' AND finished_at >= ? THEN finished_at - started_at END),
+               SUM(status = 'superseded' AND finished_at >= ?)
+        FROM jobs
+        GROUP BY kind
+        """,
+        (now, now, now, now, now, since, since, since, since),
+    )
+    rows = cur.fetchall()
+    con.close()
+    return {
+        "window_seconds": window_seconds,
+        "workers_per_process": JOB_WORKERS,
+        "kinds": {
+            r[0]: {
+                "ready": r[1] or 0,
+                "delayed": r[2] or 0,
+                "running": r[3] or 0,
+                "expired_leases": r[4] or 0,
+                "oldest_ready_age_seconds": (now - r[5]) if r[5] is not None else 0,
+                "done": r[6] or 0,
+                "failed": r[7] or 0,
+                "superseded": r[9] or 0,
+                "throughput_per_minute": round((r[6] or 0) * 60 / window_seconds, 2),
+                "avg_run_seconds": round(r[8], 1) if r[8] is not None else None,
+            }
+            for r in rows
+        },
+    }
+
+
+@app.get("/automation/jobs/{job_id}")
+def automation_job_status(job_id: int):
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT id, kind, payload, status, attempts, max_attempts, run_at, last_error, created_at, started_at, finished_at
+        FROM jobs WHERE id = ?
+        """,
+        (job_id,),
+    )
+    r = cur.fetchone()
+    con.close()
+    if not r:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": r[0],
+        "kind": r[1],
+        "payload": json.loads(r[2] or "{}"),
+        "status": r[3],
+        "attempts": r[4],
+        "max_attempts": r[5],
+        "run_at": r[6],
+        "error": r[7],
+        "created_at": r[8],
+        "started_at": r[9],
+        "finished_at": r[10],
+    }
+
+
+@PUBLISHER_CYCLE_SECONDS.time()
+@slow_watch("publisher.cycle", SLOW_PUBLISHER_CAPTURE_MS)
 def publish_due_scheduled_posts():
     con = db_conn()
     cur = con.cursor()
     cur.execute(
-        "SELECT id, user_id, platform, content, image_path FROM scheduled_posts WHERE status = ? AND scheduled_at <= ? ORDER BY scheduled_at ASC LIMIT 10",
+        "SELECT id, user_id, platform, content, image_path, scheduled_at, trace_context FROM scheduled_posts WHERE status = ? AND scheduled_at <= ? ORDER BY scheduled_at ASC LIMIT 10",
         ("scheduled", _now_ts()),
     )
     rows = cur.fetchall()
@@ -1246,240 +4275,603 @@ def publish_due_scheduled_posts():
         con.close()
         return
 
-    for row in rows:
-        sp_id, user_id, platform, content, image_path = row
-        try:
+    cycle_span = start_span("publisher.cycle", posts=len(rows))
+    try:
+        for row in rows:
+            sp_id, user_id, platform, content, image_path, scheduled_at, trace_context = row
             platform = str(platform).lower().strip()
-            if platform == "facebook":
-                page_id = os.getenv("FB_PAGE_ID")
-                if not page_id:
-                    raise Exception("facebook not connected - missing FB_PAGE_ID")
+            started = time.perf_counter()
+            platform_token = _platform_label.set(platform)
+            PUBLISH_LAG_SECONDS.labels(platform).observe(max(0, _now_ts() - scheduled_at))
+            # Continues the trace of the blog post that scheduled it, linked to this cycle.
+            publish_span = start_span(
+                f"publish {platform}",
+                parent=trace_context,
+                links=[cycle_span.traceparent],
+                platform=platform,
+                scheduled_post_id=sp_id,
+            )
+            try:
+                if platform == "facebook":
+                    page_id = os.getenv("FB_PAGE_ID")
+                    if not page_id:
+                        raise Exception("facebook not connected - missing FB_PAGE_ID")
                 
-                token = get_access_token(user_id, "facebook")
-                if not token:
-                    raise Exception("facebook not connected")
+                    token = get_access_token(user_id, "facebook")
+                    if not token:
+                        raise Exception("facebook not connected")
                 
-                try:
-                    if image_path and Path(UPLOAD_DIR, image_path).exists():
-                        # Read image bytes
-                        img_bytes = Path(UPLOAD_DIR, image_path).read_bytes()
-                        filename = Path(image_path).name
-                        
-                        # Upload media first
-                        media_result = facebook_upload_media(
-                            page_id=page_id,
-                            page_access_token=token,
-                            media_bytes=img_bytes,
-                            filename=filename,
-                            published=False
-                        )
-                        
-                        # Get media ID
-                        media_id = media_result.get("id")
-                        if not media_id:
-                            raise Exception("Failed to upload media to Facebook")
+                    try:
+                        if image_path and Path(UPLOAD_DIR, image_path).exists():
+                            # Read image bytes
+                            img_bytes = Path(UPLOAD_DIR, image_path).read_bytes()
+                            filename = Path(image_path).name
                         
-                        # Create post with media
-                        fb_res = facebook_post_with_media(
-                            page_id=page_id,
-                            page_access_token=token,
-                            message=content or "",
-                            media_ids=[media_id],
-                            published=True
-                        )
-                    else:
-                        # Create text post
-                        fb_res = facebook_post_text(page_id, token, content or "")
+                            # Upload and post in one batch request
+                            fb_res = facebook_post_photo_batched(
+                                page_id=page_id,
+                                page_access_token=token,
+                                message=content or "",
+                                media_bytes=img_bytes,
+                                filename=filename
+                            )
+                        else:
+                            # Create text post
+                            fb_res = facebook_post_text(page_id, token, content or "")
                     
-                    external_id = str(fb_res.get("id") or "")
-                    cur.execute(
-                        "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
-                        ("sent", external_id, sp_id),
-                    )
+                        external_id = str(fb_res.get("id") or "")
+                        cur.execute(
+                            "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
+                            ("sent", external_id, sp_id),
+                        )
                     
-                except Exception as e:
-                    error_message = facebook_handle_errors(str(e))
-                    cur.execute(
-                        "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
-                        ("failed", error_message, sp_id),
-                    )
-
-            elif platform == "twitter":
-                access_token = get_access_token(user_id, "twitter")
-                if not access_token:
-                    raise Exception("twitter not connected")
+                    except Exception as e:
+                        error_message = facebook_handle_errors(str(e))
+                        cur.execute(
+                            "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
+                            ("failed", error_message, sp_id),
+                        )
 
-                cur2 = con.cursor()
-                cur2.execute(
-                    "SELECT meta FROM tokens WHERE user_id = ? AND platform = ?",
-                    (user_id, "twitter"),
-                )
-                mrow = cur2.fetchone()
-                meta = json.loads((mrow[0] if mrow else "{}") or "{}")
-                access_token_secret = meta.get("access_token_secret")
-                api_key = os.getenv("TWITTER_API_KEY") or os.getenv("TWITTER_CONSUMER_KEY")
-                api_secret = os.getenv("TWITTER_API_SECRET") or os.getenv("TWITTER_CONSUMER_SECRET")
-                if not access_token_secret or not api_key or not api_secret:
-                    raise Exception("twitter credentials missing")
-
-                # Handle media upload for scheduled posts
-                media_ids = []
-                if image_path and Path(UPLOAD_DIR, image_path).exists():
-                    try:
-                        img_bytes = Path(UPLOAD_DIR, image_path).read_bytes()
-                        upload_result = twitter_upload_media(
+                elif platform == "twitter":
+                    access_token = get_access_token(user_id, "twitter")
+                    if not access_token:
+                        raise Exception("twitter not connected")
+
+                    meta = get_token_meta(user_id, "twitter")
+                    access_token_secret = meta.get("access_token_secret")
+                    api_key = os.getenv("TWITTER_API_KEY") or os.getenv("TWITTER_CONSUMER_KEY")
+                    api_secret = os.getenv("TWITTER_API_SECRET") or os.getenv("TWITTER_CONSUMER_SECRET")
+                    if not access_token_secret or not api_key or not api_secret:
+                        raise Exception("twitter credentials missing")
+
+                    def upload_tweet_media() -> str:
+                        try:
+                            return twitter_upload_media(
+                                access_token=access_token,
+                                access_token_secret=access_token_secret,
+                                api_key=api_key,
+                                api_secret=api_secret,
+                                media_bytes=None,
+                                filename=image_path,
+                                media_path=_media_path(image_path),
+                            )["media_id"]
+                        except Exception as e:
+                            raise Exception(f"Failed to upload Twitter media: {str(e)}")
+
+                    def tweet(media_ids: Optional[List[str]]) -> Dict[str, Any]:
+                        return twitter_post_with_media(
                             access_token=access_token,
                             access_token_secret=access_token_secret,
                             api_key=api_key,
                             api_secret=api_secret,
-                            media_bytes=img_bytes,
-                            filename=image_path
+                            content=content or "",
+                            media_ids=media_ids
                         )
-                        media_ids.append(upload_result["media_id"])
-                    except Exception as e:
-                        raise Exception(f"Failed to upload Twitter media: {str(e)}")
-                
-                # Create tweet with media
-                tweet_result = twitter_post_with_media(
-                    access_token=access_token,
-                    access_token_secret=access_token_secret,
-                    api_key=api_key,
-                    api_secret=api_secret,
-                    content=content or "",
-                    media_ids=media_ids if media_ids else None
-                )
+
+                    # Create tweet with media, reusing a recent upload of the same image
+                    if image_path and Path(UPLOAD_DIR, image_path).exists():
+                        tweet_result = post_with_media_cached(
+                            "twitter", access_token, _media_path(image_path), upload_tweet_media, lambda media_id: tweet([media_id])
+                        )
+                    else:
+                        tweet_result = tweet(None)
                 
-                external_id = str(tweet_result.get("id") or "")
-                cur.execute(
-                    "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
-                    ("sent", external_id, sp_id),
-                )
+                    external_id = str(tweet_result.get("id") or "")
+                    cur.execute(
+                        "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
+                        ("sent", external_id, sp_id),
+                    )
+
+                elif platform == "instagram":
+                    token = get_access_token(user_id, "instagram")
+                    if not token:
+                        raise Exception("instagram not connected")
 
-            elif platform == "instagram":
-                token = get_access_token(user_id, "instagram")
-                if not token:
-                    raise Exception("instagram not connected")
+                    ig_user_id = os.getenv("IG_USER_ID")
+                    if not ig_user_id:
+                        raise Exception("instagram not connected - missing IG_USER_ID")
 
-                if not image_path or not Path(UPLOAD_DIR, image_path).exists():
-                    raise Exception("instagram requires image")
+                    if not image_path or not Path(UPLOAD_DIR, image_path).exists():
+                        raise Exception("instagram requires image")
 
-                try:
-                    # Read image bytes
-                    img_bytes = Path(UPLOAD_DIR, image_path).read_bytes()
-                    filename = Path(image_path).name
+                    try:
+                        # Instagram fetches the stored image from its public URL
+                        upload_result = instagram_upload_media(
+                            access_token=token,
+                            ig_user_id=ig_user_id,
+                            media_name=image_path,
+                            caption=content or ""
+                        )
                     
-                    # Upload media to Instagram
-                    upload_result = instagram_upload_media(
-                        access_token=token,
-                        media_bytes=img_bytes,
-                        filename=filename,
-                        media_type='IMAGE'
-                    )
+                        # Publish the media
+                        publish_result = instagram_publish_media(
+                            access_token=token,
+                            ig_user_id=ig_user_id,
+                            container_id=upload_result["container_id"]
+                        )
                     
-                    # Publish the media
-                    publish_result = instagram_publish_media(
-                        access_token=token,
-                        container_id=upload_result["container_id"],
-                        caption=content or ""
-                    )
+                        external_id = str(publish_result.get("id") or "")
+                        cur.execute(
+                            "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
+                            ("sent", external_id, sp_id),
+                        )
                     
-                    external_id = str(publish_result.get("id") or "")
+                    except Exception as e:
+                        error_message = instagram_handle_errors(str(e))
+                        cur.execute(
+                            "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
+                            ("failed", error_message, sp_id),
+                        )
+
+                elif platform == "linkedin":
+                    token = get_access_token(user_id, "linkedin")
+                    if not token:
+                        raise Exception("linkedin not connected")
+                    if not LINKEDIN_AUTHOR_URN:
+                        raise Exception("missing LINKEDIN_AUTHOR_URN")
+
+                    blog_url = None
+                    try:
+                        cur3 = con.cursor()
+                        cur3.execute("SELECT blog_post_id FROM scheduled_posts WHERE id = ?", (sp_id,))
+                        brow = cur3.fetchone()
+                        if brow:
+                            bp = _get_blog_post(int(brow[0]))
+                            blog_url = bp.get("url")
+                    except Exception:
+                        blog_url = None
+
+                    def upload_linkedin_image() -> str:
+                        try:
+                            return linkedin_upload_media(
+                                access_token=token,
+                                author_urn=LINKEDIN_AUTHOR_URN,
+                                media_bytes=None,
+                                filename=image_path,
+                                media_path=_media_path(image_path)
+                            )["media_urn"]
+                        except Exception as e:
+                            raise Exception(f"Failed to upload LinkedIn media: {str(e)}")
+
+                    def share(media_urns: Optional[List[str]]) -> Dict[str, Any]:
+                        return linkedin_share_post(
+                            author_urn=LINKEDIN_AUTHOR_URN,
+                            access_token=token,
+                            text=content or "",
+                            article_url=blog_url,
+                            media_urns=media_urns
+                        )
+
+                    if image_path and _media_path(image_path).exists():
+                        # Streamed from the media store, part by part.
+                        res = post_with_media_cached(
+                            "linkedin",
+                            token,
+                            _media_path(image_path),
+                            upload_linkedin_image,
+                            lambda media_urn: share([media_urn]),
+                        )
+                    else:
+                        res = share(None)
+
+                    external_id = res.get("restli_id") or ""
                     cur.execute(
                         "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
-                        ("sent", external_id, sp_id),
+                        ("sent", str(external_id), sp_id),
                     )
-                    
-                except Exception as e:
-                    error_message = instagram_handle_errors(str(e))
+                else:
                     cur.execute(
                         "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
-                        ("failed", error_message, sp_id),
+                        ("failed", "unsupported platform", sp_id),
                     )
 
-            elif platform == "linkedin":
-                token = get_access_token(user_id, "linkedin")
-                if not token:
-                    raise Exception("linkedin not connected")
-                if not LINKEDIN_AUTHOR_URN:
-                    raise Exception("missing LINKEDIN_AUTHOR_URN")
-
-                blog_url = None
-                try:
-                    cur3 = con.cursor()
-                    cur3.execute("SELECT blog_post_id FROM scheduled_posts WHERE id = ?", (sp_id,))
-                    brow = cur3.fetchone()
-                    if brow:
-                        bp = _get_blog_post(int(brow[0]))
-                        blog_url = bp.get("url")
-                except Exception:
-                    blog_url = None
-
-                # Handle media upload for scheduled posts
-                media_urns = []
-                if image_path and Path(UPLOAD_DIR, image_path).exists():
-                    try:
-                        img_bytes = Path(UPLOAD_DIR, image_path).read_bytes()
-                        upload_result = linkedin_upload_media(
-                            access_token=token,
-                            author_urn=LINKEDIN_AUTHOR_URN,
-                            media_bytes=img_bytes,
-                            filename=image_path
-                        )
-                        media_urns.append(upload_result["media_urn"])
-                    except Exception as e:
-                        raise Exception(f"Failed to upload LinkedIn media: {str(e)}")
-
-                res = linkedin_share_post(
-                    author_urn=LINKEDIN_AUTHOR_URN,
-                    access_token=token,
-                    text=content or "",
-                    article_url=blog_url,
-                    media_urns=media_urns if media_urns else None
-                )
-
-                external_id = res.get("restli_id") or ""
+            except Exception as e:
                 cur.execute(
-                    "UPDATE scheduled_posts SET status = ?, external_id = ?, error = NULL WHERE id = ?",
-                    ("sent", str(external_id), sp_id),
+                    "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
+                    ("failed", str(e), sp_id),
                 )
-            else:
+            finally:
+                _platform_label.reset(platform_token)
+                cur.execute("SELECT status, error FROM scheduled_posts WHERE id = ?", (sp_id,))
+                status_row = cur.fetchone() or ("unknown", None)
+                if image_path and status_row[0] in ("sent", "failed"):
+                    # Sent and failed posts are never picked up again, so the image is no longer needed.
+                    _release_media(cur, image_path)
+                PUBLISH_SECONDS.labels(platform, status_row[0]).observe(time.perf_counter() - started)
+                publish_span.set_attribute("status", status_row[0])
+                end_span(publish_span, status_row[1] if status_row[0] == "failed" else sys.exc_info()[1])
+
+        con.commit()
+    finally:
+        con.close()
+        end_span(cycle_span, sys.exc_info()[1])
+
+
+def get_access_token(user_id: str, platform: str) -> Optional[str]:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT access_token FROM tokens WHERE user_id = ? AND platform = ?",
+        (user_id, platform),
+    )
+    row = cur.fetchone()
+    con.close()
+    return row[0] if row else None
+
+
+def get_connected_platforms(user_id: str) -> List[str]:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT platform FROM tokens WHERE user_id = ?",
+        (user_id,),
+    )
+    rows = cur.fetchall()
+    con.close()
+    return [r[0] for r in rows]
+
+
+def get_token_meta(user_id: str, platform: str) -> Dict[str, Any]:
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "SELECT meta FROM tokens WHERE user_id = ? AND platform = ?",
+        (user_id, platform),
+    )
+    row = cur.fetchone()
+    con.close()
+    return json.loads((row[0] if row else "{}") or "{}")
+
+
+def _metrics_interval(age_seconds: int) -> int:
+    """How long to wait before sampling a post of this age again."""
+    for max_age, interval in METRICS_SCHEDULE:
+        if age_seconds < max_age:
+            return interval
+    return METRICS_SCHEDULE[-1][1]
+
+
+def _flatten_graph_insights(insights: List[Dict[str, Any]]) -> Dict[str, Any]:
+    out = {}
+    for item in insights:
+        values = item.get("values") or []
+        if values:
+            out[item.get("name")] = values[-1].get("value")
+        elif "total_value" in item:
+            out[item.get("name")] = (item.get("total_value") or {}).get("value")
+    return out
+
+
+def _is_count(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _max_metrics(current: Dict[str, Any], sample: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-metric maximum of two samples of lifetime counters; nested counts (e.g. reactions by type) key by key."""
+    out = dict(current)
+    for name, value in sample.items():
+        old = out.get(name)
+        if isinstance(value, dict) and isinstance(old, dict):
+            out[name] = _max_metrics(old, value)
+        elif _is_count(value) and _is_count(old):
+            out[name] = max(old, value)
+        else:
+            out[name] = value
+    return out
+
+
+def _metrics_delta(day: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    """How much each counter grew from the previous day's total to this day's."""
+    out = {}
+    for name, value in day.items():
+        before = previous.get(name)
+        if isinstance(value, dict):
+            out[name] = _metrics_delta(value, before if isinstance(before, dict) else {})
+        elif _is_count(value):
+            out[name] = value - (before if _is_count(before) else 0)
+    return out
+
+
+def _roll_up_daily_metrics(cur, scheduled_post_id: int, platform: str, sample: Dict[str, Any], now: int) -> None:
+    """Fold one sample into the post's row for today.
+
+    The row keeps the day's highest value of every counter (platform totals are lifetime
+    counts, and a later sample can briefly report less) and its growth over the previous
+    day's total.
+    """
+    day = datetime.datetime.fromtimestamp(now, tz=ZoneInfo(DEFAULT_TZ)).date().isoformat()
+    cur.execute(
+        "SELECT metrics FROM post_metrics_daily WHERE scheduled_post_id = ? AND day = ?",
+        (scheduled_post_id, day),
+    )
+    row = cur.fetchone()
+    metrics = _max_metrics(json.loads(row[0]) if row else {}, sample)
+    cur.execute(
+        "SELECT metrics FROM post_metrics_daily WHERE scheduled_post_id = ? AND day < ? ORDER BY day DESC LIMIT 1",
+        (scheduled_post_id, day),
+    )
+    row = cur.fetchone()
+    delta = _metrics_delta(metrics, json.loads(row[0]) if row else {})
+    cur.execute(
+        """
+        INSERT INTO post_metrics_daily (scheduled_post_id, day, platform, metrics, delta, samples, updated_at)
+        VALUES (?, ?, ?, ?, ?, 1, ?)
+        ON CONFLICT(scheduled_post_id, day)
+        DO UPDATE SET metrics=excluded.metrics, delta=excluded.delta, samples=samples + 1, updated_at=excluded.updated_at
+        """,
+        (scheduled_post_id, day, platform, json.dumps(metrics), json.dumps(delta), now),
+    )
+
+
+def _collect_platform_metrics(user_id: str, platform: str, external_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch current metrics for one account's posts, as few requests as the platform allows."""
+    if platform == "facebook":
+        token = get_access_token(user_id, "facebook")
+        if not token:
+            return {}
+        res = facebook_get_post_insights_batch(external_ids, token)
+        return {k: _flatten_graph_insights(v["insights"]) for k, v in res.items() if "insights" in v}
+
+    if platform == "instagram":
+        token = get_access_token(user_id, "instagram")
+        if not token:
+            return {}
+        res = instagram_get_media_insights_batch(token, external_ids)
+        return {k: _flatten_graph_insights(v["insights"]) for k, v in res.items() if "insights" in v}
+
+    if platform == "twitter":
+        access_token = get_access_token(user_id, "twitter")
+        meta = get_token_meta(user_id, "twitter")
+        api_key = os.getenv("TWITTER_API_KEY") or os.getenv("TWITTER_CONSUMER_KEY")
+        api_secret = os.getenv("TWITTER_API_SECRET") or os.getenv("TWITTER_CONSUMER_SECRET")
+        if not access_token or not meta.get("access_token_secret") or not api_key or not api_secret:
+            return {}
+        return twitter_get_tweet_metrics_bulk(access_token, meta["access_token_secret"], api_key, api_secret, external_ids)
+
+    return {}
+
+
+def collect_post_metrics(limit: int = METRICS_COLLECT_BATCH_SIZE) -> int:
+    """Sample metrics for sent posts that are due, store them locally, and schedule the next sample.
+
+    Posts are sampled often while new and less often as they age (METRICS_SCHEDULE).
+    Each sample is appended to post_metrics and folded into the daily post_metrics_daily
+    rollup (the day's totals and their growth), which is what the dashboard endpoints read.
+    """
+    now = _now_ts()
+    con = db_conn()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT sp.id, sp.user_id, sp.platform, sp.external_id, sp.scheduled_at
+        FROM scheduled_posts sp
+        LEFT JOIN post_metrics_schedule ms ON ms.scheduled_post_id = sp.id
+        WHERE sp.status = 'sent' AND sp.external_id IS NOT NULL AND sp.external_id != ''
+          AND sp.platform IN ('facebook', 'instagram', 'twitter')
+          AND sp.scheduled_at >= ?
+          AND (ms.next_collect_at IS NULL OR ms.next_collect_at <= ?)
+        ORDER BY COALESCE(ms.next_collect_at, 0) ASC
+        LIMIT ?
+        """,
+        (now - METRICS_SCHEDULE[-1][0], now, limit),
+    )
+    rows = cur.fetchall()
+    con.close()
+
+    groups: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        groups.setdefault((row[1], row[2]), []).append(row)
+
+    collected = 0
+    for (user_id, platform), posts in groups.items():
+        try:
+            metrics = _collect_platform_metrics(user_id, platform, [p[3] for p in posts])
+        except Exception:
+            metrics = {}
+
+        con = db_conn()
+        cur = con.cursor()
+        # Daily rows are read, merged and written back; keep other workers out meanwhile.
+        cur.execute("BEGIN IMMEDIATE")
+        for sp_id, _, _, external_id, sent_at in posts:
+            sample = metrics.get(external_id)
+            if sample is not None:
                 cur.execute(
-                    "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
-                    ("failed", "unsupported platform", sp_id),
+                    "INSERT INTO post_metrics (scheduled_post_id, platform, external_id, collected_at, metrics) VALUES (?, ?, ?, ?, ?)",
+                    (sp_id, platform, external_id, now, json.dumps(sample)),
                 )
+                _roll_up_daily_metrics(cur, sp_id, platform, sample, now)
+                collected += 1
 
-        except Exception as e:
+            # Failed lookups still move to the next slot, so a broken post can't hog the batch.
             cur.execute(
-                "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
-                ("failed", str(e), sp_id),
+                """
+                INSERT INTO post_metrics_schedule (scheduled_post_id, next_collect_at, collect_count)
+                VALUES (?, ?, 1)
+                ON CONFLICT(scheduled_post_id)
+                DO UPDATE SET next_collect_at=excluded.next_collect_at, collect_count=collect_count + 1
+                """,
+                (sp_id, now + _metrics_interval(now - int(sent_at))),
             )
-
-    con.commit()
-    con.close()
+        con.commit()
+        con.close()
+    return collected
 
 
-def get_access_token(user_id: str, platform: str) -> Optional[str]:
+@app.get("/automation/metrics")
+def automation_post_metrics(user_id: str, limit: int = 50):
+    """Latest locally stored metrics for a user's sent posts; never calls the platforms."""
+    limit = max(1, min(int(limit), 200))
     con = db_conn()
     cur = con.cursor()
     cur.execute(
-        "SELECT access_token FROM tokens WHERE user_id = ? AND platform = ?",
-        (user_id, platform),
+        """
+        SELECT sp.id, sp.platform, sp.external_id, d.day, d.metrics, d.delta, d.updated_at
+        FROM scheduled_posts sp
+        JOIN post_metrics_daily d ON d.scheduled_post_id = sp.id
+        WHERE sp.user_id = ?
+          AND d.day = (SELECT MAX(day) FROM post_metrics_daily WHERE scheduled_post_id = sp.id)
+        ORDER BY sp.scheduled_at DESC
+        LIMIT ?
+        """,
+        (user_id, limit),
     )
-    row = cur.fetchone()
+    rows = cur.fetchall()
     con.close()
-    return row[0] if row else None
+    return {
+        "items": [
+            {
+                "scheduled_post_id": r[0],
+                "platform": r[1],
+                "external_id": r[2],
+                "day": r[3],
+                "metrics": json.loads(r[4] or "{}"),
+                "delta": json.loads(r[5] or "{}"),
+                "updated_at": r[6],
+            }
+            for r in rows
+        ]
+    }
 
 
-def get_connected_platforms(user_id: str) -> List[str]:
+@app.get("/automation/metrics/{scheduled_post_id}")
+def automation_post_metrics_series(scheduled_post_id: int, user_id: str):
+    """Daily rollup series for one post."""
     con = db_conn()
     cur = con.cursor()
     cur.execute(
-        "SELECT platform FROM tokens WHERE user_id = ?",
-        (user_id,),
+        """
+        SELECT d.day, d.metrics, d.delta, d.samples
+        FROM post_metrics_daily d
+        JOIN scheduled_posts sp ON sp.id = d.scheduled_post_id
+        WHERE d.scheduled_post_id = ? AND sp.user_id = ?
+        ORDER BY d.day ASC
+        """,
+        (scheduled_post_id, user_id),
     )
     rows = cur.fetchall()
     con.close()
-    return [r[0] for r in rows]
+    return {
+        "scheduled_post_id": scheduled_post_id,
+        "days": [
+            {"day": r[0], "metrics": json.loads(r[1] or "{}"), "delta": json.loads(r[2] or "{}"), "samples": r[3]}
+            for r in rows
+        ],
+    }
+
+
+_twitter_upload_slots_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_twitter_upload_slots_lock = threading.Lock()
+
+
+def _twitter_upload_slots() -> asyncio.Semaphore:
+    """The running loop's cap on concurrent chunked uploads; an asyncio.Semaphore only works on one loop."""
+    loop = asyncio.get_running_loop()
+    with _twitter_upload_slots_lock:
+        slots = _twitter_upload_slots_by_loop.get(loop)
+        if slots is None:
+            slots = _twitter_upload_slots_by_loop[loop] = asyncio.Semaphore(max(1, TWITTER_MEDIA_UPLOAD_CONCURRENCY))
+        return slots
+
+
+def _twitter_chunked_upload(
+    api,
+    filename: str,
+    media_bytes: Optional[bytes],
+    media_path: Optional[Path],
+    media_category: str,
+):
+    """INIT, APPEND and FINALIZE a chunked X media upload without waiting for processing.
+
+    Chunks are read one at a time from media_bytes or from media_path on disk, so the
+    whole file never has to be buffered. Returns the FINALIZE response.
+    """
+    total = _media_size(media_bytes, media_path)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    media_id = api.chunked_upload_init(total, media_type, media_category=media_category).media_id
+    for index, start in enumerate(range(0, total, TWITTER_UPLOAD_CHUNK_BYTES)):
+        chunk = _read_media_range(media_bytes, media_path, start, min(start + TWITTER_UPLOAD_CHUNK_BYTES, total))
+        api.chunked_upload_append(media_id, io.BytesIO(chunk), index)
+    return api.chunked_upload_finalize(media_id)
+
+
+def _twitter_processing_delay(media) -> Optional[int]:
+    """Seconds to wait before the next STATUS check, or None once the media is ready."""
+    info = getattr(media, "processing_info", None) or {}
+    state = info.get("state")
+    if state == "failed":
+        error = info.get("error") or {}
+        raise HTTPException(status_code=400, detail=f"Twitter media processing failed: {error.get('message') or error}")
+    if state in ("pending", "in_progress"):
+        return max(1, int(info.get("check_after_secs") or 1))
+    return None
+
+
+async def twitter_upload_media_async(
+    access_token: str,
+    access_token_secret: str,
+    api_key: str,
+    api_secret: str,
+    media_bytes: Optional[bytes],
+    filename: str,
+    media_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Upload media to Twitter/X from async code.
+
+    Images go through twitter_upload_media in a worker thread. For videos and GIFs,
+    the chunked transfer runs in a thread and the STATUS checks wait with asyncio.sleep,
+    so no thread is tied up while X processes the media. At most
+    TWITTER_MEDIA_UPLOAD_CONCURRENCY of these uploads run at the same time on each event loop.
+    """
+    is_video = filename.lower().endswith('.mp4')
+    is_gif = filename.lower().endswith('.gif')
+    if not is_video and not is_gif:
+        if media_bytes is None:
+            media_bytes = await asyncio.to_thread(Path(media_path).read_bytes)
+        return await asyncio.to_thread(
+            twitter_upload_media, access_token, access_token_secret, api_key, api_secret, media_bytes, filename
+        )
+
+    tweepy = _tweepy()
+    auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
+    api = _tweepy_api(auth)
+    category = 'tweet_video' if is_video else 'tweet_gif'
+
+    try:
+        async with _twitter_upload_slots():
+            media = await asyncio.to_thread(_twitter_chunked_upload, api, filename, media_bytes, media_path, category)
+        delay = _twitter_processing_delay(media)
+        while delay is not None:
+            await asyncio.sleep(delay)
+            media = await asyncio.to_thread(api.get_media_upload_status, media.media_id)
+            delay = _twitter_processing_delay(media)
+        return {"media_id": media.media_id_string, "status": "uploaded"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to upload media to Twitter: {str(e)}")
 
 
 def twitter_upload_media(
@@ -1487,39 +4879,47 @@ def twitter_upload_media(
     access_token_secret: str,
     api_key: str,
     api_secret: str,
-    media_bytes: bytes,
-    filename: str
+    media_bytes: Optional[bytes],
+    filename: str,
+    media_path: Optional[Path] = None,
 ) -> Dict[str, Any]:
     """Upload media to Twitter/X and return media ID."""
     
     tweepy = _tweepy()
     auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
-    api = tweepy.API(auth)
+    api = _tweepy_api(auth)
     
     # Determine media type
     is_video = filename.lower().endswith('.mp4')
     is_gif = filename.lower().endswith('.gif')
     
     try:
-        if is_video:
-            # Upload video
-            media = api.media_upload(
-                filename=filename,
-                file=io.BytesIO(media_bytes),
-                media_category='tweet_video'
-            )
-        elif is_gif:
-            # Upload GIF (as animated GIF)
-            media = api.media_upload(
-                filename=filename,
-                file=io.BytesIO(media_bytes),
-                media_category='tweet_gif'
+        if is_video or is_gif:
+            # Chunked upload of a video or animated GIF, streamed from media_path if given
+            media = _twitter_chunked_upload(
+                api, filename, media_bytes, media_path, 'tweet_video' if is_video else 'tweet_gif'
             )
+            delay = _twitter_processing_delay(media)
+            while delay is not None:
+                time.sleep(delay)
+                media = api.get_media_upload_status(media.media_id)
+                delay = _twitter_processing_delay(media)
         else:
+            if media_bytes is None:
+                media_bytes = Path(media_path).read_bytes()
             # Upload image (resize if needed)
             try:
-                # Resize image to optimize for Twitter
                 img = Image.open(io.BytesIO(media_bytes))
+                if img.format in ("JPEG", "WEBP") and img.width <= 1000:
+                    # Already an X-ready variant (see _render_variants); upload as-is.
+                    media = api.media_upload(
+                        filename=filename,
+                        file=io.BytesIO(media_bytes),
+                        media_category='tweet_image'
+                    )
+                    return {"media_id": media.media_id_string, "status": "uploaded"}
+
+                # Resize image to optimize for Twitter
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
                 
@@ -1549,6 +4949,8 @@ def twitter_upload_media(
         
         return {"media_id": media.media_id_string, "status": "uploaded"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to upload media to Twitter: {str(e)}")
 
@@ -1567,7 +4969,7 @@ def twitter_post_with_media(
     
     tweepy = _tweepy()
     auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
-    api = tweepy.API(auth)
+    api = _tweepy_api(auth)
     
     try:
         # Prepare tweet parameters
@@ -1626,7 +5028,7 @@ def twitter_get_user_info(access_token: str, access_token_secret: str, api_key:
     
     tweepy = _tweepy()
     auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
-    api = tweepy.API(auth)
+    api = _tweepy_api(auth)
     
     try:
         user = api.verify_credentials(include_entities=False, skip_status=True, include_email=True)
@@ -1650,7 +5052,7 @@ def twitter_get_tweet_metrics(access_token: str, access_token_secret: str, api_k
     
     tweepy = _tweepy()
     auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
-    api = tweepy.API(auth)
+    api = _tweepy_api(auth)
     
     try:
         tweet = api.get_status(tweet_id, include_entities=True, tweet_mode='extended')
@@ -1671,6 +5073,34 @@ def twitter_get_tweet_metrics(access_token: str, access_token_secret: str, api_k
         raise HTTPException(status_code=400, detail=f"Failed to get tweet metrics: {str(e)}")
 
 
+def twitter_get_tweet_metrics_bulk(
+    access_token: str,
+    access_token_secret: str,
+    api_key: str,
+    api_secret: str,
+    tweet_ids: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Get public metrics for many tweets, 100 per lookup call."""
+    
+    tweepy = _tweepy()
+    auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
+    api = _tweepy_api(auth)
+    
+    out = {}
+    try:
+        for i in range(0, len(tweet_ids), 100):
+            for tweet in api.lookup_statuses(tweet_ids[i:i + 100], include_entities=False):
+                out[tweet.id_str] = {
+                    "retweet_count": tweet.retweet_count,
+                    "like_count": tweet.favorite_count,
+                    "reply_count": getattr(tweet, 'reply_count', 0),
+                    "quote_count": getattr(tweet, 'quote_count', 0),
+                }
+        return out
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to get tweet metrics: {str(e)}")
+
+
 def _tweepy():
     try:
         import tweepy  # type: ignore
@@ -1713,6 +5143,89 @@ def upsert_access_token(user_id: str, platform: str, access_token: str, meta: Op
     con.close()
 
 
+def _graph_video_phase(page_id: str, data: Dict[str, Any], files: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    resp = http_session.post(f"{META_GRAPH_BASE}/{page_id}/videos", data=data, files=files, timeout=120)
+    try:
+        out = resp.json()
+    except Exception:
+        out = {"raw": resp.text}
+    if resp.status_code >= 400:
+        raise HTTPException(status_code=400, detail={"platform": "facebook", "error": out})
+    return out
+
+
+def facebook_upload_video_chunked(
+    page_id: str,
+    page_access_token: str,
+    video_bytes: Optional[bytes],
+    filename: str,
+    video_path: Optional[Path] = None,
+    description: str = "",
+    published: bool = True,
+) -> Dict[str, Any]:
+    """Upload a video through a Graph API upload session (start, transfer, finish).
+
+    Chunks are read from video_bytes, or straight from video_path on disk. The Graph
+    API picks each next offset itself, so chunks go one at a time. The session id and
+    the last confirmed offset are saved after every chunk, so a retry of the same file
+    carries on from there instead of starting over.
+    """
+    file_size = _media_size(video_bytes, video_path)
+    session_key = _upload_session_key("facebook", page_access_token, _media_digest(video_bytes, video_path))
+    session = _load_upload_session(session_key)
+
+    if session:
+        state = session["state"]
+        expires_at = session["expires_at"]
+    else:
+        start = _graph_video_phase(page_id, {
+            "upload_phase": "start",
+            "file_size": file_size,
+            "access_token": page_access_token,
+        })
+        state = {
+            "upload_session_id": start["upload_session_id"],
+            "video_id": start.get("video_id"),
+            "start_offset": int(start.get("start_offset", 0)),
+            "end_offset": int(start.get("end_offset", file_size)),
+        }
+        expires_at = _now_ts() + UPLOAD_SESSION_TTL_SECONDS
+        _save_upload_session(session_key, "facebook", state, expires_at)
+
+    while state["start_offset"] < state["end_offset"]:
+        chunk = _read_media_range(video_bytes, video_path, state["start_offset"], state["end_offset"])
+        for i in range(UPLOAD_PART_RETRIES):
+            try:
+                out = _graph_video_phase(
+                    page_id,
+                    {
+                        "upload_phase": "transfer",
+                        "upload_session_id": state["upload_session_id"],
+                        "start_offset": state["start_offset"],
+                        "access_token": page_access_token,
+                    },
+                    files={"video_file_chunk": (filename, chunk, "application/octet-stream")},
+                )
+                break
+            except Exception:
+                if i == UPLOAD_PART_RETRIES - 1:
+                    raise
+                time.sleep(2 ** i)
+        state["start_offset"] = int(out["start_offset"])
+        state["end_offset"] = int(out["end_offset"])
+        _save_upload_session(session_key, "facebook", state, expires_at)
+
+    result = _graph_video_phase(page_id, {
+        "upload_phase": "finish",
+        "upload_session_id": state["upload_session_id"],
+        "description": description,
+        "published": str(published).lower(),
+        "access_token": page_access_token,
+    })
+    _finish_upload_session(session_key)
+    return {"id": state["video_id"], **result}
+
+
 def facebook_upload_media(
     page_id: str,
     page_access_token: str,
@@ -1727,24 +5240,24 @@ def facebook_upload_media(
         is_video = filename.lower().endswith('.mp4')
         
         if is_video:
-            # Upload video
-            url = f"{META_GRAPH_BASE}/{page_id}/videos"
-            data = {
-                "description": "",
-                "published": str(published).lower(),
-            }
-            files = {"source": (filename, media_bytes, "video/mp4")}
-        else:
-            # Upload image
-            url = f"{META_GRAPH_BASE}/{page_id}/photos"
-            data = {
-                "published": str(published).lower(),
-            }
-            files = {"source": (filename, media_bytes, "image/jpeg")}
-        
-        data["access_token"] = page_access_token
+            # Upload video through a resumable upload session
+            return facebook_upload_video_chunked(
+                page_id=page_id,
+                page_access_token=page_access_token,
+                video_bytes=media_bytes,
+                filename=filename,
+                published=published,
+            )
+
+        # Upload image
+        url = f"{META_GRAPH_BASE}/{page_id}/photos"
+        data = {
+            "published": str(published).lower(),
+            "access_token": page_access_token,
+        }
+        files = {"source": (filename, media_bytes, mimetypes.guess_type(filename)[0] or "image/jpeg")}
         
-        resp = requests.post(url, data=data, files=files, timeout=120)
+        resp = http_session.post(url, data=data, files=files, timeout=120)
         
         if resp.status_code >= 400:
             try:
@@ -1788,7 +5301,7 @@ def facebook_post_with_media(
         if link:
             post_data["link"] = link
         
-        resp = requests.post(url, data=post_data, timeout=30)
+        resp = http_session.post(url, data=post_data, timeout=30)
         
         if resp.status_code >= 400:
             try:
@@ -1803,37 +5316,64 @@ def facebook_post_with_media(
         raise HTTPException(status_code=400, detail=f"Facebook posting failed: {str(e)}")
 
 
+def facebook_post_photo_batched(
+    page_id: str,
+    page_access_token: str,
+    message: str,
+    media_bytes: bytes,
+    filename: str
+) -> Dict[str, Any]:
+    """Upload an unpublished photo and post it to the feed in one batch request.
+
+    Returns the feed post response plus "media_id", the photo's fbid.
+    """
+    
+    results = graph_batch(
+        page_access_token,
+        [
+            {
+                "method": "POST",
+                "relative_url": f"{page_id}/photos",
+                "body": "published=false",
+                "attached_files": "source",
+                "name": "photo",
+                "omit_response_on_success": False,
+            },
+            {
+                "method": "POST",
+                "relative_url": f"{page_id}/feed",
+                "body": urllib.parse.urlencode({"message": message, "published": "true"})
+                + '&attached_media[0]={"media_fbid":"{result=photo:$.id}"}',
+            },
+        ],
+        files={"source": (filename, media_bytes, mimetypes.guess_type(filename)[0] or "image/jpeg")},
+    )
+    media_id = graph_batch_body(results[0]).get("id")
+    post = graph_batch_body(results[1])
+    return {**post, "media_id": media_id}
+
+
 def facebook_post_video(
     page_id: str,
     page_access_token: str,
-    video_bytes: bytes,
+    video_bytes: Optional[bytes],
     filename: str,
     description: str = "",
-    published: bool = True
+    published: bool = True,
+    video_path: Optional[Path] = None,
 ) -> Dict[str, Any]:
     """Post video to Facebook."""
     
     try:
-        url = f"{META_GRAPH_BASE}/{page_id}/videos"
-        
-        data = {
-            "description": description,
-            "published": str(published).lower(),
-            "access_token": page_access_token,
-        }
-        
-        files = {"source": (filename, video_bytes, "video/mp4")}
-        
-        resp = requests.post(url, data=data, files=files, timeout=300)
-        
-        if resp.status_code >= 400:
-            try:
-                error_data = resp.json()
-            except Exception:
-                error_data = {"raw": resp.text}
-            raise HTTPException(status_code=400, detail={"platform": "facebook", "error": error_data})
-        
-        return resp.json()
+        return facebook_upload_video_chunked(
+            page_id=page_id,
+            page_access_token=page_access_token,
+            video_bytes=video_bytes,
+            filename=filename,
+            video_path=video_path,
+            description=description,
+            published=published,
+        )
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Facebook video posting failed: {str(e)}")
@@ -1913,7 +5453,7 @@ def facebook_get_page_info(
             "access_token": page_access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Facebook page info")
@@ -1957,12 +5497,12 @@ def facebook_get_page_insights(
         params = {
             "metric": ",".join(metrics),
             "period": period,
-            "since": dayjs().subtract(days, 'day').unix(),
-            "until": dayjs().unix(),
+            "since": _now_ts() - days * 24 * 60 * 60,
+            "until": _now_ts(),
             "access_token": page_access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Facebook page insights")
@@ -2000,7 +5540,7 @@ def facebook_get_post_insights(
             "access_token": page_access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Facebook post insights")
@@ -2016,6 +5556,41 @@ def facebook_get_post_insights(
         raise HTTPException(status_code=400, detail=f"Failed to get Facebook post insights: {str(e)}")
 
 
+def facebook_get_post_insights_batch(
+    post_ids: List[str],
+    page_access_token: str,
+    metrics: List[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Get insights for many Facebook posts, GRAPH_BATCH_MAX_OPERATIONS per request.
+
+    Returns one entry per post id: {"post_id", "insights"}, or {"post_id", "error"}
+    when that single lookup failed.
+    """
+    
+    if not metrics:
+        metrics = [
+            "post_impressions_unique",
+            "post_reactions_by_type_total",
+            "post_clicks",
+            "post_clicks_by_type"
+        ]
+    
+    results = graph_batch(
+        page_access_token,
+        [
+            {"method": "GET", "relative_url": f"{post_id}/insights?metric={','.join(metrics)}"}
+            for post_id in post_ids
+        ],
+    )
+    out = {}
+    for post_id, result in zip(post_ids, results):
+        if result and result["code"] < 400:
+            out[post_id] = {"post_id": post_id, "insights": result["body"].get("data", [])}
+        else:
+            out[post_id] = {"post_id": post_id, "error": result["body"] if result else None}
+    return out
+
+
 def facebook_get_user_pages(
     user_access_token: str
 ) -> List[Dict[str, Any]]:
@@ -2028,7 +5603,7 @@ def facebook_get_user_pages(
             "access_token": user_access_token
         }
         
-        resp = requests.get(url, params=params, timeout=30)
+        resp = http_session.get(url, params=params, timeout=30)
         
         if resp.status_code >= 400:
             raise HTTPException(status_code=400, detail="Failed to get Facebook pages")
@@ -2043,7 +5618,7 @@ def facebook_get_user_pages(
 
 def facebook_post_text(page_id: str, page_access_token: str, message: str) -> Dict[str, Any]:
     url = f"{META_GRAPH_BASE}/{page_id}/feed"
-    resp = requests.post(
+    resp = http_session.post(
         url,
         data={
             "message": message,
@@ -2072,7 +5647,7 @@ def facebook_post_photo(
     files = {"source": (filename, image_bytes, "application/octet-stream")}
     data = {"caption": message, "access_token": page_access_token}
 
-    resp = requests.post(url, data=data, files=files, timeout=60)
+    resp = http_session.post(url, data=data, files=files, timeout=60)
     try:
         out = resp.json()
     except Exception:
@@ -2089,7 +5664,10 @@ async def send_post(
     content: str = Form(...),
     platforms: str = Form(...),
     image: Optional[UploadFile] = File(None),
+    images: Optional[List[UploadFile]] = File(None),
 ):
+    """Post now. Instagram publishes `image` plus any extra `images` as a carousel;
+    the other platforms use the first attachment."""
     try:
         platforms_list: List[str] = json.loads(platforms)
         if not isinstance(platforms_list, list):
@@ -2097,218 +5675,269 @@ async def send_post(
     except Exception:
         raise HTTPException(status_code=400, detail="`platforms` must be a JSON array string.")
 
-    image_bytes = await image.read() if image else None
-    image_name = image.filename if image else None
-
+    uploads = ([image] if image else []) + list(images or [])
+    image_name = uploads[0].filename if uploads else None
     results = []
-    for p in platforms_list:
-        p = str(p).lower().strip()
-        try:
-            if p == "facebook":
-                page_id = os.getenv("FB_PAGE_ID")
-                if not page_id:
-                    raise HTTPException(status_code=400, detail="Missing FB_PAGE_ID in environment.")
-
-                token = get_access_token(user_id, "facebook")
-                if not token:
-                    raise HTTPException(status_code=401, detail="Facebook not connected for this user.")
-
-                try:
-                    if image_bytes:
-                        # Upload media first
-                        media_result = facebook_upload_media(
-                            page_id=page_id,
-                            page_access_token=token,
-                            media_bytes=image_bytes,
-                            filename=image_name or "upload",
-                            published=False
-                        )
-                        
-                        # Get media ID
-                        media_id = media_result.get("id")
-                        if not media_id:
-                            raise HTTPException(status_code=400, detail="Failed to upload media to Facebook")
-                        
-                        # Create post with media
-                        fb_res = facebook_post_with_media(
-                            page_id=page_id,
-                            page_access_token=token,
-                            message=content,
-                            media_ids=[media_id],
-                            published=True
-                        )
-                    else:
-                        # Create text post
-                        fb_res = facebook_post_text(page_id, token, content)
+    # Attachments are spooled into the media store once and every platform reads them
+    # from there, so a large video is never held in memory.
+    stored: List[str] = []
+    try:
+        for upload in uploads:
+            stored.append(await asyncio.to_thread(store_media_file, upload.file, Path(upload.filename or "upload").suffix))
+        image_path = _media_path(stored[0]) if stored else None
+
+        for p in platforms_list:
+            p = str(p).lower().strip()
+            attempted = len(results)
+            platform_token = _platform_label.set(p)
+            span = start_span(f"publish {p}", platform=p, source="post.send")
+            try:
+                if p == "facebook":
+                    page_id = os.getenv("FB_PAGE_ID")
+                    if not page_id:
+                        raise HTTPException(status_code=400, detail="Missing FB_PAGE_ID in environment.")
+
+                    token = get_access_token(user_id, "facebook")
+                    if not token:
+                        raise HTTPException(status_code=401, detail="Facebook not connected for this user.")
+
+                    try:
+                        if image_path:
+                            if (image_name or "").lower().endswith('.mp4'):
+                                # Videos: resumable upload session, then attach
+                                media_id = facebook_upload_media(
+                                    page_id=page_id,
+                                    page_access_token=token,
+                                    media_bytes=image_path.read_bytes(),
+                                    filename=image_name,
+                                    published=False
+                                ).get("id")
+                                if not media_id:
+                                    raise HTTPException(status_code=400, detail="Failed to upload media to Facebook")
+                                fb_res = facebook_post_with_media(
+                                    page_id=page_id,
+                                    page_access_token=token,
+                                    message=content,
+                                    media_ids=[media_id],
+                                    published=True
+                                )
+                            else:
+                                # Upload and post in one batch request
+                                fb_res = facebook_post_photo_batched(
+                                    page_id=page_id,
+                                    page_access_token=token,
+                                    message=content,
+                                    media_bytes=image_path.read_bytes(),
+                                    filename=image_name or "upload"
+                                )
+                        else:
+                            # Create text post
+                            fb_res = facebook_post_text(page_id, token, content)
                     
-                    results.append({
-                        "platform": "facebook", 
-                        "status": "success", 
-                        "response": {
-                            "id": fb_res.get("id"),
-                            "permalink_url": fb_res.get("permalink_url")
-                        }
-                    })
+                        results.append({
+                            "platform": "facebook", 
+                            "status": "success", 
+                            "response": {
+                                "id": fb_res.get("id"),
+                                "permalink_url": fb_res.get("permalink_url")
+                            }
+                        })
                     
-                except Exception as e:
-                    # Handle Facebook errors with user-friendly messages
-                    error_message = facebook_handle_errors(str(e))
-                    raise HTTPException(status_code=400, detail=error_message)
-
-            elif p == "twitter":
-                access_token = get_access_token(user_id, "twitter")
-                if not access_token:
-                    raise HTTPException(status_code=401, detail="Twitter not connected for this user.")
-
-                con = db_conn()
-                cur = con.cursor()
-                cur.execute(
-                    "SELECT meta FROM tokens WHERE user_id = ? AND platform = ?",
-                    (user_id, "twitter"),
-                )
-                row = cur.fetchone()
-                con.close()
-                meta = json.loads((row[0] if row else "{}") or "{}")
-                access_token_secret = meta.get("access_token_secret")
-                if not access_token_secret:
-                    raise HTTPException(status_code=400, detail="Missing twitter access_token_secret")
-
-                api_key = os.getenv("TWITTER_API_KEY") or os.getenv("TWITTER_CONSUMER_KEY")
-                api_secret = os.getenv("TWITTER_API_SECRET") or os.getenv("TWITTER_CONSUMER_SECRET")
-                if not api_key or not api_secret:
-                    raise HTTPException(status_code=400, detail="Missing TWITTER_API_KEY/TWITTER_API_SECRET")
-
-                # Handle media upload if present
-                media_ids = []
-                if image_bytes:
-                    try:
-                        upload_result = twitter_upload_media(
+                    except Exception as e:
+                        # Handle Facebook errors with user-friendly messages
+                        error_message = facebook_handle_errors(str(e))
+                        raise HTTPException(status_code=400, detail=error_message)
+
+                elif p == "twitter":
+                    access_token = get_access_token(user_id, "twitter")
+                    if not access_token:
+                        raise HTTPException(status_code=401, detail="Twitter not connected for this user.")
+
+                    con = db_conn()
+                    cur = con.cursor()
+                    cur.execute(
+                        "SELECT meta FROM tokens WHERE user_id = ? AND platform = ?",
+                        (user_id, "twitter"),
+                    )
+                    row = cur.fetchone()
+                    con.close()
+                    meta = json.loads((row[0] if row else "{}") or "{}")
+                    access_token_secret = meta.get("access_token_secret")
+                    if not access_token_secret:
+                        raise HTTPException(status_code=400, detail="Missing twitter access_token_secret")
+
+                    api_key = os.getenv("TWITTER_API_KEY") or os.getenv("TWITTER_CONSUMER_KEY")
+                    api_secret = os.getenv("TWITTER_API_SECRET") or os.getenv("TWITTER_CONSUMER_SECRET")
+                    if not api_key or not api_secret:
+                        raise HTTPException(status_code=400, detail="Missing TWITTER_API_KEY/TWITTER_API_SECRET")
+
+                    def upload_tweet_media() -> str:
+                        try:
+                            return twitter_upload_media(
+                                access_token=access_token,
+                                access_token_secret=access_token_secret,
+                                api_key=api_key,
+                                api_secret=api_secret,
+                                media_bytes=None,
+                                filename=image_name or "upload",
+                                media_path=image_path,
+                            )["media_id"]
+                        except Exception as e:
+                            raise HTTPException(status_code=400, detail=f"Failed to upload media to Twitter: {str(e)}")
+
+                    def tweet(media_ids: Optional[List[str]]) -> Dict[str, Any]:
+                        return twitter_post_with_media(
                             access_token=access_token,
                             access_token_secret=access_token_secret,
                             api_key=api_key,
                             api_secret=api_secret,
-                            media_bytes=image_bytes,
-                            filename=image_name or "upload"
+                            content=content,
+                            media_ids=media_ids
                         )
-                        media_ids.append(upload_result["media_id"])
-                    except Exception as e:
-                        raise HTTPException(status_code=400, detail=f"Failed to upload media to Twitter: {str(e)}")
-                
-                # Create tweet with media
-                tweet_result = twitter_post_with_media(
-                    access_token=access_token,
-                    access_token_secret=access_token_secret,
-                    api_key=api_key,
-                    api_secret=api_secret,
-                    content=content,
-                    media_ids=media_ids if media_ids else None
-                )
-                
-                results.append({
-                    "platform": "twitter", 
-                    "status": "success", 
-                    "response": {
-                        "id": tweet_result.get("id"),
-                        "text": tweet_result.get("text"),
-                        "url": f"https://twitter.com/{tweet_result.get('user', {}).get('screen_name')}/status/{tweet_result.get('id')}"
-                    }
-                })
-
-            elif p == "instagram":
-                ig_user_id = os.getenv("IG_USER_ID")
-                if not ig_user_id:
-                    raise HTTPException(status_code=400, detail="Missing IG_USER_ID in environment.")
-
-                token = get_access_token(user_id, "instagram")
-                if not token:
-                    raise HTTPException(status_code=401, detail="Instagram not connected for this user.")
-
-                if not image_bytes:
-                    raise HTTPException(status_code=400, detail="Instagram requires at least one attachment.")
 
-                try:
-                    # Save image to disk
-                    filename = save_upload_to_disk(image_bytes, image_name or "upload")
-                    
-                    # Upload media to Instagram
-                    upload_result = instagram_upload_media(
-                        access_token=token,
-                        media_bytes=image_bytes,
-                        filename=filename,
-                        media_type='IMAGE'
-                    )
-                    
-                    # Publish the media
-                    publish_result = instagram_publish_media(
-                        access_token=token,
-                        container_id=upload_result["container_id"],
-                        caption=content
-                    )
-                    
+                    # Create tweet with media if present
+                    if image_path and (image_name or "").lower().endswith(('.mp4', '.gif')):
+                        # Videos and GIFs: chunked upload; processing is awaited without holding a thread
+                        upload_result = await twitter_upload_media_async(
+                            access_token=access_token,
+                            access_token_secret=access_token_secret,
+                            api_key=api_key,
+                            api_secret=api_secret,
+                            media_bytes=None,
+                            filename=image_name,
+                            media_path=image_path,
+                        )
+                        tweet_result = tweet([upload_result["media_id"]])
+                    elif image_path:
+                        tweet_result = post_with_media_cached(
+                            "twitter", access_token, image_path, upload_tweet_media, lambda media_id: tweet([media_id])
+                        )
+                    else:
+                        tweet_result = tweet(None)
+                
                     results.append({
-                        "platform": "instagram", 
+                        "platform": "twitter", 
                         "status": "success", 
                         "response": {
-                            "id": publish_result.get("id"),
-                            "permalink": publish_result.get("permalink"),
-                            "url": publish_result.get("permalink")
+                            "id": tweet_result.get("id"),
+                            "text": tweet_result.get("text"),
+                            "url": f"https://twitter.com/{tweet_result.get('user', {}).get('screen_name')}/status/{tweet_result.get('id')}"
                         }
                     })
+
+                elif p == "instagram":
+                    ig_user_id = os.getenv("IG_USER_ID")
+                    if not ig_user_id:
+                        raise HTTPException(status_code=400, detail="Missing IG_USER_ID in environment.")
+
+                    token = get_access_token(user_id, "instagram")
+                    if not token:
+                        raise HTTPException(status_code=401, detail="Instagram not connected for this user.")
+
+                    if not stored:
+                        raise HTTPException(status_code=400, detail="Instagram requires at least one attachment.")
+
+                    try:
+                        # Instagram fetches media from our public /uploads URL
+                        if len(stored) > 1:
+                            publish_result = instagram_create_media_carousel(
+                                access_token=token,
+                                ig_user_id=ig_user_id,
+                                media_items=[
+                                    {"name": name, "bytes": _media_path(name).read_bytes()} for name in stored
+                                ],
+                                caption=content
+                            )
+                        else:
+                            upload_result = instagram_upload_media(
+                                access_token=token,
+                                ig_user_id=ig_user_id,
+                                media_name=stored[0],
+                                caption=content
+                            )
+                            publish_result = instagram_publish_media(
+                                access_token=token,
+                                ig_user_id=ig_user_id,
+                                container_id=upload_result["container_id"]
+                            )
+                    
+                        results.append({
+                            "platform": "instagram", 
+                            "status": "success", 
+                            "response": {
+                                "id": publish_result.get("id"),
+                                "permalink": publish_result.get("permalink"),
+                                "url": publish_result.get("permalink")
+                            }
+                        })
                     
-                except Exception as e:
-                    # Handle Instagram errors with user-friendly messages
-                    error_message = instagram_handle_errors(str(e))
-                    raise HTTPException(status_code=400, detail=error_message)
-
-            elif p == "linkedin":
-                token = get_access_token(user_id, "linkedin")
-                if not token:
-                    raise HTTPException(status_code=401, detail="LinkedIn not connected for this user.")
+                    except Exception as e:
+                        # Handle Instagram errors with user-friendly messages
+                        error_message = instagram_handle_errors(str(e))
+                        raise HTTPException(status_code=400, detail=error_message)
+
+                elif p == "linkedin":
+                    token = get_access_token(user_id, "linkedin")
+                    if not token:
+                        raise HTTPException(status_code=401, detail="LinkedIn not connected for this user.")
                 
-                author_urn = os.getenv("LINKEDIN_AUTHOR_URN")
-                if not author_urn:
-                    raise HTTPException(status_code=400, detail="Missing LINKEDIN_AUTHOR_URN in environment.")
+                    author_urn = os.getenv("LINKEDIN_AUTHOR_URN")
+                    if not author_urn:
+                        raise HTTPException(status_code=400, detail="Missing LINKEDIN_AUTHOR_URN in environment.")
                 
-                # Handle media upload if present
-                media_urns = []
-                if image_bytes:
-                    try:
-                        # Upload media to LinkedIn
-                        upload_result = linkedin_upload_media(
-                            access_token=token,
+                    def upload_linkedin_media() -> str:
+                        try:
+                            return linkedin_upload_media(
+                                access_token=token,
+                                author_urn=author_urn,
+                                media_bytes=None,
+                                filename=image_name or "upload",
+                                media_path=image_path
+                            )["media_urn"]
+                        except Exception as e:
+                            raise HTTPException(status_code=400, detail=f"Failed to upload media to LinkedIn: {str(e)}")
+
+                    def share(media_urns: Optional[List[str]]) -> Dict[str, Any]:
+                        return linkedin_share_post(
                             author_urn=author_urn,
-                            media_bytes=image_bytes,
-                            filename=image_name or "upload"
+                            access_token=token,
+                            text=content,
+                            article_url=None,
+                            media_urns=media_urns
                         )
-                        media_urns.append(upload_result["media_urn"])
-                    except Exception as e:
-                        raise HTTPException(status_code=400, detail=f"Failed to upload media to LinkedIn: {str(e)}")
-                
-                # Create the post
-                li_res = linkedin_share_post(
-                    author_urn=author_urn,
-                    access_token=token,
-                    text=content,
-                    article_url=None,
-                    media_urns=media_urns if media_urns else None
-                )
-                
-                results.append({
-                    "platform": "linkedin", 
-                    "status": "success", 
-                    "response": {
-                        "id": li_res.get("restli_id"),
-                        "post_url": li_res.get("post_url")
-                    }
-                })
 
-            else:
-                results.append({"platform": p, "status": "failed", "error": "Unknown platform"})
+                    # Create the post, reusing a recent upload of the same media
+                    if image_path:
+                        li_res = post_with_media_cached(
+                            "linkedin", token, image_path, upload_linkedin_media, lambda media_urn: share([media_urn])
+                        )
+                    else:
+                        li_res = share(None)
+                
+                    results.append({
+                        "platform": "linkedin", 
+                        "status": "success", 
+                        "response": {
+                            "id": li_res.get("restli_id"),
+                            "post_url": li_res.get("post_url")
+                        }
+                    })
 
-        except HTTPException as e:
-            results.append({"platform": p, "status": "failed", "error": e.detail})
-        except Exception as e:
-            results.append({"platform": p, "status": "failed", "error": str(e)})
+                else:
+                    results.append({"platform": p, "status": "failed", "error": "Unknown platform"})
+
+            except HTTPException as e:
+                results.append({"platform": p, "status": "failed", "error": e.detail})
+            except Exception as e:
+                results.append({"platform": p, "status": "failed", "error": str(e)})
+            finally:
+                _platform_label.reset(platform_token)
+                # Each handled outcome appended a result; otherwise an exception is propagating.
+                result = results[-1] if len(results) > attempted else {}
+                end_span(span, result.get("error") if result.get("status") == "failed" else sys.exc_info()[1])
+    finally:
+        for name in stored:
+            release_media(name)
 
     return {"request_id": str(uuid.uuid4()), "results": results}
 
@@ -2432,7 +6061,7 @@ def auth_callback(
             if not client_id or not client_secret or not redirect_uri:
                 raise HTTPException(status_code=400, detail="Missing LINKEDIN_CLIENT_ID/LINKEDIN_CLIENT_SECRET/LINKEDIN_REDIRECT_URI")
             token_url = "https://www.linkedin.com/oauth/v2/accessToken"
-            resp = requests.post(
+            resp = http_session.post(
                 token_url,
                 data={
                     "grant_type": "authorization_code",
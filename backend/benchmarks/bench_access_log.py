@@ -0,0 +1,123 @@
+"""Request throughput with no access log, the old synchronous logging, and the sampled pipeline.
+
+Requests go straight to the ASGI app in-process, so the numbers are the logging overhead
+on top of a trivial route, not network or server costs.
+
+    python benchmarks/bench_access_log.py --requests 20000 --rounds 5
+
+Variants are interleaved round by round and the median of the rounds is reported, so
+a noisy machine skews all of them alike.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("ACCESS_LOG_FILE", os.path.join(_scratch, "access.log"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+
+from app import main  # noqa: E402
+
+
+class SyncLogMiddleware:
+    """What gunicorn did before: three formatted lines written inline for every request."""
+
+    def __init__(self, app):
+        self.app = app
+        self.log = logging.getLogger("bench.sync")
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = logging.FileHandler(os.path.join(_scratch, "sync.log"))
+            handler.setFormatter(logging.Formatter("%(asctime)s [%(process)d] %(message)s"))
+            self.log.addHandler(handler)
+        self.log.setLevel(logging.INFO)
+
+    async def __call__(self, scope, receive, send):
+        self.log.info("pre_request %s %s", scope["method"], scope["path"])
+        start = time.perf_counter()
+        await self.app(scope, receive, send)
+        self.log.info("post_request %s %s", scope["method"], scope["path"])
+        self.log.info('%s - "%s %s" 200 %.3f', scope.get("client"), scope["method"], scope["path"], time.perf_counter() - start)
+
+
+def _app(middleware):
+    app = FastAPI(middleware=[Middleware(m) for m in middleware])
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    return app
+
+
+async def _drive(app, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(min(500, requests)):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return requests / (time.perf_counter() - start)
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    main.start_access_log()
+    try:
+        variants = [
+            ("no access log", [], None),
+            ("synchronous, 3 lines/request", [SyncLogMiddleware], None),
+            ("pipeline, 5% sampled", [main.AccessLogMiddleware], 0.05),
+            ("pipeline, 100% sampled", [main.AccessLogMiddleware], 1.0),
+        ]
+        apps = [_app(middleware) for _, middleware, _ in variants]
+        results = {label: [] for label, _, _ in variants}
+        for _ in range(args.rounds):
+            for (label, _, rate), app in zip(variants, apps):
+                if rate is not None:
+                    main.ACCESS_LOG_SAMPLE_RATE = rate
+                    main.ACCESS_LOG_ROUTE_SAMPLE_RATES = {}
+                results[label].append(asyncio.run(_drive(app, args.requests)))
+        for label, rps in results.items():
+            print(f"{label:32s} {statistics.median(rps):8.0f} req/s  (min {min(rps):.0f}, max {max(rps):.0f})")
+    finally:
+        main.stop_access_log()
+    print(f"dropped records: {main.ACCESS_LOG_DROPPED._value.get():.0f}")
+
+
+if __name__ == "__main__":
+    run()
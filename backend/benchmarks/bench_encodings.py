@@ -0,0 +1,72 @@
+"""Encode time, file size and estimated upload time of a rendered creative per output format.
+
+    python benchmarks/bench_encodings.py --uplink-mbps 20
+
+Upload time is size / uplink bandwidth for each of the four platform uploads; it does not
+include request latency.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from app import main  # noqa: E402
+
+CANDIDATES = [
+    ("PNG", 0),
+    ("JPEG", 90),
+    ("JPEG", 82),
+    ("WEBP", 85),
+    ("WEBP", 75),
+    ("AVIF", 70),
+    ("AVIF", 55),
+]
+
+
+def photographic_background(size: tuple[int, int]) -> Image.Image:
+    """Noisy, blurred colour field: compresses like an SDXL photo, unlike a flat gradient."""
+    noise = [Image.effect_noise(size, sigma).filter(ImageFilter.GaussianBlur(3)) for sigma in (60, 45, 70)]
+    return Image.blend(Image.merge("RGB", noise), main._fallback_background(size), 0.35)
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    creative = main._render_template(
+        photographic_background((1080, 1350)), "Five ways to ship faster", "Read the full post"
+    )
+    Image.init()
+    print(f"{'format':12s} {'encode ms':>10s} {'size KB':>9s} {'upload x4 s':>12s}")
+    for fmt, quality in CANDIDATES:
+        if fmt not in Image.SAVE:
+            if (fmt, quality) == next(c for c in CANDIDATES if c[0] == fmt):
+                print(f"{fmt:12s} not supported by this Pillow build")
+            continue
+        options = main._encode_options(fmt, quality)
+        best = float("inf")
+        data = b""
+        for _ in range(args.runs):
+            buf = io.BytesIO()
+            t0 = time.perf_counter()
+            creative.save(buf, format=fmt, **options)
+            best = min(best, time.perf_counter() - t0)
+            data = buf.getvalue()
+        upload = 4 * len(data) * 8 / (args.uplink_mbps * 1_000_000)
+        label = fmt if fmt == "PNG" else f"{fmt}:{quality}"
+        print(f"{label:12s} {best * 1000:10.1f} {len(data) / 1024:9.0f} {upload:12.2f}")
+
+
+if __name__ == "__main__":
+    run()
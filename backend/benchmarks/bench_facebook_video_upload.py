@@ -0,0 +1,70 @@
+"""Facebook video upload against the fake Graph server: clean upload, then a failure late in
+the file recovered by resuming the saved session vs by starting over.
+
+    python benchmarks/bench_facebook_video_upload.py --size-mb 64 --bandwidth-mbps 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import HTTPException  # noqa: E402
+
+from app import main  # noqa: E402
+from tests.fakes import serve  # noqa: E402
+from tests.fakes.graph import FakeGraph  # noqa: E402
+
+
+def _upload(video: bytes) -> None:
+    main.facebook_upload_video_chunked(
+        page_id="123", page_access_token="bench-token", video_bytes=video, filename="bench.mp4"
+    )
+
+
+def _transferred(fake: FakeGraph) -> int:
+    return sum(1 for phase, _ in fake.calls if phase == "transfer")
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--chunk-mb", type=int, default=4)
+    parser.add_argument("--bandwidth-mbps", type=float, default=200.0)
+    parser.add_argument("--fail-at", type=float, default=0.8, help="fraction of the file where the upload breaks")
+    args = parser.parse_args()
+
+    chunk = args.chunk_mb * 1024 * 1024
+    fake = FakeGraph(chunk_size=chunk, bandwidth_bytes_per_second=args.bandwidth_mbps * 1_000_000 / 8)
+    main.init_db()
+    main.UPLOAD_PART_RETRIES = 1
+    fail_offset = int(args.size_mb * args.fail_at / args.chunk_mb) * chunk
+
+    with serve(fake.app) as url:
+        main.META_GRAPH_BASE = url
+        for mode in ("clean", "resume", "restart"):
+            video = os.urandom(args.size_mb * 1024 * 1024)
+            fake.calls.clear()
+            t0 = time.perf_counter()
+            if mode != "clean":
+                fake.fail_offsets = {fail_offset}
+                try:
+                    _upload(video)
+                except HTTPException:
+                    pass
+                if mode == "restart":
+                    # What the old single-request upload amounted to: nothing survives the failure.
+                    key = main._upload_session_key("facebook", "bench-token", main._media_digest(video, None))
+                    main._finish_upload_session(key)
+            _upload(video)
+            elapsed = time.perf_counter() - t0
+            print(f"{mode:8s} {elapsed:6.2f}s  {_transferred(fake):3d} chunk transfers")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""Fallback gradient: the old per-row draw.line loop vs the lookup-table build and its cache.
+
+    python benchmarks/bench_gradient.py --runs 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app import main  # noqa: E402
+
+
+def legacy_gradient(size, primary, secondary):
+    """The loop _fallback_background used before the lookup-table version."""
+    w, h = size
+    primary = main._hex_to_rgb(primary)
+    secondary = main._hex_to_rgb(secondary)
+    img = Image.new("RGB", (w, h), primary)
+    draw = ImageDraw.Draw(img)
+    for y in range(h):
+        t = y / max(h - 1, 1)
+        r = int(primary[0] * (1 - t) + secondary[0] * t)
+        g = int(primary[1] * (1 - t) + secondary[1] * t)
+        b = int(primary[2] * (1 - t) + secondary[2] * t)
+        draw.line([(0, y), (w, y)], fill=(r, g, b))
+    return img
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1080)
+    parser.add_argument("--height", type=int, default=1350)
+    args = parser.parse_args()
+    size = (args.width, args.height)
+    colours = (main.BRAND_PRIMARY, main.BRAND_SECONDARY)
+    uncached = main._gradient_background.__wrapped__
+
+    cases = {
+        "legacy draw.line loop": lambda: legacy_gradient(size, *colours),
+        "lookup table (uncached)": lambda: uncached(size, *colours),
+        "_fallback_background (cached)": lambda: main._fallback_background(size),
+    }
+    main._fallback_background(size)
+    baseline = None
+    for name, fn in cases.items():
+        ms = min(timeit.repeat(fn, number=1, repeat=args.runs)) * 1000
+        baseline = baseline or ms
+        print(f"{name:32s} {ms:8.2f} ms  ({baseline / ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,44 @@
+"""Instagram carousel publish latency against the fake Graph server, serial vs concurrent children.
+
+    python benchmarks/bench_instagram_carousel.py --items 10 --latency-ms 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import main  # noqa: E402
+from tests.fakes import serve  # noqa: E402
+from tests.fakes.graph import FakeGraph  # noqa: E402
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    main.init_db()
+    fake = FakeGraph(latency_seconds=args.latency_ms / 1000)
+    with serve(fake.app) as url:
+        main.META_GRAPH_BASE = url
+        for concurrency in args.concurrency:
+            main.INSTAGRAM_CAROUSEL_CONCURRENCY = concurrency
+            items = []
+            for i in range(args.items):
+                data = f"{concurrency}-{i}-{time.time()}".encode()
+                items.append({"name": main.store_media(data, "jpg"), "bytes": data})
+            t0 = time.perf_counter()
+            main.instagram_create_media_carousel("bench-token", "ig-bench", items)
+            print(f"concurrency {concurrency:2d}: {time.perf_counter() - t0:5.2f}s for {args.items} items")
+
+
+if __name__ == "__main__":
+    run()
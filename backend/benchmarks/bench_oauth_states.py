@@ -0,0 +1,64 @@
+"""Consume latency and sweep time for OAuth states against a table full of stale rows.
+
+    python benchmarks/bench_oauth_states.py --stale 2000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="postify-bench-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import main  # noqa: E402
+
+
+def _seed_stale(count: int) -> None:
+    stale = main._now_ts() - main.OAUTH_STATE_TTL_SECONDS - 3600
+    con = main.db_conn()
+    cur = con.cursor()
+    chunk = 100_000
+    for start in range(0, count, chunk):
+        cur.executemany(
+            "INSERT INTO oauth_states (state, user_id, platform, created_at, meta) VALUES (?, ?, ?, ?, ?)",
+            ((f"stale-{i}", "bench", "twitter", stale, "{}") for i in range(start, min(count, start + chunk))),
+        )
+        con.commit()
+    con.close()
+
+
+def _consume_ms(rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        state = main.create_oauth_state("bench", "twitter")
+        t0 = time.perf_counter()
+        main.consume_oauth_state(state, "twitter")
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stale", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=main.OAUTH_STATE_SWEEP_BATCH_SIZE)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    main.init_db()
+    t0 = time.perf_counter()
+    _seed_stale(args.stale)
+    print(f"seeded {args.stale} stale states in {time.perf_counter() - t0:.1f}s")
+    print(f"consume (median, {args.stale} stale rows present): {_consume_ms(args.rounds):.3f} ms")
+
+    t0 = time.perf_counter()
+    deleted = main.purge_expired_oauth_states(batch_size=args.batch_size)
+    print(f"sweep: deleted {deleted} rows in {time.perf_counter() - t0:.2f}s (batch size {args.batch_size})")
+    print(f"consume (median, after sweep): {_consume_ms(args.rounds):.3f} ms")
+
+
+if __name__ == "__main__":
+    run()
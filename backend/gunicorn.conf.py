@@ -3,6 +3,14 @@
 
 import multiprocessing
 import os
+import shutil
+
+# Prometheus multiprocess mode: each worker writes its metrics here and /metrics
+# aggregates them. Must be set before the app is loaded (preload_app), and is cleared
+# on start so series from a previous run do not linger.
+_prometheus_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/postify-prometheus")
+shutil.rmtree(_prometheus_dir, ignore_errors=True)
+os.makedirs(_prometheus_dir, exist_ok=True)
 
 # Server socket
 bind = "0.0.0.0:8000"
@@ -19,10 +27,11 @@ timeout = 30
 keepalive = 2
 
 # Logging
-accesslog = "-"
+# Access logs come from the app's sampled, queue-backed access logger
+# (ACCESS_LOG_* settings), so gunicorn's synchronous per-request access log is off.
+accesslog = None
 errorlog = "-"
 loglevel = "info"
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
 # Process naming
 proc_name = "postify-backend"
@@ -123,13 +132,7 @@ def worker_exit(server, worker):
 
 def child_exit(server, worker):
     """Called just after a worker has been exited."""
-    server.log.info("Child worker exited (pid: %s)", worker.pid)
+    from prometheus_client import multiprocess
 
-def pre_request(worker, req):
-    """Called just before a worker processes the request."""
-    worker.log.info("Worker %s processing request: %s %s", worker.pid, req.method, req.path)
-
-def post_request(worker, req, environ, resp):
-    """Called after a worker processes the request."""
-    worker.log.info("Worker %s completed request: %s %s - Status: %s", 
-                   worker.pid, req.method, req.path, resp.status)
+    multiprocess.mark_process_dead(worker.pid)
+    server.log.info("Child worker exited (pid: %s)", worker.pid)
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# app.main reads its configuration at import time, so point it at throwaway paths first.
+_scratch = tempfile.mkdtemp(prefix="postify-tests-")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "tokens.db"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("TRACE_EXPORTER", "none")
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ.pop("REPLICATE_API_TOKEN", None)
+
+import pytest  # noqa: E402
+
+from app import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh database and upload directory per test."""
+    monkeypatch.setattr(main, "DB_PATH", str(tmp_path / "tokens.db"))
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(upload_dir))
+    main.init_db()
+    return tmp_path
@@ -0,0 +1,26 @@
+"""Local stand-ins for the third-party APIs the backend talks to, for tests and benchmarks."""
+import contextlib
+import threading
+import time
+from typing import Iterator
+
+import uvicorn
+
+
+@contextlib.contextmanager
+def serve(app) -> Iterator[str]:
+    """Run an ASGI app on a free localhost port in a background thread; yields its base URL."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off", ws="none"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("fake server did not start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
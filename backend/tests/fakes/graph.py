@@ -0,0 +1,240 @@
+"""Fake Graph API: Facebook resumable video uploads and Instagram content publishing.
+
+Video uploads mirror the real session protocol: "start" opens a session and returns
+the first offsets, each "transfer" must send exactly the bytes the last response
+asked for, and "finish" closes the session. Instagram containers are created from a
+media URL, become FINISHED after `container_ready_seconds`, and are published through
+a batch request, like the backend does it. Batches also take photo uploads (attached
+files), feed posts that reference them with "{result=name:$.id}", and insights
+lookups, which answer with the values set in `insights`. Every call can be slowed
+down, and video transfers can be made to fail.
+"""
+import asyncio
+import itertools
+import json
+import re
+import time
+import urllib.parse
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FakeGraph:
+    def __init__(
+        self,
+        chunk_size: int = 1024 * 1024,
+        bandwidth_bytes_per_second: Optional[float] = None,
+        latency_seconds: float = 0.0,
+        container_ready_seconds: float = 0.0,
+    ):
+        self.chunk_size = chunk_size
+        self.bandwidth = bandwidth_bytes_per_second
+        self.latency = latency_seconds
+        self.container_ready_seconds = container_ready_seconds
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # Transfers at these offsets fail once each with a transient server error.
+        self.fail_offsets: Set[int] = set()
+        # (phase, start_offset) of every accepted or rejected call, in order.
+        self.calls: List[tuple] = []
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.published: Dict[str, Dict[str, Any]] = {}
+        self.photos: Dict[str, Dict[str, Any]] = {}
+        self.feed: Dict[str, Dict[str, Any]] = {}
+        # {object id: {metric: value}}; any published object without an entry reports zeros.
+        self.insights: Dict[str, Dict[str, Any]] = {}
+        # Number of operations in every batch request, in order.
+        self.batches: List[int] = []
+        # The next N carousel container creations fail, e.g. to exercise retries.
+        self.fail_carousels = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._ids = itertools.count(1000)
+        self.app = FastAPI()
+        self.app.middleware("http")(self._track)
+        self.app.post("/{page_id}/videos")(self.videos)
+        self.app.post("/{ig_user_id}/media")(self.ig_media)
+        self.app.post("/")(self.batch)
+        self.app.get("/{node_id}")(self.node)
+
+    async def _track(self, request: Request, call_next):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _error(status: int, message: str, code: int = 1) -> JSONResponse:
+        return JSONResponse({"error": {"message": message, "type": "OAuthException", "code": code}}, status_code=status)
+
+    def _next_range(self, session: Dict[str, Any], start: int) -> Dict[str, str]:
+        end = min(start + self.chunk_size, session["size"])
+        return {"start_offset": str(start), "end_offset": str(end)}
+
+    async def videos(self, page_id: str, request: Request):
+        form = await request.form()
+        phase = form.get("upload_phase")
+        if not form.get("access_token"):
+            return self._error(400, "An access token is required to request this resource.", 104)
+
+        if phase == "start":
+            size = int(form["file_size"])
+            session_id = uuid.uuid4().hex
+            video_id = str(next(self._ids))
+            self.sessions[session_id] = {"size": size, "data": bytearray(), "video_id": video_id, "finished": False}
+            self.calls.append(("start", 0))
+            return {"upload_session_id": session_id, "video_id": video_id, **self._next_range(self.sessions[session_id], 0)}
+
+        session = self.sessions.get(form.get("upload_session_id") or "")
+        if session is None:
+            return self._error(400, "Invalid upload session", 6000)
+
+        if phase == "transfer":
+            start = int(form["start_offset"])
+            chunk = await form["video_file_chunk"].read()
+            self.calls.append(("transfer", start))
+            if self.bandwidth:
+                await asyncio.sleep(len(chunk) / self.bandwidth)
+            if start in self.fail_offsets:
+                self.fail_offsets.discard(start)
+                return self._error(500, "An unexpected error has occurred. Please retry your request later.", 2)
+            if start != len(session["data"]):
+                return self._error(400, f"Start offset mismatch: expected {len(session['data'])}", 6001)
+            session["data"] += chunk
+            return self._next_range(session, len(session["data"]))
+
+        if phase == "finish":
+            self.calls.append(("finish", len(session["data"])))
+            if len(session["data"]) != session["size"]:
+                return self._error(400, "Upload is incomplete", 6002)
+            session["finished"] = True
+            return {"success": True}
+
+        return self._error(400, f"Unsupported upload_phase {phase!r}", 100)
+
+    async def ig_media(self, ig_user_id: str, request: Request):
+        form = await request.form()
+        if not form.get("access_token"):
+            return self._error(400, "An access token is required to request this resource.", 104)
+        container_id = str(next(self._ids))
+        container = {
+            "ig_user_id": ig_user_id,
+            "ready_at": time.monotonic() + self.container_ready_seconds,
+            "caption": form.get("caption"),
+            "carousel_item": form.get("is_carousel_item") == "true",
+            "status": "IN_PROGRESS",
+        }
+        if form.get("media_type") == "CAROUSEL":
+            if self.fail_carousels:
+                self.fail_carousels -= 1
+                return self._error(500, "An unexpected error has occurred. Please retry your request later.", 2)
+            children = [c for c in (form.get("children") or "").split(",") if c]
+            for child in children:
+                info = self.containers.get(child)
+                if not info or not info["carousel_item"] or self._status(child) != "FINISHED":
+                    return self._error(400, f"Invalid carousel child {child}", 9007)
+            container["children"] = children
+        else:
+            url = form.get("image_url") or form.get("video_url")
+            if not url or not url.startswith(("http://", "https://")):
+                return self._error(400, "Only photo or video can be accepted as media type.", 9004)
+            container["media_url"] = url
+            container["media_type"] = form.get("media_type") or "IMAGE"
+        self.containers[container_id] = container
+        return {"id": container_id}
+
+    def _status(self, container_id: str) -> str:
+        container = self.containers[container_id]
+        if container["status"] == "IN_PROGRESS" and time.monotonic() >= container["ready_at"]:
+            container["status"] = "FINISHED"
+        return container["status"]
+
+    async def node(self, node_id: str, fields: str = ""):
+        if node_id in self.containers:
+            return {"id": node_id, "status_code": self._status(node_id)}
+        if node_id in self.published:
+            return {"id": node_id, "permalink": f"https://www.instagram.com/p/{node_id}/"}
+        return self._error(400, f"Unsupported get request. Object with ID '{node_id}' does not exist", 100)
+
+    async def batch(self, request: Request):
+        form = await request.form()
+        if not form.get("access_token"):
+            return self._error(400, "An access token is required to request this resource.", 104)
+        named: Dict[str, Any] = {}
+        out = []
+        operations = json.loads(form["batch"])
+        self.batches.append(len(operations))
+        for op in operations:
+            def resolve(text: str) -> str:
+                return re.sub(
+                    r"\{result=(\w+):\$\.id\}", lambda m: str(named.get(m.group(1), {}).get("id")), text
+                )
+
+            path, _, query = resolve(op["relative_url"]).partition("?")
+            body = dict(urllib.parse.parse_qsl(resolve(op.get("body") or "")))
+            body.update(urllib.parse.parse_qsl(query))
+            attached = op.get("attached_files")
+            if attached:
+                body["_file"] = await form[attached].read()
+            code, result = self._batch_op(op["method"], path.strip("/"), body)
+            if op.get("name"):
+                named[op["name"]] = result
+                # Graph leaves out the result of a referenced operation unless asked for it.
+                if code < 400 and op.get("omit_response_on_success", True):
+                    out.append(None)
+                    continue
+            out.append({"code": code, "body": json.dumps(result)})
+        return out
+
+    def _batch_op(self, method: str, path: str, body: Dict[str, Any]):
+        if method == "POST" and path.endswith("/media_publish"):
+            container_id = body.get("creation_id")
+            if container_id not in self.containers or self._status(container_id) != "FINISHED":
+                return 400, {"error": {"message": "Media ID is not available", "code": 9007}}
+            media_id = str(next(self._ids))
+            self.containers[container_id]["status"] = "PUBLISHED"
+            self.published[media_id] = {"container_id": container_id, **self.containers[container_id]}
+            return 200, {"id": media_id}
+        if method == "GET" and path in self.published:
+            return 200, {"id": path, "permalink": f"https://www.instagram.com/p/{path}/"}
+        if method == "POST" and path.endswith("/photos"):
+            if "_file" not in body:
+                return 400, {"error": {"message": "(#324) Requires upload file", "code": 324}}
+            photo_id = str(next(self._ids))
+            self.photos[photo_id] = {"bytes": body["_file"], "published": body.get("published") != "false"}
+            return 200, {"id": photo_id}
+        if method == "POST" and path.endswith("/feed"):
+            page_id = path.split("/")[0]
+            media = [json.loads(v)["media_fbid"] for k, v in body.items() if k.startswith("attached_media[")]
+            for fbid in media:
+                if fbid not in self.photos or self.photos[fbid]["published"]:
+                    return 400, {"error": {"message": f"(#100) Invalid media_fbid {fbid}", "code": 100}}
+            post_id = f"{page_id}_{next(self._ids)}"
+            self.feed[post_id] = {"message": body.get("message"), "media": media}
+            self.published[post_id] = self.feed[post_id]
+            return 200, {"id": post_id}
+        if method == "GET" and path.endswith("/insights"):
+            object_id = path.split("/")[0]
+            if object_id not in self.published:
+                return 400, {"error": {"message": f"Object with ID '{object_id}' does not exist", "code": 100}}
+            values = self.insights.get(object_id, {})
+            return 200, {
+                "data": [
+                    {"name": metric, "period": "lifetime", "values": [{"value": values.get(metric, 0)}]}
+                    for metric in (body.get("metric") or "").split(",")
+                    if metric
+                ]
+            }
+        return 400, {"error": {"message": f"Unsupported {method} request", "code": 100}}
+
+    def video_bytes(self, video_id: str) -> bytes:
+        for session in self.sessions.values():
+            if session["video_id"] == video_id and session["finished"]:
+                return bytes(session["data"])
+        raise KeyError(video_id)
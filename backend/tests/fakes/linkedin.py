@@ -0,0 +1,139 @@
+"""Fake LinkedIn REST API: image/video upload sessions and posts.
+
+initializeUpload hands out upload URLs on this server. Images get a single uploadUrl.
+Videos are split into `part_size` byte ranges, each with its own URL and an uploadToken.
+Every PUT answers with an ETag, and finalizeUpload checks that the ETags come back in
+order with the right token. Parts can be made to fail, and posts that reference media
+listed in `expired` are rejected the way LinkedIn rejects a purged asset.
+"""
+import asyncio
+import hashlib
+import itertools
+import time
+from typing import Any, Dict, List, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+class FakeLinkedIn:
+    def __init__(self, part_size: int = 64 * 1024, latency_seconds: float = 0.0):
+        self.part_size = part_size
+        self.latency = latency_seconds
+        self.media: Dict[str, Dict[str, Any]] = {}
+        self.posts: List[Dict[str, Any]] = []
+        # (kind, detail) of every call, in order: ("init", urn), ("part", (urn, index)), ...
+        self.calls: List[tuple] = []
+        # Each PUT to these (urn, part index) pairs fails once per listed occurrence.
+        self.fail_parts: List[tuple] = []
+        self.expired: Set[str] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._ids = itertools.count(1)
+        self.app = FastAPI()
+        self.app.post("/posts")(self.create_post)
+        self.app.post("/{endpoint}")(self.action)
+        self.app.put("/upload/{urn}/{index}")(self.upload_part)
+
+    @staticmethod
+    def _error(status: int, message: str) -> JSONResponse:
+        return JSONResponse({"status": status, "message": message}, status_code=status)
+
+    def _authorized(self, request: Request) -> bool:
+        return request.headers.get("authorization", "").startswith("Bearer ")
+
+    async def action(self, endpoint: str, action: str, request: Request):
+        if not self._authorized(request):
+            return self._error(401, "Empty oauth2 access token")
+        body = await request.json()
+        if action == "initializeUpload":
+            return self._initialize(endpoint, body["initializeUploadRequest"], str(request.base_url))
+        if action == "finalizeUpload" and endpoint == "videos":
+            return self._finalize(body["finalizeUploadRequest"])
+        return self._error(400, f"Unknown action {action}")
+
+    def _initialize(self, endpoint: str, request: Dict[str, Any], base: str):
+        kind = {"images": "image", "videos": "video", "documents": "document"}[endpoint]
+        urn = f"urn:li:{kind}:C{next(self._ids):04d}"
+        size = request.get("fileSizeBytes")
+        parts = [(0, None)] if kind != "video" else [
+            (start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)
+        ]
+        self.media[urn] = {
+            "owner": request["owner"],
+            "kind": kind,
+            "size": size,
+            "parts": {},
+            "ranges": parts,
+            "upload_token": f"token-{urn}" if kind == "video" else "",
+            "status": "WAITING_UPLOAD",
+        }
+        self.calls.append(("init", urn))
+        value: Dict[str, Any] = {kind: urn, "uploadUrlsExpireAt": int((time.time() + 3600) * 1000)}
+        if kind == "video":
+            value["uploadToken"] = self.media[urn]["upload_token"]
+            value["uploadInstructions"] = [
+                {"uploadUrl": f"{base}upload/{urn}/{i}", "firstByte": first, "lastByte": last}
+                for i, (first, last) in enumerate(parts)
+            ]
+        else:
+            value["uploadUrl"] = f"{base}upload/{urn}/0"
+        return {"value": value}
+
+    async def upload_part(self, urn: str, index: int, request: Request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            data = await request.body()
+            if (urn, index) in self.fail_parts:
+                self.fail_parts.remove((urn, index))
+                self.calls.append(("part_failed", (urn, index)))
+                return self._error(500, "Internal Server Error")
+            media = self.media.get(urn)
+            if media is None:
+                return self._error(404, f"Asset {urn} not found")
+            first, last = media["ranges"][index]
+            if last is not None and len(data) != last - first + 1:
+                return self._error(400, "Part size does not match its byte range")
+            etag = hashlib.md5(data).hexdigest()
+            media["parts"][index] = (data, etag)
+            if media["kind"] != "video":
+                media["status"] = "AVAILABLE"
+            self.calls.append(("part", (urn, index)))
+            return Response(status_code=201, headers={"etag": etag})
+        finally:
+            self.in_flight -= 1
+
+    def _finalize(self, request: Dict[str, Any]):
+        urn = request["video"]
+        media = self.media.get(urn)
+        if media is None:
+            return self._error(404, f"Video {urn} not found")
+        if request.get("uploadToken") != media["upload_token"]:
+            return self._error(400, "Invalid uploadToken")
+        expected = [media["parts"][i][1] for i in range(len(media["ranges"])) if i in media["parts"]]
+        if len(expected) != len(media["ranges"]) or request.get("uploadedPartIds") != expected:
+            return self._error(400, "uploadedPartIds do not match the uploaded parts")
+        media["status"] = "AVAILABLE"
+        self.calls.append(("finalize", urn))
+        return Response(status_code=200)
+
+    async def create_post(self, request: Request):
+        if not self._authorized(request):
+            return self._error(401, "Empty oauth2 access token")
+        body = await request.json()
+        content = body.get("content") or {}
+        urns = [content["media"]["id"]] if content.get("media", {}).get("id") else []
+        urns += [image["id"] for image in content.get("multiImage", {}).get("images", [])]
+        for urn in urns:
+            if urn in self.expired or self.media.get(urn, {}).get("status") != "AVAILABLE":
+                return self._error(400, f"Image {urn} not found or has expired")
+        self.posts.append(body)
+        post_urn = f"urn:li:share:{len(self.posts)}"
+        return Response(status_code=201, headers={"x-restli-id": post_urn})
+
+    def media_bytes(self, urn: str) -> bytes:
+        media = self.media[urn]
+        return b"".join(media["parts"][i][0] for i in range(len(media["ranges"])))
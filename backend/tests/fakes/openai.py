@@ -0,0 +1,64 @@
+"""Fake OpenAI client for the caption code: chat completions, plain or streamed.
+
+`reply(prompt)` gets the decoded JSON of the user message and returns the completion
+text; streamed completions are cut into `chunk_size`-character deltas (or into the
+pieces `chunker(text)` returns). Every request is recorded, and `closed` counts streams
+the caller closed before reading them to the end.
+"""
+import json
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class _Stream:
+    def __init__(self, owner: "FakeOpenAI", pieces: List[str]):
+        self.owner = owner
+        self.pieces = pieces
+        self.read = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for piece in self.pieces:
+            self.read += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def close(self) -> None:
+        if self.read < len(self.pieces):
+            self.owner.closed += 1
+
+
+class FakeOpenAI:
+    def __init__(
+        self,
+        reply: Callable[[Dict[str, Any]], str],
+        chunk_size: int = 7,
+        chunker: Optional[Callable[[str], List[str]]] = None,
+    ):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chunker = chunker
+        self.requests: List[Dict[str, Any]] = []
+        self.closed = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @property
+    def prompts(self) -> List[Dict[str, Any]]:
+        return [json.loads(request["messages"][-1]["content"]) for request in self.requests]
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        text = self.reply(json.loads(kwargs["messages"][-1]["content"]))
+        if not kwargs.get("stream"):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        if self.chunker:
+            pieces = self.chunker(text)
+        else:
+            pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        return _Stream(self, pieces)
+
+
+def captions_for(prompt: Dict[str, Any], tag: str = "") -> Dict[str, Any]:
+    """Valid captions for every platform in a single-post prompt's output schema."""
+    return {
+        platform: {"caption": f"{platform} {tag}{prompt.get('title', '')}".strip(), "hashtags": [f"#{platform}"]}
+        for platform in prompt["output_schema"]
+    }
@@ -0,0 +1,137 @@
+"""Fake Replicate predictions API.
+
+Predictions are created "starting" and succeed `complete_after_seconds` later, with a
+single PNG output served by the fake itself. They can also be made to fail or to never
+finish, and cancelled. Completion callbacks are not delivered; `webhook(prediction_id)`
+builds the request Replicate would send, signed with `webhook_secret` the Standard
+Webhooks way, for the test to post wherever it likes.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+
+class FakeReplicate:
+    def __init__(
+        self,
+        complete_after_seconds: float = 0.0,
+        latency_seconds: float = 0.0,
+        webhook_secret: str = "whsec_" + base64.b64encode(b"fake-replicate-signing-key").decode(),
+    ):
+        self.complete_after_seconds = complete_after_seconds
+        self.latency = latency_seconds
+        self.webhook_secret = webhook_secret
+        self.predictions: Dict[str, Dict[str, Any]] = {}
+        self.cancelled: List[str] = []
+        # The next N predictions fail instead of succeeding; hang=True keeps them running.
+        self.fail_next = 0
+        self.hang = False
+        self.output_png = _png()
+        self._ids = itertools.count(1)
+        self.app = FastAPI()
+        self.app.post("/predictions")(self.create)
+        self.app.get("/predictions/{prediction_id}")(self.get)
+        self.app.post("/predictions/{prediction_id}/cancel")(self.cancel)
+        self.app.get("/outputs/{prediction_id}.png")(self.output)
+
+    @staticmethod
+    def _error(status: int, detail: str) -> JSONResponse:
+        return JSONResponse({"title": detail, "detail": detail, "status": status}, status_code=status)
+
+    def _state(self, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        if prediction["status"] in ("starting", "processing") and not prediction["hang"]:
+            if time.monotonic() - prediction["started"] >= self.complete_after_seconds:
+                if prediction["fail"]:
+                    prediction.update(status="failed", error="CUDA out of memory")
+                else:
+                    prediction.update(status="succeeded", output=[f"{prediction['base']}outputs/{prediction['id']}.png"])
+            else:
+                prediction["status"] = "processing"
+        return {
+            key: prediction[key] for key in ("id", "version", "input", "status", "output", "error", "webhook")
+        }
+
+    async def create(self, request: Request):
+        if request.headers.get("authorization", "").split(" ", 1)[0] != "Token":
+            return self._error(401, "You did not pass a valid authentication token")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = await request.json()
+        if not body.get("version") or not isinstance(body.get("input"), dict):
+            return self._error(422, "version and input are required")
+        prediction_id = f"pred{next(self._ids):06d}"
+        fail = self.fail_next > 0
+        self.fail_next -= fail
+        self.predictions[prediction_id] = {
+            "id": prediction_id,
+            "version": body["version"],
+            "input": body["input"],
+            "status": "starting",
+            "output": None,
+            "error": None,
+            "webhook": body.get("webhook"),
+            "webhook_events_filter": body.get("webhook_events_filter"),
+            "started": time.monotonic(),
+            "fail": fail,
+            "hang": self.hang,
+            "base": str(request.base_url),
+        }
+        return JSONResponse(self._state(self.predictions[prediction_id]), status_code=201)
+
+    async def get(self, prediction_id: str):
+        prediction = self.predictions.get(prediction_id)
+        if prediction is None:
+            return self._error(404, "Not found")
+        return self._state(prediction)
+
+    async def cancel(self, prediction_id: str):
+        prediction = self.predictions.get(prediction_id)
+        if prediction is None:
+            return self._error(404, "Not found")
+        self.cancelled.append(prediction_id)
+        if prediction["status"] in ("starting", "processing"):
+            prediction["status"] = "canceled"
+        return self._state(prediction)
+
+    async def output(self, prediction_id: str):
+        if prediction_id not in self.predictions:
+            return self._error(404, "Not found")
+        return Response(self.output_png, media_type="image/png")
+
+    def finish(self, prediction_id: str) -> Dict[str, Any]:
+        """Complete a prediction now (regardless of hang) and return its final state."""
+        prediction = self.predictions[prediction_id]
+        prediction["hang"] = False
+        prediction["started"] = time.monotonic() - self.complete_after_seconds
+        return self._state(prediction)
+
+    def webhook(self, prediction_id: str, secret: Optional[str] = None) -> Tuple[Dict[str, str], bytes]:
+        """Headers and body of the completion callback for a finished prediction."""
+        body = json.dumps(self.finish(prediction_id)).encode()
+        webhook_id = f"msg_{prediction_id}"
+        timestamp = str(int(time.time()))
+        key = base64.b64decode((secret or self.webhook_secret).split("_", 1)[-1])
+        digest = hmac.new(key, f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+        headers = {
+            "content-type": "application/json",
+            "webhook-id": webhook_id,
+            "webhook-timestamp": timestamp,
+            "webhook-signature": "v1," + base64.b64encode(digest).decode(),
+        }
+        return headers, body
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (108, 135), (30, 60, 90)).save(buf, format="PNG")
+    return buf.getvalue()
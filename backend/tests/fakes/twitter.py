@@ -0,0 +1,104 @@
+"""Fake tweepy.API for the X media upload and status calls the backend makes.
+
+Chunked uploads go through INIT, APPEND and FINALIZE, and FINALIZE checks that the
+segments arrived in order and add up to the announced size. Videos and GIFs then report
+the `processing` states one STATUS call at a time, each with its `check_after_secs`.
+Every call is recorded in `calls`, and `max_in_flight` is the most chunked uploads
+that were open (INIT to FINALIZE) at the same time.
+"""
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class FakeTwitterAPI:
+    def __init__(
+        self,
+        processing: Sequence[Tuple[str, int]] = (("pending", 5), ("in_progress", 2), ("succeeded", 0)),
+        latency_seconds: float = 0.0,
+    ):
+        self.processing = list(processing)
+        self.latency = latency_seconds
+        self.media: Dict[int, Dict[str, Any]] = {}
+        self.tweets: List[Dict[str, Any]] = []
+        self.calls: List[tuple] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._ids = itertools.count(1001)
+        self._lock = threading.Lock()
+
+    def _media(self, media_id: int, state: Optional[Tuple[str, int]] = None) -> SimpleNamespace:
+        info = None
+        if state is not None:
+            info = {"state": state[0]}
+            if state[0] in ("pending", "in_progress"):
+                info["check_after_secs"] = state[1]
+            elif state[0] == "failed":
+                info["error"] = {"code": 1, "name": "InvalidMedia", "message": "Unsupported video format"}
+        return SimpleNamespace(media_id=media_id, media_id_string=str(media_id), processing_info=info)
+
+    def chunked_upload_init(self, total_bytes: int, media_type: str, media_category: Optional[str] = None, **kwargs):
+        media_id = next(self._ids)
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.media[media_id] = {
+                "size": total_bytes,
+                "type": media_type,
+                "category": media_category,
+                "segments": {},
+                "states": list(self.processing),
+            }
+            self.calls.append(("INIT", media_id, total_bytes, media_type, media_category))
+        return self._media(media_id)
+
+    def chunked_upload_append(self, media_id: int, media, segment_index: int, **kwargs) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        data = media.read()
+        with self._lock:
+            self.media[media_id]["segments"][segment_index] = data
+            self.calls.append(("APPEND", media_id, segment_index, len(data)))
+
+    def chunked_upload_finalize(self, media_id: int):
+        with self._lock:
+            self.in_flight -= 1
+            media = self.media[media_id]
+            segments = media["segments"]
+            if sorted(segments) != list(range(len(segments))):
+                raise RuntimeError(f"Segments {sorted(segments)} are not contiguous")
+            if sum(len(data) for data in segments.values()) != media["size"]:
+                raise RuntimeError("File size does not match the size given at INIT")
+            self.calls.append(("FINALIZE", media_id))
+            return self._media(media_id, media["states"].pop(0) if media["states"] else None)
+
+    def get_media_upload_status(self, media_id: int):
+        with self._lock:
+            states = self.media[media_id]["states"]
+            self.calls.append(("STATUS", media_id))
+            return self._media(media_id, states.pop(0) if states else ("succeeded", 0))
+
+    def media_upload(self, filename: str, file=None, media_category: Optional[str] = None, **kwargs):
+        media_id = next(self._ids)
+        data = file.read()
+        with self._lock:
+            self.media[media_id] = {"size": len(data), "category": media_category, "segments": {0: data}}
+            self.calls.append(("UPLOAD", media_id, filename, media_category))
+        return self._media(media_id)
+
+    def update_status(self, status: str, media_ids: Optional[List[str]] = None, **kwargs):
+        tweet_id = len(self.tweets) + 1
+        self.tweets.append({"id": tweet_id, "status": status, "media_ids": media_ids})
+        return SimpleNamespace(
+            id=tweet_id,
+            text=status,
+            created_at=None,
+            user=SimpleNamespace(screen_name="postify", name="Postify"),
+            _json={},
+        )
+
+    def media_bytes(self, media_id: int) -> bytes:
+        segments = self.media[media_id]["segments"]
+        return b"".join(segments[i] for i in range(len(segments)))
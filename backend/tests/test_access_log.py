@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def access_log(db, monkeypatch):
+    records = []
+    monkeypatch.setattr(main, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(main, "ACCESS_LOG_ROUTE_SAMPLE_RATES", {})
+    monkeypatch.setattr(main._access_logger, "info", records.append)
+    return records
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exported = []
+    monkeypatch.setattr(main, "_export_span", exported.append)
+    return exported
+
+
+def test_access_record_carries_the_request_trace_id(access_log, spans):
+    response = TestClient(main.app).post(
+        "/automation/blog/webhook", json={"user_id": "u1", "url": "https://blog.example/a", "title": "A"}
+    )
+    assert response.status_code == 200
+    (record,) = access_log
+    assert record["trace_id"] is not None
+    # The endpoint's own span is part of the request's trace.
+    assert record["trace_id"] == response.json()["trace_id"]
+
+    request_span = spans[-1]
+    assert request_span.name == "http.request"
+    assert request_span.trace_id == record["trace_id"]
+    assert request_span.attributes == {
+        "method": "POST",
+        "path": "/automation/blog/webhook",
+        "status": 200,
+        "route": "/automation/blog/webhook",
+    }
+    webhook_span = next(s for s in spans if s.name == "blog.webhook")
+    assert webhook_span.parent_id == request_span.span_id
+
+
+def test_incoming_traceparent_is_continued(access_log, spans):
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    TestClient(main.app).get("/nowhere", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    assert access_log[0]["trace_id"] == trace_id
+    assert (spans[-1].trace_id, spans[-1].parent_id) == (trace_id, parent_id)
+    assert main._current_span.get() is None
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.replicate import FakeReplicate
+
+
+@pytest.fixture
+def replicate(db, monkeypatch):
+    fake = FakeReplicate()
+    fake.hang = True
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "REPLICATE_API_BASE", url)
+        monkeypatch.setattr(main, "REPLICATE_API_TOKEN", "r8_test")
+        monkeypatch.setattr(main, "REPLICATE_SDXL_MODEL_VERSION", "sdxl-test")
+        monkeypatch.setattr(main, "BACKGROUND_LIBRARY_SIZE", 4)
+        yield fake
+
+
+def _statuses():
+    con = main.db_conn()
+    try:
+        return [r[0] for r in con.execute("SELECT status FROM replicate_predictions ORDER BY status")]
+    finally:
+        con.close()
+
+
+def test_refill_tops_up_to_library_size(replicate):
+    main.add_library_background(main._background_library_key("hero"), replicate.output_png)
+    assert main.refill_background_library("hero") == 3
+    assert main.refill_background_library("hero") == 0
+    assert len(replicate.predictions) == 3
+    assert _statuses() == ["pending"] * 3
+
+
+def test_concurrent_refills_claim_the_deficit_once(replicate):
+    # Slow Replicate: every refill is mid-request while the others count.
+    replicate.latency = 0.2
+    barrier = threading.Barrier(8)
+    started = []
+
+    def refill():
+        barrier.wait()
+        started.append(main.refill_background_library("hero"))
+
+    threads = [threading.Thread(target=refill) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(started) == 4
+    assert len(replicate.predictions) == 4
+    assert _statuses() == ["pending"] * 4
+
+
+def test_unused_claims_are_released_when_replicate_fails(replicate, monkeypatch):
+    calls = []
+
+    def start(prompt, blog_post_id=None, library_key=None):
+        calls.append(prompt)
+        return None
+
+    monkeypatch.setattr(main, "replicate_start_prediction", start)
+    assert main.refill_background_library("hero") == 0
+    assert calls == ["hero"]
+    assert _statuses() == []
+
+
+def test_stale_claims_expire(replicate, monkeypatch):
+    con = main.db_conn()
+    con.execute(
+        """
+        INSERT INTO replicate_predictions
+            (id, library_key, prompt, status, next_poll_at, created_at, updated_at)
+        VALUES ('claim:dead', ?, 'hero', 'claimed', 0, 0, 0)
+        """,
+        (main._background_library_key("hero"),),
+    )
+    con.commit()
+    con.close()
+    assert main.refill_background_library("hero") == 4
+    assert _statuses() == ["pending"] * 4
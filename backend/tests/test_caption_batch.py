@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app import main
+from tests.fakes.openai import FakeOpenAI, captions_for
+
+
+def _batch_reply(prompt, drop=None):
+    """Captions for every item of a batch prompt, in reverse order; drop={id: [platforms]}."""
+    items = []
+    for item in reversed(prompt["items"]):
+        sections = captions_for({"output_schema": main.CAPTION_OUTPUT_SCHEMA, "title": item["title"]})
+        for platform in (drop or {}).get(item["id"], []):
+            if platform == "*":
+                sections = None
+                break
+            sections[platform] = {"caption": "", "hashtags": "not-a-list"}
+        if sections is not None:
+            items.append(dict(id=item["id"], **sections))
+    return json.dumps({"items": items})
+
+
+@pytest.fixture
+def openai(db, monkeypatch):
+    def use(reply, **kwargs):
+        fake = FakeOpenAI(reply, **kwargs)
+        monkeypatch.setattr(main, "OPENAI_API_KEY", "sk-test")
+        monkeypatch.setattr(main, "_openai_client", lambda: fake)
+        return fake
+
+    return use
+
+
+def _post(n):
+    return main._get_blog_post(
+        main._insert_blog_post({"user_id": "u1", "url": f"https://blog.example/{n}", "title": f"Post {n}", "tags": ["t"]})
+    )
+
+
+def test_batch_results_are_matched_back_by_id_and_cached(openai):
+    fake = openai(lambda prompt: _batch_reply(prompt))
+    posts = [_post(n) for n in range(3)]
+    results = main.generate_captions_batch(posts)
+
+    assert len(fake.requests) == 1
+    assert [item["id"] for item in fake.prompts[0]["items"]] == [str(p["id"]) for p in posts]
+    for post in posts:
+        assert results[post["id"]]["twitter"] == {"caption": f"twitter {post['title']}", "hashtags": ["#twitter"]}
+        key = main._caption_cache_key(post["title"], post["url"], post["excerpt"], post["tags"])
+        assert main._caption_cache_get(key) == results[post["id"]]
+
+    # All cached now: no further LLM call.
+    assert main.generate_captions_batch(posts) == results
+    assert len(fake.requests) == 1
+
+
+def test_only_malformed_platforms_of_one_item_are_asked_again(openai):
+    posts = [_post(n) for n in range(3)]
+    bad = str(posts[1]["id"])
+
+    def reply(prompt):
+        if "items" in prompt:
+            return _batch_reply(prompt, drop={bad: ["facebook", "linkedin"]})
+        return json.dumps(captions_for(prompt, tag="retry "))
+
+    fake = openai(reply)
+    results = main.generate_captions_batch(posts)
+
+    assert len(fake.requests) == 2
+    retry = fake.prompts[1]
+    assert retry["title"] == posts[1]["title"]
+    assert list(retry["output_schema"]) == ["facebook", "linkedin"]
+    assert results[posts[1]["id"]]["facebook"]["caption"] == f"facebook retry {posts[1]['title']}"
+    assert results[posts[1]["id"]]["twitter"]["caption"] == f"twitter {posts[1]['title']}"
+    assert results[posts[0]["id"]]["facebook"]["caption"] == f"facebook {posts[0]['title']}"
+
+
+def test_item_missing_from_the_batch_is_generated_alone(openai):
+    posts = [_post(n) for n in range(2)]
+    missing = str(posts[0]["id"])
+
+    def reply(prompt):
+        if "items" in prompt:
+            return _batch_reply(prompt, drop={missing: ["*"]})
+        return json.dumps(captions_for(prompt, tag="alone "))
+
+    fake = openai(reply)
+    results = main.generate_captions_batch(posts)
+    assert list(fake.prompts[1]["output_schema"]) == list(main.CAPTION_PLATFORMS)
+    assert results[posts[0]["id"]]["instagram"]["caption"] == f"instagram alone {posts[0]['title']}"
+
+
+def test_failed_batch_falls_back_to_templates_without_caching(openai):
+    def reply(prompt):
+        raise RuntimeError("model overloaded")
+
+    openai(reply)
+    posts = [_post(n) for n in range(2)]
+    results = main.generate_captions_batch(posts)
+    for post in posts:
+        assert results[post["id"]] == main._fallback_captions(post["title"], post["url"], post["excerpt"])
+        key = main._caption_cache_key(post["title"], post["url"], post["excerpt"], post["tags"])
+        assert main._caption_cache_get(key) is None
+
+
+def test_batches_are_capped_at_caption_batch_size(openai, monkeypatch):
+    monkeypatch.setattr(main, "CAPTION_BATCH_SIZE", 2)
+    fake = openai(lambda prompt: _batch_reply(prompt) if "items" in prompt else json.dumps(captions_for(prompt)))
+    main.generate_captions_batch([_post(n) for n in range(5)])
+    assert [len(p.get("items", [None])) for p in fake.prompts] == [2, 2, 1]
+
+
+def _queue(posts):
+    for post in posts:
+        main.enqueue_job("process_blog_post", {"blog_post_id": post["id"]}, dedupe_key=f"p{post['id']}")
+
+
+def test_queued_peers_are_claimed_once(openai, monkeypatch):
+    monkeypatch.setattr(main, "CAPTION_BATCH_SIZE", 3)
+    fake = openai(lambda prompt: _batch_reply(prompt))
+    running = [_post(n) for n in range(2)]
+    queued = [_post(n) for n in range(2, 6)]
+    _queue(queued)
+
+    main._generate_captions_with_queued_peers(running[0])
+    main._generate_captions_with_queued_peers(running[1])
+
+    batched = [[int(item["id"]) for item in prompt["items"]] for prompt in fake.prompts]
+    assert batched == [
+        [running[0]["id"], queued[0]["id"], queued[1]["id"]],
+        [running[1]["id"], queued[2]["id"], queued[3]["id"]],
+    ]
+
+    # A claimed peer's own job finds its captions cached and batches nobody.
+    main._generate_captions_with_queued_peers(queued[0])
+    assert len(fake.requests) == 2
+
+
+def test_concurrent_workers_never_batch_the_same_peer(openai, monkeypatch):
+    monkeypatch.setattr(main, "CAPTION_BATCH_SIZE", 4)
+
+    def slow_reply(prompt):
+        time.sleep(0.05)
+        return _batch_reply(prompt)
+
+    fake = openai(slow_reply)
+    running = [_post(n) for n in range(4)]
+    queued = [_post(n) for n in range(4, 16)]
+    _queue(queued)
+    barrier = threading.Barrier(len(running))
+
+    def work(post):
+        barrier.wait()
+        main._generate_captions_with_queued_peers(post)
+
+    threads = [threading.Thread(target=work, args=(post,)) for post in running]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    peers = [item["id"] for prompt in fake.prompts for item in prompt["items"][1:]]
+    assert sorted(peers) == sorted(str(p["id"]) for p in queued)
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from app import main
+from tests.fakes.openai import FakeOpenAI, captions_for
+
+ARGS = ("Post", "https://blog.example/post", "An excerpt", ["t"])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000]
+    monkeypatch.setattr(main, "_now_ts", lambda: now[0])
+    return now
+
+
+def _keys():
+    con = main.db_conn()
+    try:
+        return {row[0] for row in con.execute("SELECT cache_key FROM caption_cache")}
+    finally:
+        con.close()
+
+
+def test_entries_expire_after_the_ttl(db, clock, monkeypatch):
+    monkeypatch.setattr(main, "CAPTION_CACHE_TTL_SECONDS", 100)
+    main._caption_cache_put("old", {"n": 1})
+
+    clock[0] += 99
+    assert main._caption_cache_get("old") == {"n": 1}
+    clock[0] += 1
+    assert main._caption_cache_get("old") is None
+
+    # The next write also purges the expired row.
+    main._caption_cache_put("new", {"n": 2})
+    assert _keys() == {"new"}
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_cap(db, clock, monkeypatch):
+    monkeypatch.setattr(main, "CAPTION_CACHE_MAX_ENTRIES", 3)
+    for key in ("a", "b", "c"):
+        clock[0] += 1
+        main._caption_cache_put(key, {"key": key})
+    clock[0] += 1
+    assert main._caption_cache_get("a") == {"key": "a"}
+
+    clock[0] += 1
+    main._caption_cache_put("d", {"key": "d"})
+    assert _keys() == {"a", "c", "d"}
+
+
+def test_key_changes_with_model_brand_and_prompt_version(monkeypatch):
+    base = main._caption_cache_key(*ARGS)
+    assert main._caption_cache_key(*ARGS) == base
+
+    variants = set()
+    for name, value in (("OPENAI_MODEL", "gpt-other"), ("BRAND_NAME", "Other Brand"), ("CAPTION_PROMPT_VERSION", "next")):
+        with monkeypatch.context() as m:
+            m.setattr(main, name, value)
+            variants.add(main._caption_cache_key(*ARGS))
+    variants.add(main._caption_cache_key("Other title", *ARGS[1:]))
+    variants.add(main._caption_cache_key(*ARGS[:3], ["t", "u"]))
+    assert len(variants) == 5
+    assert base not in variants
+
+
+def test_cached_captions_skip_the_model_until_the_prompt_version_changes(db, monkeypatch):
+    fake = FakeOpenAI(lambda prompt: json.dumps(captions_for(prompt)))
+    monkeypatch.setattr(main, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(main, "_openai_client", lambda: fake)
+
+    first = main._generate_captions_openai(*ARGS)
+    assert main._generate_captions_openai(*ARGS) == first
+    assert len(fake.requests) == 1
+
+    monkeypatch.setattr(main, "CAPTION_PROMPT_VERSION", "next")
+    main._generate_captions_openai(*ARGS)
+    assert len(fake.requests) == 2
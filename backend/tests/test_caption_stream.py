@@ -0,0 +1,119 @@
+import json
+import random
+
+import pytest
+
+from app import main
+from tests.fakes.openai import FakeOpenAI, captions_for
+
+TITLE, URL, EXCERPT, TAGS = "Post", "https://blog.example/post", "An excerpt", ["t"]
+
+
+@pytest.fixture
+def openai(db, monkeypatch):
+    def use(reply, **kwargs):
+        fake = FakeOpenAI(reply, **kwargs)
+        monkeypatch.setattr(main, "OPENAI_API_KEY", "sk-test")
+        monkeypatch.setattr(main, "_openai_client", lambda: fake)
+        return fake
+
+    return use
+
+
+def _members(text, size):
+    return list(main._iter_json_members(text[i:i + size] for i in range(0, len(text), size)))
+
+
+def test_members_are_yielded_as_each_one_closes():
+    seen = []
+
+    def chunks():
+        yield '{"a": {"caption": "x"}, '
+        seen.append("after a")
+        yield '"b": [1, 2]}'
+
+    members = main._iter_json_members(chunks())
+    assert next(members) == ("a", {"caption": "x"})
+    assert seen == []
+    assert next(members) == ("b", [1, 2])
+
+
+def test_stream_cut_off_mid_object_keeps_the_closed_members():
+    text = '{"instagram": {"caption": "done", "hashtags": []}, "facebook": {"caption": "half wri'
+    assert _members(text, 5) == [("instagram", {"caption": "done", "hashtags": []})]
+
+
+def test_escaped_quotes_and_braces_inside_captions():
+    caption = 'He said "stop}" and {left], then \\"quoted\\" a\\\\ path, too'
+    document = {"twitter": {"caption": caption, "hashtags": ["#a,b", "#{x}"]}, "n": 3}
+    assert dict(_members(json.dumps(document), 4)) == document
+
+
+def test_malformed_member_is_skipped():
+    assert _members('{"a": {"caption": nope}, "b": true}', 3) == [("b", True)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunkings_match_json_loads(seed):
+    rng = random.Random(seed)
+    document = {
+        platform: {
+            "caption": "".join(rng.choice('ab "\\{}[],:\n\té✓') for _ in range(rng.randint(0, 40))),
+            "hashtags": [f"#{rng.randint(0, 99)}" for _ in range(rng.randint(0, 3))],
+        }
+        for platform in main.CAPTION_PLATFORMS
+    }
+    document["meta"] = {"nested": [{"x": [1, {"y": None}]}], "ok": False, "n": -1.5e3}
+    text = json.dumps(document, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+    cuts = sorted(rng.sample(range(1, len(text)), k=min(len(text) - 1, rng.randint(1, 30))))
+    chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+    assert dict(main._iter_json_members(chunks)) == json.loads(text)
+
+
+def test_stream_is_closed_once_every_platform_is_valid(openai):
+    def reply(prompt):
+        return json.dumps(dict(captions_for(prompt), notes="x" * 500))
+
+    fake = openai(reply, chunk_size=10)
+    sections = main._stream_caption_sections(TITLE, URL, EXCERPT, TAGS)
+    assert set(sections) == set(main.CAPTION_PLATFORMS)
+    assert fake.closed == 1
+
+
+def test_truncated_stream_returns_the_complete_sections(openai):
+    openai(lambda prompt: json.dumps(captions_for(prompt))[:-60])
+    sections = main._stream_caption_sections(TITLE, URL, EXCERPT, TAGS)
+    assert list(sections) == ["instagram", "facebook", "twitter"]
+
+
+def test_retry_asks_only_for_the_failing_platform_and_caches(openai):
+    def reply(prompt):
+        sections = captions_for(prompt, tag="retry " if len(prompt["output_schema"]) == 1 else "")
+        if len(prompt["output_schema"]) > 1:
+            sections["linkedin"] = {"caption": "   ", "hashtags": []}
+        return json.dumps(sections)
+
+    fake = openai(reply)
+    captions = main._generate_captions_openai(TITLE, URL, EXCERPT, TAGS)
+
+    assert len(fake.requests) == 2
+    assert fake.prompts[1]["output_schema"] == {"linkedin": main.CAPTION_OUTPUT_SCHEMA["linkedin"]}
+    assert captions["linkedin"]["caption"] == f"linkedin retry {TITLE}"
+    assert captions["twitter"]["caption"] == f"twitter {TITLE}"
+    assert main._caption_cache_get(main._caption_cache_key(TITLE, URL, EXCERPT, TAGS)) == captions
+
+
+def test_template_fallback_is_never_cached(openai):
+    def reply(prompt):
+        sections = captions_for(prompt)
+        sections.pop("linkedin", None)
+        return json.dumps(sections)
+
+    fake = openai(reply)
+    captions = main._generate_captions_openai(TITLE, URL, EXCERPT, TAGS)
+
+    assert len(fake.requests) == 2
+    assert captions["linkedin"] == main._fallback_captions(TITLE, URL, EXCERPT)["linkedin"]
+    assert captions["instagram"]["caption"] == f"instagram {TITLE}"
+    assert main._caption_cache_get(main._caption_cache_key(TITLE, URL, EXCERPT, TAGS)) is None
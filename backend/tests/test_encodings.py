@@ -0,0 +1,43 @@
+from PIL import Image
+
+from app import main
+
+
+def test_every_platform_gets_its_own_encoding(db, monkeypatch):
+    monkeypatch.setattr(main, "CREATIVE_ENCODINGS", "linkedin=PNG,twitter=WEBP:70")
+    main._platform_encodings.cache_clear()
+    background = Image.new("RGB", (1080, 1350), (30, 60, 90))
+    try:
+        images = main._render_variants(background.copy(), background)
+    finally:
+        main._platform_encodings.cache_clear()
+    assert set(images) == set(main.PLATFORM_IMAGE_VARIANT)
+    assert images["instagram"].endswith(".jpg")
+    assert images["facebook"].endswith(".jpg")
+    # LinkedIn shares Facebook's 1.91:1 image but is encoded on its own.
+    assert images["linkedin"].endswith(".png")
+    assert images["twitter"].endswith(".webp")
+    with Image.open(main._media_path(images["linkedin"])) as linkedin:
+        assert linkedin.size == (1200, 628)
+
+
+def test_platforms_sharing_an_encoding_share_the_stored_file(db):
+    background = Image.new("RGB", (1080, 1350), (30, 60, 90))
+    images = main._render_variants(background.copy(), background)
+    assert images["facebook"] == images["linkedin"]
+    assert len(set(images.values())) == 3
+
+
+def test_overrides_respect_platform_formats(monkeypatch):
+    monkeypatch.setattr(main, "CREATIVE_ENCODINGS", "instagram=WEBP:80,twitter=WEBP:70,facebook=JPEG:75,linkedin=WEBP,bogus=PNG")
+    main._platform_encodings.cache_clear()
+    try:
+        encodings = main._platform_encodings()
+    finally:
+        main._platform_encodings.cache_clear()
+    # Instagram only takes JPEG and LinkedIn has no WebP, so those overrides are ignored.
+    assert encodings["instagram"] == main.DEFAULT_PLATFORM_ENCODINGS["instagram"]
+    assert encodings["linkedin"] == main.DEFAULT_PLATFORM_ENCODINGS["linkedin"]
+    assert encodings["twitter"] == ("WEBP", 70)
+    assert encodings["facebook"] == ("JPEG", 75)
+    assert "bogus" not in encodings
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.graph import FakeGraph
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def graph(db, monkeypatch):
+    fake = FakeGraph(chunk_size=CHUNK)
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "META_GRAPH_BASE", url)
+        monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+        yield fake
+
+
+def _upload(**kwargs):
+    return main.facebook_upload_video_chunked(
+        page_id="123", page_access_token="page-token", filename="clip.mp4", **kwargs
+    )
+
+
+def test_video_is_sent_in_chunks(graph):
+    video = os.urandom(5 * CHUNK + 123)
+    result = _upload(video_bytes=video)
+
+    assert result["success"] is True
+    assert graph.video_bytes(result["id"]) == video
+    phases = [phase for phase, _ in graph.calls]
+    assert phases == ["start"] + ["transfer"] * 6 + ["finish"]
+
+
+def test_video_is_streamed_from_disk(graph, tmp_path):
+    video = os.urandom(3 * CHUNK)
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(video)
+    result = _upload(video_bytes=None, video_path=path)
+    assert graph.video_bytes(result["id"]) == video
+
+
+def test_transient_chunk_failure_is_retried(graph):
+    video = os.urandom(3 * CHUNK)
+    graph.fail_offsets = {CHUNK}
+    result = _upload(video_bytes=video)
+    assert graph.video_bytes(result["id"]) == video
+    assert [c for c in graph.calls if c == ("transfer", CHUNK)] == [("transfer", CHUNK)] * 2
+
+
+def test_failed_upload_resumes_at_last_confirmed_offset(graph, monkeypatch):
+    video = os.urandom(5 * CHUNK)
+    monkeypatch.setattr(main, "UPLOAD_PART_RETRIES", 1)
+    graph.fail_offsets = {3 * CHUNK}
+    with pytest.raises(HTTPException):
+        _upload(video_bytes=video)
+
+    graph.calls.clear()
+    result = _upload(video_bytes=video)
+    assert graph.video_bytes(result["id"]) == video
+    # No new session, and only the chunks after the failure are sent again.
+    assert graph.calls == [("transfer", 3 * CHUNK), ("transfer", 4 * CHUNK), ("finish", 5 * CHUNK)]
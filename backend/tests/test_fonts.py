@@ -0,0 +1,47 @@
+import types
+
+from app import main
+
+
+def _worker_fonts():
+    return main._load_font.cache_info().currsize
+
+
+def test_fonts_are_loaded_once_per_size():
+    main._load_font.cache_clear()
+    main._resolve_font_source.cache_clear()
+    try:
+        assert main._load_font(54) is main._load_font(54)
+        main._load_font(28)
+        assert main._load_font.cache_info().misses == 2
+        assert main._resolve_font_source.cache_info().misses == 1
+    finally:
+        main._load_font.cache_clear()
+        main._resolve_font_source.cache_clear()
+
+
+def test_startup_preloads_the_render_sizes(monkeypatch):
+    idle = types.SimpleNamespace(add_job=lambda *args, **kwargs: None, start=lambda: None)
+    monkeypatch.setattr(main, "init_db", lambda: None)
+    monkeypatch.setattr(main, "BackgroundScheduler", lambda **kwargs: idle)
+    for name in ("start_job_workers", "start_access_log", "start_slow_watchdog"):
+        monkeypatch.setattr(main, name, lambda: None)
+    main._load_font.cache_clear()
+
+    main.on_startup()
+    assert main._load_font.cache_info().currsize == len(set(main.FONT_PRELOAD_SIZES))
+
+    # Rendering afterwards only hits the cache.
+    before = main._load_font.cache_info().misses
+    main._render_template(main._fallback_background((1080, 1350)), "Title", "Read more")
+    assert main._load_font.cache_info().misses == before
+
+
+def test_render_pool_workers_start_with_warm_fonts(monkeypatch):
+    monkeypatch.setattr(main, "RENDER_POOL_SIZE", 1)
+    monkeypatch.setattr(main, "_render_pool", None)
+    pool = main._get_render_pool()
+    try:
+        assert pool.submit(_worker_fonts).result(timeout=60) == len(set(main.FONT_PRELOAD_SIZES))
+    finally:
+        main.shutdown_render_pool()
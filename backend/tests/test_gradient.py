@@ -0,0 +1,17 @@
+from PIL import ImageDraw
+
+from app import main
+
+
+def test_gradient_runs_from_primary_to_secondary():
+    img = main._gradient_background.__wrapped__((40, 100), "#000000", "#ff8040")
+    assert img.size == (40, 100)
+    assert img.getpixel((0, 0)) == (0, 0, 0)
+    assert img.getpixel((39, 99)) == (255, 128, 64)
+    assert img.getpixel((0, 50)) == img.getpixel((39, 50))
+
+
+def test_fallback_background_returns_a_private_copy():
+    first = main._fallback_background((20, 20))
+    ImageDraw.Draw(first).rectangle([0, 0, 19, 19], fill=(1, 2, 3))
+    assert main._fallback_background((20, 20)).getpixel((5, 5)) != (1, 2, 3)
@@ -0,0 +1,67 @@
+import pytest
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.graph import FakeGraph
+
+
+@pytest.fixture
+def graph(db, monkeypatch):
+    fake = FakeGraph()
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "META_GRAPH_BASE", url)
+        yield fake
+
+
+def test_photo_is_uploaded_and_posted_in_one_batch(graph):
+    result = main.facebook_post_photo_batched("page1", "tok", "Hello & welcome", b"jpeg bytes", "photo.jpg")
+
+    assert graph.batches == [2]
+    photo = graph.photos[result["media_id"]]
+    assert photo == {"bytes": b"jpeg bytes", "published": False}
+    # The feed post found the photo through the {result=photo:$.id} reference.
+    assert graph.feed[result["id"]] == {"message": "Hello & welcome", "media": [result["media_id"]]}
+
+
+def test_photo_batch_raises_when_the_post_is_rejected(graph, monkeypatch):
+    real = graph._batch_op
+
+    def reject_feed(method, path, body):
+        if path.endswith("/feed"):
+            return 400, {"error": {"message": "(#200) Permissions error", "code": 200}}
+        return real(method, path, body)
+
+    monkeypatch.setattr(graph, "_batch_op", reject_feed)
+    with pytest.raises(main.HTTPException) as error:
+        main.facebook_post_photo_batched("page1", "tok", "Hello", b"jpeg bytes", "photo.jpg")
+    assert error.value.detail["platform"] == "facebook"
+    assert error.value.detail["error"]["error"]["code"] == 200
+
+
+def test_facebook_insights_are_batched_and_failures_kept_per_post(graph, monkeypatch):
+    monkeypatch.setattr(main, "GRAPH_BATCH_MAX_OPERATIONS", 2)
+    posts = [f"page1_{n}" for n in range(4)]
+    for n, post_id in enumerate(posts):
+        graph.published[post_id] = {}
+        graph.insights[post_id] = {"post_impressions_unique": 100 * n, "post_clicks": n}
+
+    out = main.facebook_get_post_insights_batch(posts + ["page1_gone"], "tok")
+
+    assert graph.batches == [2, 2, 1]
+    assert list(out) == posts + ["page1_gone"]
+    assert "does not exist" in out["page1_gone"]["error"]["error"]["message"]
+    flattened = main._flatten_graph_insights(out["page1_3"]["insights"])
+    assert flattened["post_impressions_unique"] == 300
+    assert flattened["post_clicks"] == 3
+    assert set(flattened) == {"post_impressions_unique", "post_reactions_by_type_total", "post_clicks", "post_clicks_by_type"}
+
+
+def test_instagram_insights_use_the_configured_graph_base(graph):
+    graph.published["ig_1"] = {}
+    graph.insights["ig_1"] = {"reach": 42, "likes": 7}
+
+    out = main.instagram_get_media_insights_batch("tok", ["ig_1", "ig_2"], metrics=["reach", "likes"])
+
+    assert graph.batches == [2]
+    assert main._flatten_graph_insights(out["ig_1"]["insights"]) == {"reach": 42, "likes": 7}
+    assert "error" in out["ig_2"]
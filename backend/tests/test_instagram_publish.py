@@ -0,0 +1,85 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.graph import FakeGraph
+
+
+@pytest.fixture
+def graph(db, monkeypatch):
+    fake = FakeGraph()
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "META_GRAPH_BASE", url)
+        monkeypatch.setattr(main, "BACKEND_PUBLIC_BASE", "https://postify.example")
+        yield fake
+
+
+def _items(count):
+    items = []
+    for i in range(count):
+        data = f"image-{i}".encode()
+        items.append({"name": main.store_media(data, "jpg"), "bytes": data})
+    return items
+
+
+def test_single_image_is_created_from_its_public_url(graph):
+    name = main.store_media(b"creative", "jpg")
+    container = main.instagram_upload_media("tok", "17841400000000000", name, caption="Hello")["container_id"]
+    published = main.instagram_publish_media("tok", "17841400000000000", container)
+
+    info = graph.containers[container]
+    assert info["ig_user_id"] == "17841400000000000"
+    assert info["media_url"] == f"https://postify.example/uploads/{name}"
+    assert info["caption"] == "Hello"
+    assert published["permalink"] == f"https://www.instagram.com/p/{published['id']}/"
+
+
+def test_carousel_children_are_created_concurrently(graph, monkeypatch):
+    monkeypatch.setattr(main, "INSTAGRAM_CAROUSEL_CONCURRENCY", 4)
+    graph.latency = 0.2
+    started = time.monotonic()
+    result = main.instagram_create_media_carousel("tok", "ig1", _items(8), caption="Carousel")
+    elapsed = time.monotonic() - started
+
+    carousel = graph.published[result["id"]]
+    assert len(carousel["children"]) == 8
+    assert carousel["caption"] == "Carousel"
+    assert graph.max_in_flight == 4
+    # 8 children x (create + status poll) serially alone would be 16 x 0.2s.
+    assert elapsed < 2.5
+
+
+def test_carousel_retry_reuses_created_children(graph):
+    items = _items(3)
+    graph.fail_carousels = 1
+    with pytest.raises(main.HTTPException):
+        main.instagram_create_media_carousel("tok", "ig1", items)
+    created = len(graph.containers)
+
+    main.instagram_create_media_carousel("tok", "ig1", items)
+    # Only the carousel container itself is new.
+    assert len(graph.containers) == created + 1
+    assert all(main.get_media_handle("instagram_carousel_item", "tok", i["bytes"]) is None for i in items)
+
+
+def test_post_send_publishes_several_images_as_a_carousel(graph, monkeypatch):
+    monkeypatch.setenv("IG_USER_ID", "ig1")
+    monkeypatch.setattr(main, "get_access_token", lambda user_id, platform: "tok")
+    files = [("image", ("a.jpg", b"first", "image/jpeg"))] + [
+        ("images", (f"{n}.jpg", n.encode(), "image/jpeg")) for n in ("second", "third")
+    ]
+    resp = TestClient(main.app).post(
+        "/post/send", data={"user_id": "u1", "content": "Hi", "platforms": '["instagram"]'}, files=files
+    )
+
+    assert resp.status_code == 200, resp.text
+    media_id = resp.json()["results"][0]["response"]["id"]
+    assert len(graph.published[media_id]["children"]) == 3
+
+    con = main.db_conn()
+    refcounts = [r[0] for r in con.cursor().execute("SELECT refcount FROM media_objects").fetchall()]
+    con.close()
+    assert refcounts == [0, 0, 0]
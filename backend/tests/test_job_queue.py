@@ -0,0 +1,125 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def _job(job_id):
+    con = main.db_conn()
+    try:
+        return con.cursor().execute(
+            "SELECT status, attempts, last_error, lease_token FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        con.close()
+
+
+def test_jobs_run_and_are_marked_done(db, monkeypatch):
+    ran = []
+    monkeypatch.setitem(main.JOB_HANDLERS, "test", lambda job: ran.append(job["payload"]))
+    job_id = main.enqueue_job("test", {"n": 1})
+    assert main.run_next_job() is True
+    assert main.run_next_job() is False
+    assert ran == [{"n": 1}]
+    assert _job(job_id)[0] == "done"
+
+
+def test_failed_job_is_requeued_with_its_error(db, monkeypatch):
+    def boom(job):
+        raise RuntimeError("nope")
+
+    monkeypatch.setitem(main.JOB_HANDLERS, "test", boom)
+    job_id = main.enqueue_job("test", {}, dedupe_key="k")
+    main.run_next_job()
+    assert _job(job_id)[:3] == ("queued", 1, "RuntimeError: nope")
+
+
+def test_retry_merges_into_an_identical_queued_job(db, monkeypatch):
+    monkeypatch.setitem(main.JOB_HANDLERS, "test", lambda job: None)
+    first = main.enqueue_job("test", {}, dedupe_key="k")
+    job = main._claim_job()
+    # A second delivery arrives while the first job runs: it is queued on its own.
+    second = main.enqueue_job("test", {}, dedupe_key="k")
+    assert second != first
+
+    main._finish_job(job, "RuntimeError: nope")
+
+    status, attempts, error, lease = _job(first)
+    assert (status, attempts, lease) == ("superseded", 1, None)
+    assert f"merged into queued job {second}" in error
+    assert _job(second)[0] == "queued"
+
+
+def test_lease_is_extended_while_the_handler_runs(db, monkeypatch):
+    monkeypatch.setattr(main, "JOB_VISIBILITY_TIMEOUT_SECONDS", 2)
+    release = threading.Event()
+    monkeypatch.setitem(main.JOB_HANDLERS, "test", lambda job: release.wait(10))
+    job_id = main.enqueue_job("test", {})
+    worker = threading.Thread(target=main.run_next_job)
+    worker.start()
+
+    time.sleep(3.5)
+    # Well past the original lease, but the heartbeat kept it alive.
+    assert main._claim_job() is None
+    release.set()
+    worker.join()
+    assert _job(job_id)[:2] == ("done", 1)
+
+
+def test_webhook_redelivery_never_processes_a_post_twice(db, monkeypatch):
+    monkeypatch.setattr(main, "_job_wakeup", threading.Event())
+    client = TestClient(main.app)
+    payload = {"user_id": "u1", "url": "https://blog.example/post", "title": "Post"}
+
+    first = client.post("/automation/blog/webhook", json=payload, headers={"X-Delivery-Id": "d-1"}).json()
+    con = main.db_conn()
+    con.cursor().execute("UPDATE jobs SET status = 'done'")
+    con.commit()
+    con.close()
+    again = client.post("/automation/blog/webhook", json=payload, headers={"X-Delivery-Id": "d-1"}).json()
+    other = client.post("/automation/blog/webhook", json=payload, headers={"X-Delivery-Id": "d-2"}).json()
+
+    assert again["job_id"] == first["job_id"]
+    assert other["job_id"] != first["job_id"]
+    assert first["blog_post_id"] == again["blog_post_id"] == other["blog_post_id"]
+
+
+def test_webhook_without_delivery_id_dedupes_on_the_publish_event(db):
+    payload = {"user_id": "u1", "url": "https://blog.example/post", "title": "Post", "published_at": "2026-01-01"}
+    assert main._blog_delivery_key(payload) == main._blog_delivery_key(dict(payload, title="Edited"))
+    assert main._blog_delivery_key(payload) != main._blog_delivery_key(dict(payload, published_at="2026-02-01"))
+
+
+def test_webhook_redelivery_does_not_touch_blog_posts(db, monkeypatch):
+    monkeypatch.setattr(main, "_job_wakeup", threading.Event())
+    client = TestClient(main.app)
+    payload = {"user_id": "u1", "url": "https://blog.example/post", "title": "Post"}
+    first = client.post("/automation/blog/webhook", json=payload, headers={"X-Delivery-Id": "d-1"}).json()
+
+    inserted = []
+    monkeypatch.setattr(main, "_insert_blog_post", lambda payload: inserted.append(payload))
+    moved = dict(payload, url="https://blog.example/moved")
+    again = client.post("/automation/blog/webhook", json=moved, headers={"X-Delivery-Id": "d-1"}).json()
+    assert inserted == []
+    assert (again["blog_post_id"], again["job_id"]) == (first["blog_post_id"], first["job_id"])
+
+
+def test_webhook_without_delivery_id_can_reprocess_a_finished_post(db, monkeypatch):
+    monkeypatch.setattr(main, "_job_wakeup", threading.Event())
+    client = TestClient(main.app)
+    payload = {"user_id": "u1", "url": "https://blog.example/post", "title": "Post"}
+
+    first = client.post("/automation/blog/webhook", json=payload).json()
+    # While the job is still queued, a resend is absorbed by it.
+    assert client.post("/automation/blog/webhook", json=payload).json()["job_id"] == first["job_id"]
+
+    con = main.db_conn()
+    con.cursor().execute("UPDATE jobs SET status = 'done'")
+    con.commit()
+    con.close()
+    again = client.post("/automation/blog/webhook", json=payload).json()
+    assert again["job_id"] != first["job_id"]
+    assert again["blog_post_id"] == first["blog_post_id"]
+    assert _job(again["job_id"])[0] == "queued"
@@ -0,0 +1,179 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.linkedin import FakeLinkedIn
+
+AUTHOR = "urn:li:person:abc"
+
+
+@pytest.fixture
+def linkedin(db, monkeypatch):
+    fake = FakeLinkedIn(part_size=64 * 1024)
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "LINKEDIN_API_BASE", url)
+        monkeypatch.setattr(main, "UPLOAD_PART_RETRIES", 1)
+        yield fake
+
+
+def _stored(data, ext):
+    name = main.store_media(data, ext)
+    return name, main._media_path(name)
+
+
+def _session_rows():
+    con = main.db_conn()
+    try:
+        return (
+            con.execute("SELECT COUNT(*) FROM upload_sessions").fetchone()[0],
+            con.execute("SELECT part_index, result FROM upload_parts ORDER BY part_index").fetchall(),
+        )
+    finally:
+        con.close()
+
+
+def test_image_is_streamed_from_the_media_store(linkedin):
+    data = os.urandom(100_000)
+    name, path = _stored(data, "jpg")
+    result = main.linkedin_upload_media("tok", AUTHOR, None, name, media_path=path)
+
+    urn = result["media_urn"]
+    assert linkedin.media_bytes(urn) == data
+    assert linkedin.media[urn]["status"] == "AVAILABLE"
+    assert _session_rows() == (0, [])
+
+
+def test_video_parts_are_sent_in_parallel_and_finalized_in_order(linkedin, monkeypatch):
+    monkeypatch.setattr(main, "LINKEDIN_UPLOAD_CONCURRENCY", 3)
+    linkedin.latency = 0.05
+    data = os.urandom(10 * 64 * 1024 + 123)
+    name, path = _stored(data, "mp4")
+    urn = main.linkedin_upload_media("tok", AUTHOR, None, name, media_path=path)["media_urn"]
+
+    assert linkedin.media_bytes(urn) == data
+    assert linkedin.media[urn]["status"] == "AVAILABLE"
+    assert linkedin.max_in_flight == 3
+    assert [kind for kind, _ in linkedin.calls].count("part") == 11
+    assert linkedin.calls[-1] == ("finalize", urn)
+
+
+def test_failed_upload_resumes_with_only_the_missing_parts(linkedin):
+    data = os.urandom(4 * 64 * 1024)
+    name, path = _stored(data, "mp4")
+    linkedin.fail_parts = [("urn:li:video:C0001", 2)]
+
+    with pytest.raises(main.HTTPException):
+        main.linkedin_upload_media("tok", AUTHOR, None, name, media_path=path)
+    sessions, parts = _session_rows()
+    assert sessions == 1
+    # The confirmed ETags were recorded as they arrived.
+    assert [index for index, _ in parts] == [0, 1, 3]
+    assert [etag for _, etag in parts] == [linkedin.media["urn:li:video:C0001"]["parts"][i][1] for i in (0, 1, 3)]
+
+    linkedin.calls.clear()
+    urn = main.linkedin_upload_media("tok", AUTHOR, None, name, media_path=path)["media_urn"]
+    assert urn == "urn:li:video:C0001"
+    assert linkedin.calls == [("part", (urn, 2)), ("finalize", urn)]
+    assert linkedin.media_bytes(urn) == data
+    assert _session_rows() == (0, [])
+
+
+def test_bytes_and_path_share_an_upload_session(linkedin):
+    data = os.urandom(3 * 64 * 1024)
+    name, path = _stored(data, "mp4")
+    linkedin.fail_parts = [("urn:li:video:C0001", 0)]
+    with pytest.raises(main.HTTPException):
+        main.linkedin_upload_media("tok", AUTHOR, data, "clip.mp4")
+    main.linkedin_upload_media("tok", AUTHOR, None, name, media_path=path)
+    assert [kind for kind, _ in linkedin.calls].count("init") == 1
+
+
+def test_parts_are_retried_before_giving_up(monkeypatch, db):
+    monkeypatch.setattr(main, "UPLOAD_PART_RETRIES", 3)
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+    attempts = {}
+
+    def send(index):
+        attempts[index] = attempts.get(index, 0) + 1
+        if index == 1 and attempts[index] < 3:
+            raise RuntimeError("503")
+        return f"etag-{index}"
+
+    assert main._upload_parts_parallel("key", 3, send, {}, 2) == ["etag-0", "etag-1", "etag-2"]
+    assert attempts == {0: 1, 1: 3, 2: 1}
+
+
+def test_send_post_streams_the_attachment_to_linkedin(linkedin, monkeypatch):
+    monkeypatch.setenv("LINKEDIN_AUTHOR_URN", AUTHOR)
+    monkeypatch.setattr(main, "get_access_token", lambda user_id, platform: "tok")
+    calls = []
+    upload = main.linkedin_upload_media
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return upload(**kwargs)
+
+    monkeypatch.setattr(main, "linkedin_upload_media", spy)
+    data = os.urandom(50_000)
+    response = TestClient(main.app).post(
+        "/post/send",
+        data={"user_id": "u1", "content": "Hello", "platforms": '["linkedin"]'},
+        files={"image": ("photo.jpg", data, "image/jpeg")},
+    )
+
+    assert response.json()["results"][0]["status"] == "success", response.json()
+    assert calls[0]["media_bytes"] is None
+    assert calls[0]["media_path"].read_bytes() == data
+    urn = linkedin.posts[0]["content"]["media"]["id"]
+    assert linkedin.media_bytes(urn) == data
+    # The spooled attachment is released once the request is done.
+    con = main.db_conn()
+    assert con.execute("SELECT refcount FROM media_objects").fetchall() == [(0,)]
+    con.close()
+
+
+def test_scheduled_post_streams_its_image_to_linkedin(linkedin, monkeypatch):
+    monkeypatch.setattr(main, "LINKEDIN_AUTHOR_URN", AUTHOR)
+    monkeypatch.setattr(main, "get_access_token", lambda user_id, platform: "tok")
+    calls = []
+    upload = main.linkedin_upload_media
+    monkeypatch.setattr(main, "linkedin_upload_media", lambda **kwargs: calls.append(kwargs) or upload(**kwargs))
+    data = os.urandom(20_000)
+    name, _ = _stored(data, "jpg")
+    con = main.db_conn()
+    con.execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, created_at) VALUES (1, 'u1', 'linkedin', 0, 'scheduled', 'hi', ?, 0)",
+        (name,),
+    )
+    con.commit()
+    con.close()
+
+    main.publish_due_scheduled_posts()
+    con = main.db_conn()
+    assert con.execute("SELECT status, external_id FROM scheduled_posts").fetchone() == ("sent", "urn:li:share:1")
+    con.close()
+    assert calls[0]["media_bytes"] is None
+    assert linkedin.media_bytes(linkedin.posts[0]["content"]["media"]["id"]) == data
+
+
+def test_expired_cached_asset_is_uploaded_again(linkedin, monkeypatch):
+    monkeypatch.setattr(main, "LINKEDIN_AUTHOR_URN", AUTHOR)
+    monkeypatch.setattr(main, "get_access_token", lambda user_id, platform: "tok")
+    name, path = _stored(os.urandom(5_000), "jpg")
+    main.put_media_handle("linkedin", "tok", path, "urn:li:image:gone")
+    linkedin.expired.add("urn:li:image:gone")
+    con = main.db_conn()
+    con.execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, created_at) VALUES (1, 'u1', 'linkedin', 0, 'scheduled', 'hi', ?, 0)",
+        (name,),
+    )
+    con.commit()
+    con.close()
+
+    main.publish_due_scheduled_posts()
+    fresh = linkedin.posts[0]["content"]["media"]["id"]
+    assert fresh != "urn:li:image:gone"
+    assert main.get_media_handle("linkedin", "tok", path) == fresh
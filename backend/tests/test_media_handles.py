@@ -0,0 +1,112 @@
+import pytest
+
+from app import main
+
+
+def test_cached_handle_is_reused(db):
+    main.put_media_handle("twitter", "tok", b"img", "cached-id")
+    uploads = []
+    result = main.post_with_media_cached(
+        "twitter", "tok", b"img", lambda: uploads.append(1) or "fresh-id", lambda handle: {"handle": handle}
+    )
+    assert result == {"handle": "cached-id"}
+    assert uploads == []
+
+
+def test_rejected_handle_is_replaced_within_the_same_attempt(db):
+    main.put_media_handle("twitter", "tok", b"img", "stale-id")
+    posted = []
+
+    def post(handle):
+        posted.append(handle)
+        if handle == "stale-id":
+            raise RuntimeError("media id not found")
+        return {"handle": handle}
+
+    assert main.post_with_media_cached("twitter", "tok", b"img", lambda: "fresh-id", post) == {"handle": "fresh-id"}
+    assert posted == ["stale-id", "fresh-id"]
+    assert main.get_media_handle("twitter", "tok", b"img") == "fresh-id"
+
+
+@pytest.mark.parametrize(
+    "platform, error",
+    [
+        ("twitter", RuntimeError("Twitter posting failed: 503 Service Unavailable")),
+        ("twitter", RuntimeError("Rate limit exceeded")),
+        ("linkedin", main.HTTPException(400, detail={"platform": "linkedin", "error": {"message": "Read timed out"}})),
+    ],
+)
+def test_generic_failure_is_raised_without_a_second_post(db, platform, error):
+    main.put_media_handle(platform, "tok", b"img", "cached-id")
+    posted, uploads = [], []
+
+    def post(handle):
+        posted.append(handle)
+        raise error
+
+    with pytest.raises(type(error)):
+        main.post_with_media_cached(platform, "tok", b"img", lambda: uploads.append(1) or "fresh-id", post)
+    assert posted == ["cached-id"]
+    assert uploads == []
+    # Nothing says the handle went stale, so it stays cached.
+    assert main.get_media_handle(platform, "tok", b"img") == "cached-id"
+
+
+def test_expired_linkedin_asset_is_replaced(db):
+    main.put_media_handle("linkedin", "tok", b"img", "urn:li:image:old")
+    posted = []
+
+    def post(handle):
+        posted.append(handle)
+        if handle == "urn:li:image:old":
+            raise main.HTTPException(
+                400, detail={"platform": "linkedin", "error": {"message": "Image urn:li:image:old not found", "status": 404}}
+            )
+        return {"restli_id": "share-1"}
+
+    assert main.post_with_media_cached("linkedin", "tok", b"img", lambda: "urn:li:image:new", post) == {"restli_id": "share-1"}
+    assert posted == ["urn:li:image:old", "urn:li:image:new"]
+
+
+def test_fresh_upload_failure_is_raised(db):
+    def post(handle):
+        raise RuntimeError("rejected")
+
+    with pytest.raises(RuntimeError):
+        main.post_with_media_cached("linkedin", "tok", b"img", lambda: "urn:li:image:1", post)
+
+
+def test_facebook_handles_are_not_cached(db):
+    main.put_media_handle("facebook", "tok", b"img", "photo-id")
+    assert main.get_media_handle("facebook", "tok", b"img") is None
+
+
+def test_scheduled_tweet_recovers_from_a_stale_media_id(db, monkeypatch):
+    image = main.store_media(b"creative", "jpg")
+    con = main.db_conn()
+    con.cursor().execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, created_at) VALUES (1, 'u1', 'twitter', 0, 'scheduled', 'hi', ?, 0)",
+        (image,),
+    )
+    con.commit()
+    con.close()
+    main.put_media_handle("twitter", "tok", b"creative", "stale-id")
+
+    monkeypatch.setenv("TWITTER_API_KEY", "key")
+    monkeypatch.setenv("TWITTER_API_SECRET", "secret")
+    monkeypatch.setattr(main, "get_access_token", lambda user_id, platform: "tok")
+    monkeypatch.setattr(main, "get_token_meta", lambda user_id, platform: {"access_token_secret": "s"})
+    monkeypatch.setattr(main, "twitter_upload_media", lambda **kwargs: {"media_id": "fresh-id"})
+
+    def post_tweet(**kwargs):
+        if kwargs["media_ids"] == ["stale-id"]:
+            raise RuntimeError("Your media IDs are invalid.")
+        return {"id": "tweet-1"}
+
+    monkeypatch.setattr(main, "twitter_post_with_media", post_tweet)
+    main.publish_due_scheduled_posts()
+
+    con = main.db_conn()
+    row = con.cursor().execute("SELECT status, external_id FROM scheduled_posts").fetchone()
+    con.close()
+    assert row == ("sent", "tweet-1")
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+from app import main
+
+
+def _refcount(name: str):
+    con = main.db_conn()
+    try:
+        row = con.cursor().execute("SELECT refcount FROM media_objects WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+    finally:
+        con.close()
+
+
+def test_identical_bytes_share_one_object(db):
+    first = main.store_media(b"same bytes", "jpg")
+    second = main.store_media(b"same bytes", ".JPG")
+    assert first == second
+    assert _refcount(first) == 2
+    main.release_media(first)
+    assert _refcount(first) == 1
+
+
+def test_gc_only_collects_unreferenced_media(db, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_GC_GRACE_SECONDS", -1)
+    kept = main.store_media(b"kept", "png")
+    dropped = main.store_media(b"dropped", "png")
+    main.release_media(dropped)
+
+    assert main.gc_media(batch_size=1) == 1
+    assert main._media_path(kept).exists()
+    assert not main._media_path(dropped).exists()
+    assert _refcount(dropped) is None
+
+
+def test_store_during_gc_rewrites_the_file(db, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_GC_GRACE_SECONDS", -1)
+    name = main.store_media(b"contended", "png")
+    main.release_media(name)
+
+    real_media_path = main._media_path
+    racer = threading.Thread(target=main.store_media, args=(b"contended", "png"))
+
+    def media_path_with_racer(n):
+        # Called by gc_media just before it unlinks: store the same bytes concurrently.
+        if not racer.is_alive() and racer.ident is None:
+            racer.start()
+            time.sleep(0.2)
+        return real_media_path(n)
+
+    monkeypatch.setattr(main, "_media_path", media_path_with_racer)
+    main.gc_media()
+    racer.join()
+
+    assert _refcount(name) == 1
+    assert real_media_path(name).read_bytes() == b"contended"
+
+
+def test_scheduled_posts_hold_and_release_their_images(db, monkeypatch):
+    monkeypatch.setattr(main, "RENDER_POOL_SIZE", 0)
+    post = {"id": 1, "user_id": "u1", "title": "Hello", "url": "https://example.com/hello"}
+    main.render_and_schedule_blog_post(post, None, "prompt", captions={})
+
+    con = main.db_conn()
+    cur = con.cursor()
+    paths = [r[0] for r in cur.execute("SELECT image_path FROM scheduled_posts").fetchall()]
+    cur.execute("UPDATE scheduled_posts SET scheduled_at = 0")
+    con.commit()
+    con.close()
+    assert {name: _refcount(name) for name in paths} == {name: paths.count(name) for name in paths}
+
+    # No platform is connected, so every post fails and gives its image back.
+    main.publish_due_scheduled_posts()
+    assert all(_refcount(name) == 0 for name in paths)
+
+
+def _old_file(relative: str, data: bytes = b"x", age: int = 2 * 24 * 60 * 60):
+    path = main._media_path(relative)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_gc_sweeps_old_files_that_no_row_owns(db, monkeypatch):
+    monkeypatch.setattr(main, "_media_sweep_cursor", None)
+    stored = main.store_media(b"stored", "png")
+    os.utime(main._media_path(stored), (0, 0))
+    orphans = [
+        _old_file("ab/cd/abcd0000.png"),
+        _old_file(f"ab/cd/.abcd1111.png.{'0' * 32}.tmp"),
+        _old_file(f".spool.{'1' * 32}.tmp"),
+        _old_file("photo_1a2b3c4d.jpg"),
+        _old_file(f"blog_wide_{'2' * 32}.png"),
+    ]
+    kept = [
+        main._media_path(stored),
+        _old_file("ab/cd/abcd2222.png", age=60),
+        _old_file("queued_3c4d5e6f.jpg"),
+        _old_file("asset_4d5e6f70.png"),
+        _old_file("notes.txt"),
+    ]
+    con = main.db_conn()
+    con.execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, image_path, created_at) VALUES (1, 'u1', 'x', 0, 'scheduled', 'queued_3c4d5e6f.jpg', 0)"
+    )
+    con.execute(
+        "INSERT INTO content_assets (blog_post_id, captions, images, created_at) VALUES (1, '{}', ?, 0)",
+        (json.dumps({"ig_4_5": "asset_4d5e6f70.png"}),),
+    )
+    con.commit()
+    con.close()
+
+    assert main.gc_media() == len(orphans)
+    assert not any(path.exists() for path in orphans)
+    assert all(path.exists() for path in kept)
+
+
+def test_orphan_sweep_is_bounded_and_resumes(db, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_GC_SWEEP_FILES", 2)
+    monkeypatch.setattr(main, "_media_sweep_cursor", None)
+    orphans = [_old_file(f"{a}/{b}/{a}{b}{n}.png") for a in ("0a", "0b") for b in ("1c", "1d") for n in range(2)]
+
+    swept = [main.gc_media() for _ in range(5)]
+    assert swept == [2, 2, 2, 2, 0]
+    assert not any(path.exists() for path in orphans)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import main
+
+
+def _db_count(operation):
+    return REGISTRY.get_sample_value("postify_db_seconds_count", {"operation": operation}) or 0
+
+
+def test_connection_shortcuts_are_timed(db):
+    con = main.db_conn()
+    before = {op: _db_count(op) for op in ("create:timed", "insert:timed", "select:timed", "commit")}
+    con.execute("CREATE TABLE timed (n INTEGER)")
+    con.executemany("INSERT INTO timed (n) VALUES (?)", [(1,), (2,)])
+    con.cursor().execute("INSERT INTO timed (n) VALUES (3)")
+    assert con.execute("SELECT COUNT(*) FROM timed").fetchone() == (3,)
+    con.commit()
+    con.close()
+
+    assert {op: _db_count(op) - before[op] for op in before} == {
+        "create:timed": 1,
+        "insert:timed": 2,
+        "select:timed": 1,
+        "commit": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "url, labels",
+    [
+        ("https://graph.facebook.com/v18.0/1234567890/photos?access_token=x", ("meta", "/v18.0/{id}/photos")),
+        ("https://graph.facebook.com/v18.0/17841400000000000_98765/insights", ("meta", "/v18.0/{id}/insights")),
+        ("https://api.linkedin.com/rest/posts/urn%3Ali%3Ashare%3A123", ("linkedin", "/rest/posts/{id}")),
+        ("https://api.twitter.com/oauth/request_token", ("twitter", "/oauth/request_token")),
+        ("https://x.com/i/oauth2/authorize", ("twitter", "/i/{id}/authorize")),
+        ("https://notx.com/a", ("other", "/a")),
+        ("https://replicate.delivery/pbxt/" + "a" * 40 + "/out.png", ("replicate", "/pbxt/{id}/out.png")),
+        ("https://api.replicate.com/v1/predictions/abc/cancel/extra/more", ("replicate", "/v1/predictions/abc/cancel")),
+    ],
+)
+def test_endpoint_labels(url, labels):
+    assert main._endpoint_label(url) == labels
+
+
+def test_endpoint_label_cardinality_stays_bounded():
+    rng = random.Random(0)
+    urls = []
+    for _ in range(500):
+        post = rng.randrange(10**15, 10**16)
+        urls += [
+            f"https://graph.facebook.com/v18.0/{post}/comments?after={rng.random()}",
+            f"https://graph.facebook.com/v18.0/{post}_{rng.randrange(10**6)}",
+            f"https://api.linkedin.com/rest/videos/urn:li:video:C{post}?action=finalizeUpload",
+            f"https://replicate.delivery/pbxt/{rng.getrandbits(160):040x}/output.png",
+        ]
+    assert len({main._endpoint_label(url) for url in urls}) == 4
+
+
+def _gauges():
+    return {
+        (metric.name, tuple(sorted(sample.labels.items()))): sample.value
+        for metric in main._QueueCollector().collect()
+        for sample in metric.samples
+    }
+
+
+def test_queue_collector_reports_due_backlog_and_job_depth(db, monkeypatch):
+    now = 1_000_000
+    monkeypatch.setattr(main, "_now_ts", lambda: now)
+    con = main.db_conn()
+    con.executemany(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, created_at) VALUES (1, 'u1', ?, ?, ?, 0)",
+        [
+            ("twitter", now - 90, "scheduled"),
+            ("twitter", now - 30, "scheduled"),
+            ("twitter", now + 60, "scheduled"),
+            ("facebook", now - 10, "sent"),
+        ],
+    )
+    con.executemany(
+        "INSERT INTO jobs (kind, payload, status, attempts, max_attempts, run_at, created_at, updated_at) VALUES (?, '{}', ?, 0, 5, ?, 0, 0)",
+        [("process_blog_post", "queued", now - 40), ("process_blog_post", "running", now - 100), ("render", "done", 0)],
+    )
+    con.execute(
+        "INSERT INTO replicate_predictions (id, prompt, status, next_poll_at, created_at, updated_at) VALUES ('p1', 'x', 'pending', 0, 0, 0)"
+    )
+    con.commit()
+    con.close()
+
+    assert _gauges() == {
+        ("postify_publisher_backlog", (("platform", "twitter"),)): 2,
+        ("postify_publisher_lag_seconds", (("platform", "twitter"),)): 90,
+        ("postify_jobs", (("kind", "process_blog_post"), ("status", "queued"))): 1,
+        ("postify_jobs", (("kind", "process_blog_post"), ("status", "running"))): 1,
+        ("postify_job_queue_lag_seconds", (("kind", "process_blog_post"),)): 40,
+        ("postify_replicate_predictions_pending", ()): 1,
+    }
+
+    body = TestClient(main.app).get("/metrics").text
+    assert 'postify_publisher_backlog{platform="twitter"} 2.0' in body
+    assert "postify_replicate_predictions_pending 1.0" in body
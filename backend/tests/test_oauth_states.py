@@ -0,0 +1,55 @@
+import pytest
+from fastapi import HTTPException
+
+from app import main
+
+
+def _count(table: str) -> int:
+    con = main.db_conn()
+    try:
+        return con.cursor().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_state_is_single_use(db):
+    state = main.create_oauth_state("u1", "twitter")
+    assert main.consume_oauth_state(state, "twitter")["user_id"] == "u1"
+    with pytest.raises(HTTPException):
+        main.consume_oauth_state(state, "twitter")
+    assert _count("oauth_states") == 0
+
+
+def test_state_is_bound_to_platform(db):
+    state = main.create_oauth_state("u1", "twitter")
+    with pytest.raises(HTTPException):
+        main.consume_oauth_state(state, "linkedin")
+    assert main.consume_oauth_state(state, "twitter")["platform"] == "twitter"
+
+
+def test_expired_state_is_rejected_and_removed(db, monkeypatch):
+    state = main.create_oauth_state("u1", "twitter")
+    now = main._now_ts()
+    monkeypatch.setattr(main, "_now_ts", lambda: now + main.OAUTH_STATE_TTL_SECONDS + 1)
+    with pytest.raises(HTTPException) as exc:
+        main.consume_oauth_state(state, "twitter")
+    assert exc.value.detail == "State expired"
+    assert _count("oauth_states") == 0
+
+
+def test_purge_removes_only_expired_states_in_batches(db):
+    now = main._now_ts()
+    stale = now - main.OAUTH_STATE_TTL_SECONDS - 60
+    con = main.db_conn()
+    cur = con.cursor()
+    cur.executemany(
+        "INSERT INTO oauth_states (state, user_id, platform, created_at, meta) VALUES (?, ?, ?, ?, ?)",
+        [(f"stale-{i}", "u", "twitter", stale, "{}") for i in range(1234)],
+    )
+    con.commit()
+    con.close()
+    fresh = main.create_oauth_state("u1", "twitter")
+
+    assert main.purge_expired_oauth_states(batch_size=100) == 1234
+    assert _count("oauth_states") == 1
+    assert main.consume_oauth_state(fresh, "twitter")["user_id"] == "u1"
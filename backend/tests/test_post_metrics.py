@@ -0,0 +1,126 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.graph import FakeGraph
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+@pytest.fixture
+def graph(db, monkeypatch):
+    fake = FakeGraph()
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "META_GRAPH_BASE", url)
+        main.upsert_access_token("u1", "facebook", "tok")
+        yield fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Noon in the rollup's timezone, so a few hours either way stay on the same day.
+    now = [int(datetime.datetime(2026, 3, 10, 12, tzinfo=ZoneInfo(main.DEFAULT_TZ)).timestamp())]
+    monkeypatch.setattr(main, "_now_ts", lambda: now[0])
+    return now
+
+
+def _sent_post(graph, external_id, sent_at, user_id="u1"):
+    graph.published[external_id] = {}
+    con = main.db_conn()
+    cur = con.cursor()
+    cur.execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, external_id, created_at) VALUES (1, ?, 'facebook', ?, 'sent', ?, 0)",
+        (user_id, sent_at, external_id),
+    )
+    con.commit()
+    con.close()
+    return cur.lastrowid
+
+
+def _next_collect(sp_id):
+    con = main.db_conn()
+    try:
+        return con.execute(
+            "SELECT next_collect_at, collect_count FROM post_metrics_schedule WHERE scheduled_post_id = ?", (sp_id,)
+        ).fetchone()
+    finally:
+        con.close()
+
+
+def test_sampling_interval_decays_with_post_age(graph, clock):
+    now = clock[0]
+    ages = {"p_new": HOUR, "p_day": DAY, "p_week": 3 * DAY, "p_month": 10 * DAY, "p_old": 40 * DAY}
+    ids = {external_id: _sent_post(graph, external_id, now - age) for external_id, age in ages.items()}
+
+    assert main.collect_post_metrics() == 4
+    assert graph.batches == [4]
+    assert {external_id: _next_collect(sp_id) for external_id, sp_id in ids.items()} == {
+        "p_new": (now + 15 * 60, 1),
+        "p_day": (now + HOUR, 1),
+        "p_week": (now + 6 * HOUR, 1),
+        "p_month": (now + DAY, 1),
+        "p_old": None,
+    }
+
+    # Nothing is due again until the newest post's 15 minutes are up.
+    assert main.collect_post_metrics() == 0
+    clock[0] += 15 * 60
+    assert main.collect_post_metrics() == 1
+    assert graph.batches == [4, 1]
+    assert _next_collect(ids["p_new"]) == (clock[0] + 15 * 60, 2)
+
+
+def test_daily_rollup_keeps_the_days_totals_and_growth(graph, clock):
+    sp_id = _sent_post(graph, "page1_1", clock[0] - HOUR)
+
+    def sample(impressions, likes, wows):
+        graph.insights["page1_1"] = {
+            "post_impressions_unique": impressions,
+            "post_reactions_by_type_total": {"like": likes, "wow": wows},
+        }
+        assert main.collect_post_metrics() == 1
+        clock[0] += HOUR
+
+    sample(100, 5, 0)
+    # A lagging sample later the same day must not lower the day's totals.
+    sample(90, 7, 1)
+    clock[0] += DAY - 2 * HOUR
+    sample(130, 9, 1)
+
+    response = TestClient(main.app).get(f"/automation/metrics/{sp_id}", params={"user_id": "u1"}).json()
+    first, second = response["days"]
+    assert first["samples"] == 2
+    assert first["metrics"]["post_impressions_unique"] == 100
+    assert first["metrics"]["post_reactions_by_type_total"] == {"like": 7, "wow": 1}
+    assert first["delta"]["post_impressions_unique"] == 100
+    assert second["samples"] == 1
+    assert second["metrics"]["post_impressions_unique"] == 130
+    assert second["delta"]["post_impressions_unique"] == 30
+    assert second["delta"]["post_reactions_by_type_total"] == {"like": 2, "wow": 0}
+
+    con = main.db_conn()
+    assert con.execute("SELECT COUNT(*) FROM post_metrics").fetchone() == (3,)
+    con.close()
+
+
+def test_metrics_endpoints_read_only_the_users_rollups(graph, clock):
+    mine = _sent_post(graph, "page1_1", clock[0] - HOUR)
+    theirs = _sent_post(graph, "page1_2", clock[0] - HOUR, user_id="u2")
+    graph.insights["page1_1"] = {"post_clicks": 4}
+    main.collect_post_metrics()
+    batches = list(graph.batches)
+
+    client = TestClient(main.app)
+    (item,) = client.get("/automation/metrics", params={"user_id": "u1"}).json()["items"]
+    assert item["scheduled_post_id"] == mine
+    assert item["external_id"] == "page1_1"
+    assert item["metrics"]["post_clicks"] == 4
+    assert item["delta"]["post_clicks"] == 4
+    assert client.get(f"/automation/metrics/{theirs}", params={"user_id": "u1"}).json()["days"] == []
+    # Reading never calls the platform.
+    assert graph.batches == batches
@@ -0,0 +1,105 @@
+import collections
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def watchdog(monkeypatch):
+    captures = collections.deque(maxlen=10)
+    monkeypatch.setattr(main, "_slow_captures", captures)
+    monkeypatch.setattr(main, "SLOW_CAPTURE_SAMPLE_INTERVAL_MS", 10)
+    main.start_slow_watchdog()
+    yield captures
+    main.stop_slow_watchdog()
+
+
+@pytest.fixture
+def bystander():
+    """Another thread that is busy for the whole test, but in no watched block."""
+    stop = threading.Event()
+
+    def _bystander_loop():
+        while not stop.wait(0.005):
+            pass
+
+    thread = threading.Thread(target=_bystander_loop, name="bystander")
+    thread.start()
+    yield
+    stop.set()
+    thread.join()
+
+
+def _slow_block(seconds):
+    time.sleep(seconds)
+
+
+def test_admin_endpoints_need_the_admin_token(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.get("/admin/slow-captures", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/slow-captures").status_code == 403
+    assert client.get("/admin/slow-captures", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profile?seconds=0.1", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    ok = {"X-Admin-Token": "s3cret"}
+    assert client.get("/admin/slow-captures", headers=ok).status_code == 200
+    assert client.get("/admin/profile?format=svg", headers=ok).status_code == 400
+    other = client.get("/admin/profile?seconds=0.1&pid=1", headers=ok)
+    assert other.status_code == 409
+    assert other.json()["detail"]["pid"] == main.os.getpid()
+
+
+def test_sample_profile_sees_other_threads_but_not_itself(bystander):
+    samples = main.sample_profile(0.2, interval_ms=10)
+    assert any(stack.startswith("bystander;") and "_bystander_loop" in stack for stack in samples)
+    assert not any("sample_profile" in stack for stack in samples)
+
+
+def test_top_functions_counts_self_and_total_samples():
+    samples = {"T;a;b": 3, "T;a;c": 1, "T;a": 1, "T": 4}
+    rows = main._top_functions(samples)
+    assert [row["function"] for row in rows] == ["b", "a", "c"]
+    assert rows[0] == {"function": "b", "self_samples": 3, "total_samples": 3, "self_pct": 33.33, "total_pct": 33.33}
+    assert rows[1]["total_samples"] == 5
+    assert len(main._top_functions(samples, limit=1)) == 1
+
+
+def test_slow_watch_samples_only_the_thread_it_watches(watchdog, bystander):
+    with main.slow_watch("fast", 500):
+        pass
+    with main.slow_watch("slow", 50):
+        _slow_block(0.3)
+
+    (capture,) = watchdog
+    assert capture["label"] == "slow"
+    assert capture["duration_ms"] >= 300
+    assert capture["samples"] > 0
+    assert all("_slow_block" in entry["stack"] for entry in capture["stacks"])
+    assert not any("bystander" in entry["stack"] for entry in capture["stacks"])
+
+
+def test_sync_endpoint_thread_is_sampled_for_its_request(watchdog, bystander, monkeypatch):
+    monkeypatch.setattr(main, "SLOW_REQUEST_CAPTURE_MS", 50)
+    app = FastAPI()
+    app.router.route_class = main._SlowWatchRoute
+
+    @app.get("/slow")
+    def slow(seconds: float = 0.3):
+        _slow_block(seconds)
+        return {"ok": True}
+
+    app.add_middleware(main.AccessLogMiddleware)
+    assert TestClient(app).get("/slow").json() == {"ok": True}
+
+    (capture,) = watchdog
+    assert capture["label"] == "GET /slow"
+    assert any("_slow_block" in entry["stack"] for entry in capture["stacks"])
+    assert not any("bystander" in entry["stack"] for entry in capture["stacks"])
@@ -0,0 +1,96 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+import pytest
+
+from app import main
+
+
+def _worker_state():
+    return {
+        "pid": os.getpid(),
+        "threads": threading.active_count(),
+        "access_listener": main._access_listener,
+        "slow_watchdog": main._slow_watchdog_thread,
+        "job_threads": len(main._job_threads),
+        "render_pool": main._render_pool,
+        "db_path": main.DB_PATH,
+    }
+
+
+def test_spawned_workers_import_the_app_without_starting_anything(monkeypatch):
+    monkeypatch.setattr(main, "RENDER_POOL_SIZE", 1)
+    monkeypatch.setattr(main, "_render_pool", None)
+    pool = main._get_render_pool()
+    try:
+        state = pool.submit(_worker_state).result(timeout=60)
+    finally:
+        main.shutdown_render_pool()
+
+    assert state == {
+        "pid": state["pid"],
+        "threads": 1,
+        "access_listener": None,
+        "slow_watchdog": None,
+        "job_threads": 0,
+        "render_pool": None,
+        # Configuration comes from the environment the parent was started with.
+        "db_path": os.environ["DB_PATH"],
+    }
+    assert state["pid"] != os.getpid()
+
+
+class _HeldPool:
+    """Stands in for the process pool; each job finishes only when the test says so."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def held_pool(monkeypatch):
+    pool = _HeldPool()
+    monkeypatch.setattr(main, "_get_render_pool", lambda: pool)
+    monkeypatch.setattr(main, "_render_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(main, "RENDER_SUBMIT_TIMEOUT_SECONDS", 0.1)
+    return pool
+
+
+def _wait_for_submits(pool, count):
+    while len(pool.futures) < count:
+        time.sleep(0.01)
+
+
+def test_callers_beyond_the_pending_limit_are_turned_away(held_pool):
+    with concurrent.futures.ThreadPoolExecutor(1) as callers:
+        first = callers.submit(main.render_creative, None, "Title", "Read more")
+        _wait_for_submits(held_pool, 1)
+
+        with pytest.raises(RuntimeError, match="render queue is full"):
+            main.render_creative(None, "Other", "Read more")
+        assert len(held_pool.futures) == 1
+
+        # Finishing the running job frees its slot for the next caller.
+        held_pool.futures[0].set_result({"instagram": "a.jpg"})
+        assert first.result(timeout=5) == {"instagram": "a.jpg"}
+        second = callers.submit(main.render_creative, None, "Other", "Read more")
+        _wait_for_submits(held_pool, 2)
+        held_pool.futures[1].set_result({"instagram": "b.jpg"})
+        assert second.result(timeout=5) == {"instagram": "b.jpg"}
+
+
+def test_a_failed_submit_gives_its_slot_back(held_pool, monkeypatch):
+    def broken(fn, *args):
+        raise concurrent.futures.BrokenExecutor("pool died")
+
+    monkeypatch.setattr(held_pool, "submit", broken)
+    for _ in range(2):
+        with pytest.raises(concurrent.futures.BrokenExecutor):
+            main.render_creative(None, "Title", "Read more")
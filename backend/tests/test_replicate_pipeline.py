@@ -0,0 +1,160 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from tests.fakes import serve
+from tests.fakes.replicate import FakeReplicate
+
+
+@pytest.fixture
+def replicate(db, monkeypatch):
+    fake = FakeReplicate()
+    with serve(fake.app) as url:
+        monkeypatch.setattr(main, "REPLICATE_API_BASE", url)
+        monkeypatch.setattr(main, "REPLICATE_API_TOKEN", "r8_test")
+        monkeypatch.setattr(main, "REPLICATE_SDXL_MODEL_VERSION", "sdxl-test")
+        monkeypatch.setattr(main, "REPLICATE_WEBHOOK_SECRET", fake.webhook_secret)
+        monkeypatch.setattr(main, "BACKEND_PUBLIC_BASE", "https://postify.example")
+        yield fake
+
+
+def _prediction(prediction_id):
+    con = main.db_conn()
+    try:
+        return con.cursor().execute(
+            "SELECT status, output_url, error FROM replicate_predictions WHERE id = ?", (prediction_id,)
+        ).fetchone()
+    finally:
+        con.close()
+
+
+def _jobs(kind):
+    con = main.db_conn()
+    try:
+        return con.cursor().execute("SELECT payload, dedupe_key FROM jobs WHERE kind = ?", (kind,)).fetchall()
+    finally:
+        con.close()
+
+
+def _make_due():
+    con = main.db_conn()
+    con.execute("UPDATE replicate_predictions SET next_poll_at = 0")
+    con.commit()
+    con.close()
+
+
+def test_start_prediction_registers_webhook_and_returns_at_once(replicate, monkeypatch):
+    monkeypatch.setattr(main, "REPLICATE_WEBHOOKS_ENABLED", True)
+    replicate.hang = True
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+
+    sent = replicate.predictions[prediction_id]
+    assert sent["input"]["prompt"] == "hero"
+    assert sent["webhook"] == "https://postify.example/automation/replicate/webhook"
+    assert sent["webhook_events_filter"] == ["completed"]
+    assert _prediction(prediction_id)[0] == "pending"
+
+
+def test_poller_completes_prediction_and_queues_render(replicate):
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    _make_due()
+    assert main.poll_replicate_predictions() == 1
+
+    status, output_url, _ = _prediction(prediction_id)
+    assert status == "succeeded"
+    assert output_url.endswith(f"/outputs/{prediction_id}.png")
+    assert main._download_prediction_output(output_url) == replicate.output_png
+    assert _jobs("render_blog_post") == [
+        (f'{{"blog_post_id": 7, "prediction_id": "{prediction_id}"}}', f"render_blog_post:{prediction_id}")
+    ]
+
+
+def test_library_prediction_is_stored_in_the_library(replicate):
+    prediction_id = main.replicate_start_prediction("hero", library_key="lib")
+    _make_due()
+    main.poll_replicate_predictions()
+    assert [row[1] for row in _jobs("store_library_background")] == [f"store_library_background:{prediction_id}"]
+
+    assert main.run_next_job() is True
+    con = main.db_conn()
+    assert con.execute("SELECT library_key, uses FROM background_library").fetchall() == [("lib", 0)]
+    con.close()
+
+
+def test_poller_leaves_running_predictions_pending(replicate):
+    replicate.hang = True
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    _make_due()
+    assert main.poll_replicate_predictions() == 0
+    assert _prediction(prediction_id)[0] == "pending"
+    assert _jobs("render_blog_post") == []
+
+
+def test_signed_webhook_completes_prediction(replicate):
+    replicate.hang = True
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    headers, body = replicate.webhook(prediction_id)
+
+    response = TestClient(main.app).post("/automation/replicate/webhook", content=body, headers=headers)
+    assert response.json() == {"ok": True, "completed": True}
+    assert _prediction(prediction_id)[0] == "succeeded"
+    assert len(_jobs("render_blog_post")) == 1
+
+
+def test_webhook_with_bad_signature_is_rejected(replicate):
+    replicate.hang = True
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    forged = "whsec_" + base64.b64encode(b"someone-else").decode()
+    headers, body = replicate.webhook(prediction_id, secret=forged)
+
+    response = TestClient(main.app).post("/automation/replicate/webhook", content=body, headers=headers)
+    assert response.status_code == 401
+    assert _prediction(prediction_id)[0] == "pending"
+    assert _jobs("render_blog_post") == []
+
+
+def test_verify_webhook_rejects_tampered_and_stale_callbacks(replicate, monkeypatch):
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    headers, body = replicate.webhook(prediction_id)
+    assert main._verify_replicate_webhook(headers, body)
+    assert not main._verify_replicate_webhook(headers, body.replace(b"succeeded", b"failed"))
+    assert not main._verify_replicate_webhook({**headers, "webhook-signature": "v2,abc"}, body)
+
+    monkeypatch.setattr(main, "_now_ts", lambda: int(headers["webhook-timestamp"]) + 6 * 60)
+    assert not main._verify_replicate_webhook(headers, body)
+
+
+def test_first_completion_wins(replicate):
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    headers, body = replicate.webhook(prediction_id)
+    client = TestClient(main.app)
+
+    assert client.post("/automation/replicate/webhook", content=body, headers=headers).json()["completed"] is True
+    assert client.post("/automation/replicate/webhook", content=body, headers=headers).json()["completed"] is False
+    _make_due()
+    assert main.poll_replicate_predictions() == 0
+    assert len(_jobs("render_blog_post")) == 1
+
+
+def test_timed_out_prediction_is_cancelled_and_renders_on_fallback(replicate, monkeypatch):
+    replicate.hang = True
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    _make_due()
+    monkeypatch.setattr(main, "REPLICATE_PREDICTION_TIMEOUT_SECONDS", -1)
+
+    assert main.poll_replicate_predictions() == 1
+    assert replicate.cancelled == [prediction_id]
+    assert replicate.predictions[prediction_id]["status"] == "canceled"
+    assert _prediction(prediction_id) == ("failed", None, "timed out")
+    assert len(_jobs("render_blog_post")) == 1
+
+
+def test_failed_prediction_still_queues_render(replicate):
+    replicate.fail_next = 1
+    prediction_id = main.replicate_start_prediction("hero", blog_post_id=7)
+    _make_due()
+    assert main.poll_replicate_predictions() == 1
+    assert _prediction(prediction_id) == ("failed", None, "CUDA out of memory")
+    assert len(_jobs("render_blog_post")) == 1
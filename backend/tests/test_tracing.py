@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app import main
+
+
+class Abort(BaseException):
+    """Escapes the publishers' `except Exception` handlers, like a cancelled task."""
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exported = []
+    monkeypatch.setattr(main, "_export_span", exported.append)
+    return exported
+
+
+def _send(platforms):
+    async def go():
+        await main.send_post(user_id="u1", content="hi", platforms=platforms, image=None, images=None)
+        return main._platform_label.get(), main._current_span.get()
+
+    return asyncio.run(go())
+
+
+def test_send_post_restores_platform_label(db):
+    assert _send('["nowhere", "elsewhere"]') == (None, None)
+
+
+def test_send_post_ends_its_span_when_interrupted(db, spans, monkeypatch):
+    monkeypatch.setenv("FB_PAGE_ID", "page1")
+
+    def abort(user_id, platform):
+        raise Abort()
+
+    monkeypatch.setattr(main, "get_access_token", abort)
+    with pytest.raises(Abort):
+        _send('["nowhere", "facebook"]')
+    assert [(s.name, s.error) for s in spans] == [("publish nowhere", "Unknown platform"), ("publish facebook", "Abort: ")]
+    assert main._current_span.get() is None
+    assert main._platform_label.get() is None
+
+
+def test_publisher_ends_cycle_span_when_interrupted(db, spans, monkeypatch):
+    con = main.db_conn()
+    con.execute(
+        """
+        INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, created_at)
+        VALUES (1, 'u1', 'facebook', 0, 'scheduled', 'hi', 0)
+        """
+    )
+    con.commit()
+    con.close()
+    monkeypatch.setenv("FB_PAGE_ID", "page1")
+
+    def abort(user_id, platform):
+        raise Abort()
+
+    monkeypatch.setattr(main, "get_access_token", abort)
+    with pytest.raises(Abort):
+        main.publish_due_scheduled_posts()
+    assert [s.name for s in spans] == ["publish facebook", "publisher.cycle"]
+    assert all(s.end_ns and s.error == "Abort: " for s in spans)
+    assert main._current_span.get() is None
@@ -0,0 +1,166 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import main
+from tests.fakes.twitter import FakeTwitterAPI
+
+CREDENTIALS = {"access_token": "tok", "access_token_secret": "secret", "api_key": "key", "api_secret": "key-secret"}
+
+
+@pytest.fixture
+def twitter(db, monkeypatch):
+    fake = FakeTwitterAPI()
+    monkeypatch.setattr(main, "_tweepy_api", lambda auth: fake)
+    monkeypatch.setattr(main, "TWITTER_UPLOAD_CHUNK_BYTES", 1000)
+    return fake
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the STATUS back-off instead of waiting it out."""
+    waited = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds, *args, **kwargs):
+        waited.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(main.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(main.time, "sleep", waited.append)
+    return waited
+
+
+def _stored(data, ext):
+    name = main.store_media(data, ext)
+    return name, main._media_path(name)
+
+
+def _jpeg(width=200):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, width // 2), "navy").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_video_is_chunked_from_the_store_and_polled_asynchronously(twitter, sleeps):
+    data = os.urandom(3500)
+    _, path = _stored(data, "mp4")
+    result = asyncio.run(
+        main.twitter_upload_media_async(**CREDENTIALS, media_bytes=None, filename="clip.mp4", media_path=path)
+    )
+
+    media_id = int(result["media_id"])
+    assert twitter.calls == [
+        ("INIT", media_id, 3500, "video/mp4", "tweet_video"),
+        ("APPEND", media_id, 0, 1000),
+        ("APPEND", media_id, 1, 1000),
+        ("APPEND", media_id, 2, 1000),
+        ("APPEND", media_id, 3, 500),
+        ("FINALIZE", media_id),
+        ("STATUS", media_id),
+        ("STATUS", media_id),
+    ]
+    assert sleeps == [5, 2]
+    assert twitter.media_bytes(media_id) == data
+
+
+def test_sync_upload_streams_gifs_and_waits_between_status_checks(twitter, sleeps):
+    data = os.urandom(2000)
+    _, path = _stored(data, "gif")
+    result = main.twitter_upload_media(**CREDENTIALS, media_bytes=None, filename="loop.gif", media_path=path)
+
+    media_id = int(result["media_id"])
+    assert twitter.calls[0] == ("INIT", media_id, 2000, "image/gif", "tweet_gif")
+    assert [call[0] for call in twitter.calls] == ["INIT", "APPEND", "APPEND", "FINALIZE", "STATUS", "STATUS"]
+    assert sleeps == [5, 2]
+    assert twitter.media_bytes(media_id) == data
+
+
+def test_failed_processing_is_reported(twitter, sleeps):
+    twitter.processing = [("pending", 1), ("failed", 0)]
+    with pytest.raises(main.HTTPException) as error:
+        asyncio.run(main.twitter_upload_media_async(**CREDENTIALS, media_bytes=os.urandom(100), filename="clip.mp4"))
+    assert "Unsupported video format" in str(error.value.detail)
+
+
+def test_upload_slots_hold_on_every_event_loop(twitter, monkeypatch):
+    monkeypatch.setattr(main, "TWITTER_MEDIA_UPLOAD_CONCURRENCY", 2)
+    twitter.processing = []
+    twitter.latency = 0.02
+
+    async def upload_many():
+        return await asyncio.gather(
+            *(
+                main.twitter_upload_media_async(**CREDENTIALS, media_bytes=os.urandom(1500), filename="clip.mp4")
+                for _ in range(5)
+            )
+        )
+
+    # Each asyncio.run is a new loop, as when uploads run from different threads.
+    for _ in range(2):
+        assert len(asyncio.run(upload_many())) == 5
+    assert twitter.max_in_flight == 2
+
+
+def _connect(monkeypatch):
+    main.upsert_access_token("u1", "twitter", "tok", {"access_token_secret": "secret"})
+    monkeypatch.setenv("TWITTER_API_KEY", "key")
+    monkeypatch.setenv("TWITTER_API_SECRET", "key-secret")
+
+
+def _spy_uploads(monkeypatch):
+    calls = []
+    for name in ("twitter_upload_media", "twitter_upload_media_async"):
+        real = getattr(main, name)
+
+        def spy(*args, _real=real, **kwargs):
+            calls.append(kwargs)
+            return _real(*args, **kwargs)
+
+        monkeypatch.setattr(main, name, spy)
+    return calls
+
+
+@pytest.mark.parametrize("filename, data", [("clip.mp4", os.urandom(2500)), ("photo.jpg", _jpeg())])
+def test_send_post_uploads_from_the_media_store(twitter, sleeps, monkeypatch, filename, data):
+    _connect(monkeypatch)
+    calls = _spy_uploads(monkeypatch)
+    response = TestClient(main.app).post(
+        "/post/send",
+        data={"user_id": "u1", "content": "Hello", "platforms": '["twitter"]'},
+        files={"image": (filename, data, "application/octet-stream")},
+    )
+
+    assert response.json()["results"][0]["status"] == "success", response.json()
+    assert calls[0]["media_bytes"] is None
+    assert calls[0]["media_path"].read_bytes() == data
+    (tweet,) = twitter.tweets
+    assert twitter.media_bytes(int(tweet["media_ids"][0])) == data
+
+
+def test_scheduled_tweet_uploads_its_image_from_the_store(twitter, monkeypatch):
+    _connect(monkeypatch)
+    calls = _spy_uploads(monkeypatch)
+    data = _jpeg()
+    name, path = _stored(data, "jpg")
+    con = main.db_conn()
+    con.execute(
+        "INSERT INTO scheduled_posts (blog_post_id, user_id, platform, scheduled_at, status, content, image_path, created_at) VALUES (1, 'u1', 'twitter', 0, 'scheduled', 'hi', ?, 0)",
+        (name,),
+    )
+    con.commit()
+    con.close()
+
+    main.publish_due_scheduled_posts()
+    con = main.db_conn()
+    assert con.execute("SELECT status, external_id FROM scheduled_posts").fetchone() == ("sent", "1")
+    con.close()
+    assert calls[0]["media_bytes"] is None
+    assert calls[0]["media_path"] == path
+    media_id = twitter.tweets[0]["media_ids"][0]
+    assert twitter.media_bytes(int(media_id)) == data
+    assert main.get_media_handle("twitter", "tok", path) == media_id